@@ -4,15 +4,235 @@
 import scipy.io
 import numpy as np
 import pandas as pd
+import json
+import os
+import shutil
+import tempfile
 
 
-def read_session(path):
+MODALITIES = ['emg', 'eeg', 'kin', 'env', 'misc']
+""" Modalities contained in a `HS_P#_S#.mat` file. Data of modality ``<mod>``
+    is stored under key ``<mod>_data``, its sampling rate under ``<mod>_sr``.
+"""
+
+KIN_COLUMNS = [
+        'Px1 - position x sensor 1',
+        'Px2 - position x sensor 2',
+        'Px3 - position x sensor 3',
+        'Px4 - position x sensor 4',
+        'Py1 - position y sensor 1',
+        'Py2 - position y sensor 2',
+        'Py3 - position y sensor 3',
+        'Py4 - position y sensor 4',
+        'Pz1 - position z sensor 1',
+        'Pz2 - position z sensor 2',
+        'Pz3 - position z sensor 3',
+        'Pz4 - position z sensor 4'
+        ]
+""" Columns of kinematic data kept when reading a session
+"""
+
+
+def _read_mat_session(path):
+    """ Reads a session from a `HS_P#_S#.mat` file by walking the nested
+        struct ``hs``. See ``read_session`` for returned dictionary.
+
+        Args:
+            path (String): Path to file containing data
+
+        Returns:
+            Dictionary
+    """
+    mat = scipy.io.loadmat(path)
+    ret = {}
+    ret['initials'] = mat['hs'][0][0][0][0][0]
+    ret['subject'] = mat['hs'][0][0][1][0][0]
+    ret['session'] = mat['hs'][0][0][2][0][0]
+
+    ret['emg_data'] = pd.DataFrame(mat['hs'][0][0][3][0][0][0])
+    header = []
+    for h in mat['hs'][0][0][3][0][0][1][0]:
+        header.append(h[0])
+    ret['emg_data'].columns = header
+    ret['emg_sr'] = mat['hs'][0][0][3][0][0][2][0][0]
+
+    # All other modalities store header first and data second
+    for i, modality in enumerate(MODALITIES[1:]):
+        struct = mat['hs'][0][0][4 + i][0][0]
+        header = []
+        for h in struct[0][0]:
+            header.append(h[0])
+        ret[modality + '_data'] = pd.DataFrame(struct[1])
+        ret[modality + '_data'].columns = header
+        ret[modality + '_sr'] = struct[2][0][0]
+
+    ret['kin_data'] = ret['kin_data'].loc[:, KIN_COLUMNS]
+    return ret
+
+
+def _source_stamp(path):
+    """ Returns modification time and size of a file. Used to detect changes
+        of a `.mat` file a cache has been created from.
+
+        Args:
+            path (String): Path to file
+
+        Returns:
+            Dictionary
+    """
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def _cache_path(path, cache_dir):
+    """ Returns directory cache of session file ``path`` is stored in.
+
+        Args:
+            path (String): Path to `HS_P#_S#.mat` file
+            cache_dir (String): Directory containing all cached sessions
+
+        Returns:
+            String
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, name)
+
+
+def convert_session(path, cache_dir):
+    """ Converts a `HS_P#_S#.mat` file to a cache of contiguous binary arrays.
+        Data of each modality is stored in its own ``<modality>_data.npy``
+        file, sampling rates, headers and initials are stored in a sidecar
+        file ``meta.json``.
+
+        Args:
+            path (String): Path to `HS_P#_S#.mat` file
+            cache_dir (String): Directory containing all cached sessions
+
+        Note:
+            Several processes may convert the same session at once. If
+            replacing the cache fails because another process replaced it
+            with a valid cache, that cache is kept.
+
+        Returns:
+            String, path to cache of session
+    """
+    session = _read_mat_session(path)
+    target = _cache_path(path, cache_dir)
+    try:
+        os.makedirs(cache_dir)
+    except OSError:
+        if not os.path.isdir(cache_dir):
+            raise
+    # Cache is written to a temporary directory first and moved afterwards
+    # so that an interrupted conversion never leaves a valid looking cache.
+    tmp = tempfile.mkdtemp(dir=cache_dir)
+    meta = {
+            'source': _source_stamp(path),
+            'initials': unicode(session['initials']),
+            'subject': int(session['subject']),
+            'session': int(session['session']),
+            'columns': {}
+            }
+    for modality in MODALITIES:
+        frame = session[modality + '_data']
+        np.save(
+                os.path.join(tmp, modality + '_data.npy'),
+                np.ascontiguousarray(frame.values)
+                )
+        meta['columns'][modality] = [unicode(c) for c in frame.columns]
+        meta[modality + '_sr'] = int(session[modality + '_sr'])
+    with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+        json.dump(meta, fh)
+
+    try:
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.rename(tmp, target)
+    except OSError:
+        # Another process converted the same session at the same time
+        shutil.rmtree(tmp, ignore_errors=True)
+        if _read_cache_meta(path, cache_dir) is None:
+            raise
+    return target
+
+
+def _read_cache_meta(path, cache_dir):
+    """ Reads sidecar file of the cache of a session.
+
+        Args:
+            path (String): Path to `HS_P#_S#.mat` file
+            cache_dir (String): Directory containing all cached sessions
+
+        Returns:
+            Dictionary or None if no valid cache exists for ``path``
+    """
+    target = _cache_path(path, cache_dir)
+    try:
+        with open(os.path.join(target, 'meta.json'), 'r') as fh:
+            meta = json.load(fh)
+    except (IOError, ValueError):
+        return None
+    if meta['source'] != _source_stamp(path):
+        return None
+    return meta
+
+
+def update_cache(path, cache_dir):
+    """ Converts a `HS_P#_S#.mat` file unless a valid cache of it exists,
+        see ``convert_session``. Data is not read.
+
+        Args:
+            path (String): Path to `HS_P#_S#.mat` file
+            cache_dir (String): Directory containing all cached sessions
+
+        Returns:
+            String, path to cache of session
+    """
+    if _read_cache_meta(path, cache_dir) is None:
+        return convert_session(path, cache_dir)
+    return _cache_path(path, cache_dir)
+
+
+def _read_cached_session(path, cache_dir):
+    """ Reads a session from its cache. Arrays are memory mapped.
+
+        Args:
+            path (String): Path to `HS_P#_S#.mat` file
+            cache_dir (String): Directory containing all cached sessions
+
+        Returns:
+            Dictionary as described in ``read_session`` or None if no
+            valid cache exists for ``path``
+    """
+    meta = _read_cache_meta(path, cache_dir)
+    if meta is None:
+        return None
+
+    target = _cache_path(path, cache_dir)
+    ret = {}
+    ret['initials'] = meta['initials']
+    ret['subject'] = meta['subject']
+    ret['session'] = meta['session']
+    for modality in MODALITIES:
+        ret[modality + '_data'] = pd.DataFrame(
+                np.load(os.path.join(target, modality + '_data.npy'), mmap_mode='r'),
+                columns=meta['columns'][modality]
+                )
+        ret[modality + '_sr'] = meta[modality + '_sr']
+    return ret
+
+
+def read_session(path, cache_dir=None):
     """ Reads a session from a `HS_P#_S#.mat` file. This type of file contains all data
         of a single lift series (EMG, EEG, Position data, environmental data, miscellaneous
         data)
 
         Args:
             path (String): Path to file containing data
+            cache_dir (String, optional): If set, session is converted to
+                binary arrays stored in this directory on first read (see
+                ``convert_session``). Later reads memory map those arrays.
+                Cache is renewed if the `.mat` file changes.
 
         Returns:
             Dictionary:
@@ -29,65 +249,15 @@ def read_session(path):
                 env_sr --> int (Sampling Rate of environment)
                 misc_data --> pandas.core.DataFrame (Some additional data)
                 misc_sr --> int (Sampling Rate of miscellaneous data)
-    """
 
-    mat = scipy.io.loadmat(path)
-    ret = {}
-    ret['initials'] = mat['hs'][0][0][0][0][0]
-    ret['subject'] = mat['hs'][0][0][1][0][0]
-    ret['session'] = mat['hs'][0][0][2][0][0]
-
-    ret['emg_data'] = pd.DataFrame(mat['hs'][0][0][3][0][0][0])
-    header = []
-    for h in mat['hs'][0][0][3][0][0][1][0]:
-        header.append(h[0])
-    ret['emg_data'].columns = header
-    ret['emg_sr'] = mat['hs'][0][0][3][0][0][2][0][0]
-
-    header = []
-    for h in mat['hs'][0][0][4][0][0][0][0]:
-        header.append(h[0])
-    ret['eeg_data'] = pd.DataFrame(mat['hs'][0][0][4][0][0][1])
-    ret['eeg_data'].columns = header
-    ret['eeg_sr'] = mat['hs'][0][0][4][0][0][2][0][0]
-
-    kin_cols = [
-            'Px1 - position x sensor 1',
-            'Px2 - position x sensor 2',
-            'Px3 - position x sensor 3',
-            'Px4 - position x sensor 4',
-            'Py1 - position y sensor 1',
-            'Py2 - position y sensor 2',
-            'Py3 - position y sensor 3',
-            'Py4 - position y sensor 4',
-            'Pz1 - position z sensor 1',
-            'Pz2 - position z sensor 2',
-            'Pz3 - position z sensor 3',
-            'Pz4 - position z sensor 4'
-            ]
-    header = []
-    for h in mat['hs'][0][0][5][0][0][0][0]:
-        header.append(h[0])
-    ret['kin_data'] = pd.DataFrame(mat['hs'][0][0][5][0][0][1])
-    ret['kin_data'].columns = header
-    ret['kin_data'] = ret['kin_data'].loc[:, kin_cols]
-    ret['kin_sr'] = mat['hs'][0][0][5][0][0][2][0][0]
-
-    header = []
-    for h in mat['hs'][0][0][6][0][0][0][0]:
-        header.append(h[0])
-    ret['env_data'] = pd.DataFrame(mat['hs'][0][0][6][0][0][1])
-    ret['env_data'].columns = header
-    ret['env_sr'] = mat['hs'][0][0][6][0][0][2][0][0]
-
-    header = []
-    for h in mat['hs'][0][0][7][0][0][0][0]:
-        header.append(h[0])
-    ret['misc_data'] = pd.DataFrame(mat['hs'][0][0][7][0][0][1])
-    ret['misc_data'].columns = header
-    ret['misc_sr'] = mat['hs'][0][0][7][0][0][2][0][0]
+            Note:
+                DataFrames read from cache are backed by read-only memory maps.
+    """
+    if cache_dir is None:
+        return _read_mat_session(path)
 
-    return ret
+    update_cache(path, cache_dir)
+    return _read_cached_session(path, cache_dir)
 
 def read_meta_file(path):
     """ Reads a meta file `P3_AllLifts.mat`, parses it and returns content as DataFrame
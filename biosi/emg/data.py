@@ -121,6 +121,8 @@ def align_and_label_recordings(session, target_modality, split=(.5, .25, .25),
                     of longer recording (``recording1`` with 4000Hz, ``recording2`` with
                     500Hz --> align by taking mean over 4 samples of ``recording1``)
                 median: Same as mean.
+                max_abs: Same as mean, takes the maximum of the absolute values.
+                rms: Same as mean, takes the root of the mean of the squares.
                 slice: Align recordings by folding samples into second dimension.
                     With the example from ``mean`` and assuming recording has
                     4 columns. When using split ``recording1`` will have the same
@@ -166,20 +168,16 @@ def align_and_label_recordings(session, target_modality, split=(.5, .25, .25),
         target_done = False
         aligned = {}
         for recording in data_recordings:
-            if alignment_method == 'mean':
-                aligned[recording.identifier] = align_by_mean(
-                        recording,
-                        target_recording
-                        )
-            elif alignment_method == 'median':
-                aligned[recording.identifier] = align_by_median(
+            if alignment_method == 'collapse':
+                aligned[recording.identifier] = align_by_collapse(
                         recording,
                         target_recording
                         )
-            elif alignment_method == 'collapse':
-                aligned[recording.identifier] = align_by_collapse(
+            elif alignment_method in reducers:
+                aligned[recording.identifier] = align(
                         recording,
-                        target_recording
+                        target_recording,
+                        alignment_method
                         )
             else:
                 raise ValueError('Unknown value for keyword "alignment_method" ' + \
@@ -225,136 +223,148 @@ def align_and_label_recordings(session, target_modality, split=(.5, .25, .25),
 
         return (train_X, train_Y, val_X, val_Y, test_X, test_Y)
 
-    def get_min_length(data_sets):
-        """ Returns the size of the smalles data set along the first axis
+def get_min_length(data_sets):
+    """ Returns the size of the smalles data set along the first axis
 
-            Args:
-                data_set (List): List of np.ndarrays or anything with ``.shape``
-                    property
+        Args:
+            data_set (List): List of np.ndarrays or anything with ``.shape``
+                property
 
-            Returns:
-                min_length (int)
-        """
-        min_length = -1
-        for e in data_sets:
-            if min_length == -1:
-                min_length = e.shape[0]
-            elif e.shape[0] < min_length:
-                min_length = e.shape[0]
-        return min_length
-
-    def align_by_mean(to_align, align_on):
-        """ Aligns trials of two recordings by taking the mean.
-
-            Example:
-                If recording ``to_align`` was recorded using 4000Hz and ``align_on``
-                recorded with 500Hz, when the mean over 8 samples of ``to_align``
-                is taken
+        Returns:
+            min_length (int)
+    """
+    min_length = -1
+    for e in data_sets:
+        if min_length == -1:
+            min_length = e.shape[0]
+        elif e.shape[0] < min_length:
+            min_length = e.shape[0]
+    return min_length
+
+def _reduce_mean(blocks):
+    return np.mean(blocks, axis=1)
+
+def _reduce_median(blocks):
+    return np.median(blocks, axis=1)
+
+def _reduce_max_abs(blocks):
+    return np.max(np.abs(blocks), axis=1)
+
+def _reduce_rms(blocks):
+    return np.sqrt(np.mean(np.square(blocks), axis=1))
+
+# Functions reducing an array of shape (steps, n, channels) along the second
+# axis to shape (steps, channels)
+reducers = {
+    'mean': _reduce_mean,
+    'median': _reduce_median,
+    'max_abs': _reduce_max_abs,
+    'rms': _reduce_rms
+}
+
+def align_trials(trials, n, reducer='mean'):
+    """ Reduces each block of ``n`` consecutive samples of trials to one
+        sample. Samples at the end of a trial not filling a whole block are
+        omitted.
+
+        Each trial is reshaped to ``(steps, n, channels)`` (a view for
+        contiguous data) and reduced with one call.
 
-            Args:
-                to_align (model.model.Recording): Recording on which mean should
-                    be applied (needs to have larger sampling rate)
-                align_on (model.model.Recording): Recording to align on
+        Args:
+            trials (List): List of two dimensional numpy.ndarrays
+            n (int): Number of samples to reduce to one
+            reducer (String, optional): Key of ``reducers``
 
-            Returns:
-                List of np.ndarrays
+        Returns:
+            List of np.ndarrays
 
-            Raises:
-                AssertionError if ``to_align`` has smaller sampling rate/frequency
-                than ``align_on''
-        """
-        assert to_align.get_frequency() > align_on.get_frequency(), 'Frequency ' + \
-                'of recording for which first dimension of trials should be ' + \
-                'reduced has higher frequency than recording it should be ' + \
-                'aligned to. {}: {}Hz, {}: {}Hz'.format(
-                        to_align.identifier, to_align.get_frequency(),
-                        align_on.identifier, align_on.get_frequency()
-                        )
-        ret = []
-        arr, n = _get_settings_for_alignment(to_align, align_on)
-        trials = arr.get_trials_as_list(pandas=False)
-        for trial in trials:
-            steps, remainder = divmod(trial.shape[0], n)
-            tmp = np.mean(trial[0:n, :], axis=0)
-
-            for step in range(1, steps):
-                start = step * n
-                stop = (step + 1) * n
-                tmp = np.row_stack([tmp, np.mean(trial[start:stop, :], axis=0)])
-            ret.append(tmp)
-        return ret
-
-    def align_by_median(to_align, align_on):
-        """ Aligns trials of two recordings by taking the median.
-
-            Example:
-                If recording ``to_align`` was recorded using 4000Hz and ``align_on``
-                recorded with 500Hz, when the median over 8 samples of ``to_align``
-                is taken
+        Raises:
+            ValueError if ``reducer`` is unknown
+    """
+    if reducer not in reducers:
+        raise ValueError('Unknown reducer {}, expected one of {}'.format(
+            reducer, reducers.keys()))
+    reduce_blocks = reducers[reducer]
+    ret = []
+    for trial in trials:
+        steps = trial.shape[0] // n
+        blocks = trial[:steps * n].reshape(steps, n, trial.shape[1])
+        ret.append(reduce_blocks(blocks))
+    return ret
 
-            Args:
-                to_align (model.model.Recording): Recording on which median should
-                    be applied (needs to have larger sampling rate)
-                align_on (model.model.Recording): Recording to align on
+def align(to_align, align_on, reducer='mean'):
+    """ Aligns trials of two recordings by reducing blocks of samples of the
+        recording with the higher frequency.
 
-            Returns:
-                List of np.ndarrays
+        Example:
+            If recording ``to_align`` was recorded using 4000Hz and ``align_on``
+            recorded with 500Hz, blocks of 8 samples of ``to_align`` are
+            reduced to one sample
 
-            Raises:
-                AssertionError if ``to_align`` has smaller sampling rate/frequency
-                than ``align_on''
-        """
-        assert to_align.get_frequency() > align_on.get_frequency(), 'Frequency ' + \
-                'of recording for which first dimension of trials should be ' + \
-                'reduced has higher frequency than recording it should be ' + \
-                'aligned to. {}: {}Hz, {}: {}Hz'.format(
-                        to_align.identifier, to_align.get_frequency(),
-                        align_on.identifier, align_on.get_frequency()
-                        )
-        ret = []
-        arr, n = _get_settings_for_alignment(to_align, align_on)
-        trials = arr.get_trials_as_list(pandas=False)
-        for trial in trials:
-            steps, remainder = divmod(trial.shape[0], n)
-            tmp = np.median(trial[0:n, :], axis=0)
-
-            for step in range(1, steps):
-                start = step * n
-                stop = (step + 1) * n
-                tmp = np.row_stack([tmp, np.median(trial[start:stop, :], axis=0)])
-            ret.append(tmp)
-        return ret
-
-    def align_by_collapse(to_align, align_on):
-        """ Given two recordings aligns all trials to have the same first
-            dimension by collapsing rows of the trial recorded with higher
-            frequencies into second dimension.
-
-            If size of first dimension in a trial is not a multiple of
-            ``columns * factor`` trial is cut of. ``factor`` is the ration
-            between frequencies.
-
-            Example:
-                Trial has shape ``(20, 2)``, ``factor=3`` then
-                20 * 2 / (2 * 3) = 40 / 6 = 6 rest 4 --> 4 samples are ommitted
+        Args:
+            to_align (model.model.Recording): Recording on which reducer should
+                be applied (needs to have larger sampling rate)
+            align_on (model.model.Recording): Recording to align on
+            reducer (String, optional): Key of ``reducers``
 
-            Args:
-                to_align (model.model.Recording): First recording to align
-                align_on (model.model.Recording): Second recording to align
+        Returns:
+            List of np.ndarrays
 
-            Returns:
-                List of numpy.ndarray
-        """
-        assert to_align.get_frequency() > align_on.get_frequency(), 'Frequency ' + \
-                'of recording for which first dimension of trials should be ' + \
-                'reduced has higher frequency than recording it should be ' + \
-                'aligned to. {}: {}Hz, {}: {}Hz'.format(
-                        to_align.identifier, to_align.get_frequency(),
+        Raises:
+            AssertionError if ``to_align`` has smaller sampling rate/frequency
+            than ``align_on''
+    """
+    assert to_align.get_frequency() > align_on.get_frequency(), 'Frequency ' + \
+            'of recording for which first dimension of trials should be ' + \
+            'reduced has higher frequency than recording it should be ' + \
+            'aligned to. {}: {}Hz, {}: {}Hz'.format(
+                    to_align.identifier, to_align.get_frequency(),
                     align_on.identifier, align_on.get_frequency()
                     )
+    arr, n = _get_settings_for_alignment(to_align, align_on)
+    trials = [container.data for container in arr.get_data()]
+    return align_trials(trials, n, reducer)
+
+def align_by_mean(to_align, align_on):
+    """ Aligns trials of two recordings by taking the mean. See ``align``.
+    """
+    return align(to_align, align_on, 'mean')
+
+def align_by_median(to_align, align_on):
+    """ Aligns trials of two recordings by taking the median. See ``align``.
+    """
+    return align(to_align, align_on, 'median')
+
+def align_by_collapse(to_align, align_on):
+    """ Given two recordings aligns all trials to have the same first
+        dimension by collapsing rows of the trial recorded with higher
+        frequencies into second dimension.
+
+        If size of first dimension in a trial is not a multiple of
+        ``columns * factor`` trial is cut of. ``factor`` is the ration
+        between frequencies.
+
+        Example:
+            Trial has shape ``(20, 2)``, ``factor=3`` then
+            20 * 2 / (2 * 3) = 40 / 6 = 6 rest 4 --> 4 samples are ommitted
+
+        Args:
+            to_align (model.model.Recording): First recording to align
+            align_on (model.model.Recording): Second recording to align
+
+        Returns:
+            List of numpy.ndarray
+    """
+    assert to_align.get_frequency() > align_on.get_frequency(), 'Frequency ' + \
+            'of recording for which first dimension of trials should be ' + \
+            'reduced has higher frequency than recording it should be ' + \
+            'aligned to. {}: {}Hz, {}: {}Hz'.format(
+                    to_align.identifier, to_align.get_frequency(),
+                align_on.identifier, align_on.get_frequency()
+                )
 
     to_collapse, n = _get_settings_for_alignment(to_align, align_on)
-    trials = to_collapse.get_trials_as_list(pandas=False)
+    trials = [container.data for container in to_collapse.get_data()]
     ret = breze.data.collapse(trials, n)
     return ret
 
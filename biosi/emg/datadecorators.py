@@ -8,15 +8,25 @@
     where the first dimension is the time.
 """
 
+import hashlib
+import json
 import os
+import shutil
 import sys
+import tempfile
 import numpy as np
+import scipy.signal
+from fractions import gcd
 sys.path.insert(0, os.path.dirname(os.path.join(
     os.path.realpath(__file__),
     os.path.pardir
     )))
 from model.model import DataHoldingElement
 from model.model import DataContainer
+from model.model import Experiment
+from model.model import Recording
+from model.model import Session
+from model.model import Trial
 from online.messageclasses import ArrayMessage
 import logging
 
@@ -70,24 +80,77 @@ class SamplingDecorator(AbstractDataDecorator):
             is_iterator (bool): Indicates whether decorator is a generator
                 or returns a list.
             frequency (int): Frequency to which data should be adopted
+            method (String): One of ``methods``. ``block`` takes the mean
+                of blocks when sampling down and repeats samples when
+                sampling up, requiring one frequency to be a multiple of the
+                other. ``polyphase`` resamples by any rational ratio with an
+                anti-aliasing FIR filter. ``auto`` uses ``block`` if possible
+                and ``polyphase`` otherwise.
     """
-    def __init__(self, frequency, data_holding_element, as_iterator=False):
+    methods = ['auto', 'block', 'polyphase']
+    # Filter taps per pair of (up, down) factors, shared between instances
+    _taps = {}
+
+    def __init__(self, frequency, data_holding_element, as_iterator=False,
+            method='auto'):
         """ Initializes object.
             
             Args:
                 frequency (int): Target frequency for data
                 data_holding_element (DataHoldingElement): Data source
                 as_iterator (bool): Whether to act as decorator
+                method (String, optional): Resampling method, see ``methods``
+
+            Raises:
+                ValueError if ``method`` is unknown
         """
         super(SamplingDecorator, self).__init__(data_holding_element, as_iterator)
+        if method not in self.methods:
+            raise ValueError(('SamplingDecorator: Unknown method {}, ' + \
+                    'expected one of {}').format(method, self.methods))
         self._frequency = frequency
+        self._method = method
+
+    @classmethod
+    def taps(cls, up, down):
+        """ Returns coefficients of the anti-aliasing lowpass filter used to
+            resample by ``up / down``. Coefficients are computed once per
+            ratio and cached.
+
+            Args:
+                up (int): Upsampling factor
+                down (int): Downsampling factor
+
+            Returns:
+                numpy.ndarray
+        """
+        key = (up, down)
+        if key not in cls._taps:
+            # Same design scipy.signal.resample_poly uses by default
+            max_rate = max(up, down)
+            cls._taps[key] = scipy.signal.firwin(
+                    2 * 10 * max_rate + 1,
+                    1. / max_rate,
+                    window=('kaiser', 5.0)
+                    )
+        return cls._taps[key]
+
+    def _ratio(self, container):
+        """ Returns factors to resample ``container`` to target frequency
+
+            Args:
+                container (model.model.DataContainer): Container to resample
+
+            Returns:
+                up (int), down (int)
+        """
+        divisor = gcd(int(container.frequency), self._frequency)
+        return self._frequency // divisor, int(container.frequency) // divisor
 
     def _downsample(self, container):
         """ Samples signal down by taking the mean
 
             Args:
-                f_from (int): Sampling-Rate of the data decorator gets from
-                    its ``DataHoldingElement``
                 container (model.model.DataContainer): Container holding data
                     to decorate
 
@@ -116,8 +179,6 @@ class SamplingDecorator(AbstractDataDecorator):
         """ Samples signal up by repeating elements
 
             Args:
-                f_from (int): Sampling-Rate of the data decorator gets from
-                    its ``DataHoldingElement``
                 container (model.model.DataContainer): Container holding data
                     to decorate
 
@@ -127,9 +188,58 @@ class SamplingDecorator(AbstractDataDecorator):
         factor, remainder = divmod(self._frequency, container.frequency)
         assert remainder == 0, 'SamplingDecorator._upsample: SamplingRates are ' + \
             'note multiple of each other. SamplingRates were {} and {}'.format(
-                    self._frequency, f_from)
+                    self._frequency, container.frequency)
         return np.repeat(container.data, factor, axis=0)
 
+    def _polyphase(self, data, up, down, axis=0):
+        """ Resamples data by ``up / down`` with a polyphase filter
+
+            Args:
+                data (numpy.ndarray): Data to resample
+                up (int): Upsampling factor
+                down (int): Downsampling factor
+                axis (int, optional): Time axis of ``data``
+
+            Returns:
+                numpy.ndarray with ``ceil(samples * up / down)`` samples
+        """
+        if up == down:
+            return data
+        return scipy.signal.resample_poly(data, up, down, axis=axis,
+                window=self.taps(up, down))
+
+    def _resample(self, container):
+        """ Resamples data of one container to target frequency
+
+            Args:
+                container (model.model.DataContainer): Container holding data
+                    to decorate
+
+            Returns:
+                numpy.ndarray
+        """
+        up, down = self._ratio(container)
+        if self._method == 'polyphase' or \
+                (self._method == 'auto' and up != 1 and down != 1):
+            return self._polyphase(container.data, up, down)
+        elif down == 1:
+            return self._upsample(container)
+        else:
+            return self._downsample(container)
+
+    def _transform(self, container):
+        """ Resamples one container in place
+
+            Args:
+                container (model.model.DataContainer): Container to resample
+
+            Returns:
+                model.model.DataContainer
+        """
+        container.data = self._resample(container)
+        container.frequency = self._frequency
+        return container
+
     def _iterate(self, data_list):
         """ Loop over data and adapt it. Yield result.
 
@@ -141,17 +251,14 @@ class SamplingDecorator(AbstractDataDecorator):
                 container
         """
         for container in data_list:
-            factor, rest = divmod(container.frequency, self._frequency)
-            if factor == 0:
-                container.data = self._upsample(container)
-            else:
-                container.data = self._downsample(container)
-            container.frequency = self._frequency
-            yield container
+            yield self._transform(container)
 
     def _return(self, data_list):
         """ Loop over all data in ``data_list`` and return result as list.
 
+            Containers resampled with the polyphase filter that have the same
+            frequency and shape are stacked and filtered in one call.
+
             Args:
                 data_list (iterable): List or ``_iterate`` method of another
                     decorator
@@ -159,13 +266,30 @@ class SamplingDecorator(AbstractDataDecorator):
             Returns:
                 List of containers
         """
+        data_list = list(data_list)
+        groups = {}
         for container in data_list:
-            factor, rest = divmod(container.frequency, self._frequency)
-            if factor == 0:
-                container.data = self._upsample(container)
+            up, down = self._ratio(container)
+            if self._method == 'polyphase' or \
+                    (self._method == 'auto' and up != 1 and down != 1):
+                key = (up, down, container.shape)
+                groups.setdefault(key, []).append(container)
             else:
-                container.data = self._downsample(container)
-            container.frequency = self._frequency
+                self._transform(container)
+
+        for (up, down, shape), containers in groups.iteritems():
+            if len(containers) == 1:
+                result = [self._polyphase(containers[0].data, up, down)]
+            else:
+                result = self._polyphase(
+                        np.stack([c.data for c in containers]),
+                        up,
+                        down,
+                        axis=1
+                        )
+            for container, data in zip(containers, result):
+                container.data = data
+                container.frequency = self._frequency
         return data_list
 
     def get_data(self, **kwargs):
@@ -206,18 +330,122 @@ class WindowDecorator(AbstractDataDecorator):
                 or returns a list.
             windowsize (float): Duration of window in seconds
             stride (float): Time between consecutive windows in seconds
+            in_samples (bool): If set ``windowsize`` and ``stride`` are given
+                in samples instead of seconds
+            as_view (bool): If set each trial is returned as one read-only
+                strided view of shape ``(windows, windowsize, channels)``
+                instead of one DataContainer per window
     """
-    def __init__(self, windowsize, data_holding_element, stride=None, as_iterator=False):
+    def __init__(self, windowsize, data_holding_element, stride=None,
+            as_iterator=False, in_samples=False, as_view=False):
         """
             Args:
                 windowsize (float): Size of window in seconds
                 data_holding_element (DataHoldingElement): Data source
                 as_iterator (bool): Whether to act as decorator
                 stride (float): Size of stride in seconds
+                in_samples (bool, optional): Interpret ``windowsize`` and
+                    ``stride`` as number of samples (integer)
+                as_view (bool, optional): Return read-only strided views
+                    on data of each trial instead of DataContainers
+
+            Raises:
+                TypeError if ``in_samples`` is set and ``windowsize`` or
+                ``stride`` are not integer
         """
         super(WindowDecorator, self).__init__(data_holding_element, as_iterator)
+        if in_samples:
+            for value in [windowsize, stride]:
+                if value is not None and int(value) != value:
+                    raise TypeError('WindowDecorator expects integer ' + \
+                            'windowsize and stride if in_samples is set, ' + \
+                            'got {}'.format(value))
         self._windowsize = windowsize
         self._stride = stride
+        self._in_samples = in_samples
+        self._as_view = as_view
+
+    def _to_samples(self, container):
+        """ Returns window size and stride in samples for data in ``container``
+
+            Args:
+                container (model.model.DataContainer): Container to window
+
+            Returns:
+                windowsize (int), stride (int)
+        """
+        if self._in_samples:
+            windowsize = int(self._windowsize)
+            stride = 1 if self._stride is None else int(self._stride)
+        else:
+            # Same conversion from seconds to indices as in
+            # model.model.DataContainer.__getitem__
+            windowsize = int(self._windowsize * container.frequency + 0.001)
+            if self._stride is None:
+                stride = 1
+            else:
+                stride = int(self._stride * container.frequency + 0.001)
+        return windowsize, stride
+
+    def _view(self, container):
+        """ Returns all windows of a container as read-only strided view on
+            its data. No data is copied.
+
+            Args:
+                container (model.model.DataContainer): Container to window
+
+            Returns:
+                numpy.ndarray of shape ``(windows, windowsize, channels)``
+
+            Raises:
+                AssertionError if window size or stride are smaller than
+                one sample
+        """
+        windowsize, stride = self._to_samples(container)
+        assert windowsize > 0 and stride > 0, 'WindowDecorator._view: ' + \
+                'Window size and stride must be at least one sample. Got ' + \
+                '{} and {}'.format(windowsize, stride)
+        data = container.data
+        if data.shape[0] < windowsize:
+            num = 0
+        else:
+            num = (data.shape[0] - windowsize) // stride + 1
+        return np.lib.stride_tricks.as_strided(
+                data,
+                shape=(num, windowsize, data.shape[1]),
+                strides=(data.strides[0] * stride, data.strides[0], data.strides[1]),
+                writeable=False
+                )
+
+    def _iterate_views(self, datalist):
+        """ Yields windows of one trial at a time as strided view
+
+            Args:
+                datalist (iterable): Iterable yielding elements of type
+                    model.model.DataContainer
+
+            Yields:
+                numpy.ndarray
+        """
+        for container in datalist:
+            yield self._view(container)
+
+    def _windows(self, container):
+        """ Yields all windows of a container. Windows are cut by sample index
+            and share memory with ``container``.
+
+            Args:
+                container (model.model.DataContainer): Container to window
+
+            Yields:
+                model.model.DataContainer
+        """
+        windowsize, stride = self._to_samples(container)
+        assert windowsize > 0 and stride > 0, 'WindowDecorator._windows: ' + \
+                'Window size and stride must be at least one sample. Got ' + \
+                '{} and {}'.format(windowsize, stride)
+        for start in range(0, container.samples - windowsize + 1, stride):
+            yield container.slice_samples(start, start + windowsize)
 
     def _iterate(self, datalist):
         """ Returns one window at a time
@@ -229,25 +457,9 @@ class WindowDecorator(AbstractDataDecorator):
             Yields:
                 model.model.DataContainer
         """
-        # use_default_stride is used to determine whether to advance time window
-        # bout only one time step.
-        use_default_stride = False
-        if self._stride is None:
-            use_default_stride = True
-
         for container in datalist:
-            if use_default_stride:
-                self._stride = 1 / container.frequency
-            data = container.data
-            num = 0
-            start = 0
-            stop = self._windowsize
-
-            while stop <= container.duration:
-                yield container[start:stop]
-                num += 1
-                start = self._stride * num
-                stop = self._windowsize + start
+            for window in self._windows(container):
+                yield window
 
     def _return(self, datalist):
         """ Returns one window at a time
@@ -259,24 +471,9 @@ class WindowDecorator(AbstractDataDecorator):
             Returns:
                 List of model.model.DataContainer
         """
-        use_default_stride = False
-        if self._stride is None:
-            use_default_stride = True
-
         result = []
         for container in datalist:
-            if use_default_stride:
-                self._stride = 1 / container.frequency
-            data = container.data
-            num = 0
-            start = 0
-            stop = self._windowsize
-
-            while stop <= container.duration:
-                result.append(container[start:stop])
-                num += 1
-                start = self._stride * num
-                stop = self._windowsize + start
+            result.extend(self._windows(container))
         return result
 
     def get_data(self, **kwargs):
@@ -289,13 +486,19 @@ class WindowDecorator(AbstractDataDecorator):
             Note:
                 If ``windowsize * frequency`` results not in a natural number,
                 value will be truncated. The same goes for stride.
+                If attribute ``as_view`` is set, one read-only array of shape
+                ``(windows, windowsize, channels)`` is returned per trial.
 
             Returns:
                 Iterator or List
         """
         dataelement = self._element.get_data(**kwargs)
 
-        if self._is_iterator:
+        if self._as_view and self._is_iterator:
+            return self._iterate_views(dataelement)
+        elif self._as_view:
+            return [self._view(container) for container in dataelement]
+        elif self._is_iterator:
             return self._iterate(dataelement)
         else:
             return self._return(dataelement)
@@ -310,21 +513,49 @@ class RmsDecorator(AbstractDataDecorator):
             is_iterator (bool): Indicates whether decorator is a generator
                 or returns a list.
             windowsize (float): Duration of window in seconds
+            alignment (String): How filtered values are aligned to the input.
+                One of ``valid``, ``causal`` or ``centred``.
     """
-    def __init__(self, windowsize, data_holding_element, as_iterator=False):
+    alignments = ['valid', 'causal', 'centred']
+    """ Supported alignments of the filtered signal:
+        - valid: Only windows lying completely within the data are returned,
+            i.e. ``samples - windowsize + 1`` values.
+        - causal: Same length as input. Value at time step ``t`` is computed
+            over the window ending at ``t``, data is padded with zeros in
+            front.
+        - centred: Same length as input. Value at time step ``t`` is computed
+            over the window centred at ``t``, data is padded with zeros on
+            both sides.
+    """
+
+    def __init__(self, windowsize, data_holding_element, as_iterator=False,
+            alignment='valid'):
         """ Initializes object
 
             Args:
                 data_holding_element (DataHoldingElement): Data source
                 as_iterator (bool): Whether to act as decorator
                 windowsize (float): Size of window for filtering in seconds.
+                alignment (String, optional): Alignment of filtered values,
+                    see attribute ``alignments``
+
+            Raises:
+                ValueError if ``alignment`` is not supported
         """
         super(RmsDecorator, self).__init__(data_holding_element, as_iterator)
+        if alignment not in self.alignments:
+            raise ValueError(('Unsupported alignment {} for RmsDecorator. ' + \
+                    'Expected one of {}').format(alignment, self.alignments))
         self._windowsize = windowsize
+        self._alignment = alignment
 
     def _rms(self, windowsize, container):
         """ Applies Root-Mean-Square filter to data
 
+            The sum of squares of each window is calculated as difference of
+            the cumulative sum of squares, so the filter is linear in the number
+            of samples and works on all channels at once.
+
             Args:
                 windowsize (int): Size of window in samples
                 container (model.model.DataContainer): Container holding data
@@ -337,26 +568,59 @@ class RmsDecorator(AbstractDataDecorator):
             Returns:
                 numpy.ndarray
         """
-        values = container.data
-        sum_of_squares = np.square(values[:windowsize])
-        filtered = np.sqrt(np.mean(sum_of_squares, axis=0))
-
-        for i in range(windowsize, values.shape[0]):
-            # To make filtering more performant, subtract first element of
-            # previous windows from sum and add next value.
-            # This corresponds to sliding the window one sample but does not
-            # require to calculate the bulk of the window again, since it stays
-            # the same.
-            sum_of_squares = np.subtract(
-                    sum_of_squares,
-                    np.square(values[i - windowsize, :])
-                    )
-            sum_of_squares = np.add(sum_of_squares, np.square(values[i, :]))
-            filtered = np.row_stack((
-                filtered,
-                np.sqrt(np.mean(sum_of_squares, axis=0))
-            ))
-        return filtered
+        assert int(windowsize) == windowsize and windowsize > 0, \
+                'RmsDecorator._rms: windowsize must be a positive integer, ' + \
+                'got {}'.format(windowsize)
+        assert windowsize <= container.samples, ('RmsDecorator._rms: ' + \
+                'windowsize of {} samples larger than number of samples ' + \
+                '({}) in container').format(windowsize, container.samples)
+        windowsize = int(windowsize)
+        values = np.asarray(container.data, dtype=np.float64)
+
+        if self._alignment == 'causal':
+            front, back = windowsize - 1, 0
+        elif self._alignment == 'centred':
+            front = windowsize // 2
+            back = windowsize - 1 - front
+        else:
+            front, back = 0, 0
+
+        # Cumulative sum of squares with a leading row of zeros. Padding with
+        # zeros in front and at the back is equal to repeating the first and
+        # the last row of the cumulative sum.
+        cumsum = np.zeros(
+                (values.shape[0] + front + back + 1, values.shape[1]),
+                dtype=np.float64
+                )
+        np.cumsum(
+                np.square(values),
+                axis=0,
+                out=cumsum[front + 1:front + 1 + values.shape[0]]
+                )
+        if back > 0:
+            cumsum[front + 1 + values.shape[0]:] = cumsum[front + values.shape[0]]
+
+        filtered = cumsum[windowsize:] - cumsum[:-windowsize]
+        # Rounding errors of the cumulative sum might result in slightly
+        # negative values for windows containing only zeros.
+        np.maximum(filtered, 0, out=filtered)
+        filtered /= windowsize
+        return np.sqrt(filtered, out=filtered)
+
+    def _transform(self, container):
+        """ Filters one container in place
+
+            Args:
+                container (model.model.DataContainer): Container to filter
+
+            Returns:
+                model.model.DataContainer
+        """
+        container.data = self._rms(
+                int(self._windowsize * container.frequency),
+                container
+                )
+        return container
 
     def _iterate(self, datalist):
         """ Yields data containers whose data has been filtered
@@ -368,9 +632,7 @@ class RmsDecorator(AbstractDataDecorator):
                 model.model.DataContainer
         """
         for container in datalist:
-            filtered = self._rms(int(self._windowsize * container.frequency), container)
-            container.data = filtered
-            yield container
+            yield self._transform(container)
 
     def _return(self, datalist):
         """ Returns List of data containers whose data has been filtered
@@ -382,8 +644,7 @@ class RmsDecorator(AbstractDataDecorator):
                 List of model.model.DataContainer
         """
         for container in datalist:
-            filtered = self._rms(int(self._windowsize * container.frequency), container)
-            container.data = filtered
+            self._transform(container)
         return datalist
 
     def get_data(self, **kwargs):
@@ -409,6 +670,54 @@ class RmsDecorator(AbstractDataDecorator):
         pass
 
 
+def _to_arrays(datalist):
+    """ Returns data of all elements in ``datalist`` as list of numpy arrays.
+        Elements are either model.model.DataContainer or numpy arrays (e.g.
+        views returned by ``WindowDecorator``). No data is copied.
+
+        Args:
+            datalist (Iterable): Iterable yielding elements of type
+                model.model.DataContainer or numpy.ndarray
+
+        Returns:
+            List of numpy.ndarray
+    """
+    arrays = []
+    for element in datalist:
+        if isinstance(element, np.ndarray):
+            arrays.append(element)
+        else:
+            arrays.append(element.data)
+    return arrays
+
+
+def _allocate(shape, dtype, out=None):
+    """ Allocates array result of an array decorator is written to.
+
+        Args:
+            shape (Tuple): Shape of result
+            dtype (numpy.dtype): Type of result
+            out (numpy.ndarray, String, optional): Either an array (or
+                numpy.memmap) to write result to or path of a ``.npy``
+                file that is created and memory mapped.
+
+        Returns:
+            numpy.ndarray
+
+        Raises:
+            ValueError if ``out`` is an array of wrong shape
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    elif isinstance(out, np.ndarray):
+        if out.shape != shape:
+            raise ValueError(('Shape of out-buffer {} does not match shape ' + \
+                    'of result {}').format(out.shape, shape))
+        return out
+    else:
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+
+
 class ArrayDecorator3D(AbstractDataDecorator):
     """ Represents end point of decorator stack and returns a 3D Array.
         Using iterator Decorator is pointless with this endpoint, since all
@@ -419,14 +728,20 @@ class ArrayDecorator3D(AbstractDataDecorator):
                 ``DataHoldingElement`` or providing function ``get_data``
             is_iterator (bool): Indicates whether decorator is a generator
                 or returns a list.
+            out (numpy.ndarray, String): Array or path to ``.npy`` file
+                result is written to. If not set a new array is created.
     """
-    def __init__(self, iterator):
+    def __init__(self, iterator, out=None):
         """ Initializes object
 
             Args:
                 data_holding_element (DataHoldingElement): Data source
+                out (numpy.ndarray, String, optional): Array or numpy.memmap
+                    of matching shape or path to a ``.npy`` file which is
+                    created as memory map
         """
         super(ArrayDecorator3D, self).__init__(iterator, False)
+        self._out = out
 
     def _iterate(self):
         """ Not implemented for this Class
@@ -435,25 +750,46 @@ class ArrayDecorator3D(AbstractDataDecorator):
                 'for ArrayDecorator')
 
     def _return(self, datalist):
-        """ Creates 3d array and returns it
+        """ Creates 3d array and returns it. Size of the array is determined
+            from all elements first, then array is filled in a single pass.
 
             Args:
                 datalist (Iterable): Iterable yielding elements of type
-                    model.model.DataContainer
+                    model.model.DataContainer or 3D numpy arrays holding
+                    multiple windows
 
             Returns:
                 np.ndarray
+
+            Raises:
+                ValueError if elements do not have the same shape
         """
-        array = None
-        for container in datalist:
-            if array is None:
-                array = container.data[np.newaxis, :, :]
+        arrays = _to_arrays(datalist)
+        if len(arrays) == 0:
+            return None
+        shape = arrays[0].shape[-2:]
+        num = 0
+        for array in arrays:
+            if array.shape[-2:] != shape:
+                raise ValueError(('ArrayDecorator3D: Data has different ' + \
+                        'shapes {} and {}. Use PadzeroDecorator or ' + \
+                        'WindowDecorator').format(shape, array.shape[-2:]))
+            num += array.shape[0] if array.ndim == 3 else 1
+
+        result = _allocate(
+                (num,) + shape,
+                np.result_type(*set([array.dtype for array in arrays])),
+                self._out
+                )
+        start = 0
+        for array in arrays:
+            if array.ndim == 3:
+                result[start:start + array.shape[0]] = array
+                start += array.shape[0]
             else:
-                array = np.concatenate(
-                        (array, container.data[np.newaxis, :, :]),
-                        axis=0
-                        )
-        return array
+                result[start] = array
+                start += 1
+        return result
 
     def get_data(self, **kwargs):
         """ Returns 3D array where first axis is number of trials, second
@@ -482,15 +818,21 @@ class ArrayDecorator2D(AbstractDataDecorator):
                 ``DataHoldingElement`` or providing function ``get_data``
             is_iterator (bool): Indicates whether decorator is a generator
                 or returns a list.
+            out (numpy.ndarray, String): Array or path to ``.npy`` file
+                result is written to. If not set a new array is created.
 
     """
-    def __init__(self, iterator):
+    def __init__(self, iterator, out=None):
         """ Initializes object
 
             Args:
                 data_holding_element (DataHoldingElement): Data source
+                out (numpy.ndarray, String, optional): Array or numpy.memmap
+                    of matching shape or path to a ``.npy`` file which is
+                    created as memory map
         """
         super(ArrayDecorator2D, self).__init__(iterator, False)
+        self._out = out
 
     def _iterate(self):
         """ Not implemented for this Class
@@ -499,7 +841,8 @@ class ArrayDecorator2D(AbstractDataDecorator):
                 'for ArrayDecorator')
 
     def _return(self, datalist):
-        """ Creates 2d array and returns it
+        """ Creates 2d array and returns it. Size of the array is determined
+            from all elements first, then array is filled in a single pass.
 
             Args:
                 datalist (Iterable): Iterable yielding elements of type
@@ -507,14 +850,32 @@ class ArrayDecorator2D(AbstractDataDecorator):
 
             Returns:
                 np.ndarray
+
+            Raises:
+                ValueError if elements have different number of channels
         """
-        array = None
-        for container in datalist:
-            if array is None:
-                array = container.data
-            else:
-                array = np.row_stack((array, container.data))
-        return array
+        arrays = _to_arrays(datalist)
+        if len(arrays) == 0:
+            return None
+        channels = arrays[0].shape[1]
+        num = 0
+        for array in arrays:
+            if array.shape[1] != channels:
+                raise ValueError(('ArrayDecorator2D: Data has different ' + \
+                        'number of channels {} and {}').format(
+                            channels, array.shape[1]))
+            num += array.shape[0]
+
+        result = _allocate(
+                (num, channels),
+                np.result_type(*set([array.dtype for array in arrays])),
+                self._out
+                )
+        start = 0
+        for array in arrays:
+            result[start:start + array.shape[0]] = array
+            start += array.shape[0]
+        return result
 
     def get_data(self, **kwargs):
         """ Returns 2D array where first axis is number of trials, second
@@ -635,6 +996,24 @@ class RectificationDecorator(AbstractDataDecorator):
         """
         super(RectificationDecorator, self).__init__(data_holding_element, as_iterator)
 
+    def _transform(self, container, inplace=False):
+        """ Rectifies one container
+
+            Args:
+                container (model.model.DataContainer): Container to rectify
+                inplace (bool, optional): Overwrite data of container instead
+                    of allocating a new array. Only set this if the data is
+                    not a view on the data of a recording.
+
+            Returns:
+                model.model.DataContainer
+        """
+        if inplace:
+            np.abs(container.data, out=container.data)
+        else:
+            container.data = np.abs(container.data)
+        return container
+
     def _iterate(self, elements):
         """ Yields rettified data
 
@@ -642,8 +1021,7 @@ class RectificationDecorator(AbstractDataDecorator):
                 DataContainer
         """
         for element in elements:
-            element.data = np.abs(element.data)
-            yield element
+            yield self._transform(element)
 
     def _return(self, elements):
         """ Returns List of rectified data
@@ -654,11 +1032,7 @@ class RectificationDecorator(AbstractDataDecorator):
             Returns:
                 List of model.DataContainer
         """
-        ret = []
-        for element in elements:
-            element.data = np.abs(element.data)
-            ret.append(element)
-        return ret
+        return [self._transform(element) for element in elements]
 
     def get_data(self, **kwargs):
         """ Rectifies data. Returns list or iterator depending on
@@ -678,6 +1052,313 @@ class RectificationDecorator(AbstractDataDecorator):
             return self._return(dataelement)
 
 
+class CacheDecorator(AbstractDataDecorator):
+    """ Stores results of the decorators below it on disk and returns them
+        from there if the same data is requested again.
+
+        Entries are addressed by a hash over the parameters of all decorators
+        in the stack, the arguments passed to ``get_data`` and, for every
+        Recording the source of the stack returns data of, its identity,
+        shape, frequency, columns, checksum (see
+        ``model.model.DataContainer.checksum``) and the boundaries of its
+        trials. Data is not read to compute a key, except for the checksum
+        computed once per Recording.
+
+        Each entry is a directory containing all results in one ``.npy``
+        file and their layout in ``meta.json``. Cached results are memory
+        mapped copy-on-write, i.e. they can be modified without changing the
+        cache. If the size of all entries exceeds ``max_size`` the least
+        recently used entries are removed.
+
+        Attributes:
+            element (DataHoldingElement): Element inheriting from
+                ``DataHoldingElement`` or providing function ``get_data``
+            is_iterator (bool): Indicates whether decorator is a generator
+                or returns a list.
+            directory (String): Directory entries are stored in
+            max_size (int): Maximal size of cache in bytes, None for no limit
+            hit (bool): Whether the last call of ``get_data`` was answered
+                from the cache
+
+        Note:
+            Events attached to DataContainers are not cached. The source of
+            the stack has to be an Experiment, Session, Recording or Trial.
+    """
+    # Attributes of decorators not influencing their results
+    _ignored = ['_element', '_is_iterator', '_out', '_directory', '_max_size',
+            '_hit']
+
+    def __init__(self, data_holding_element, directory, max_size=None,
+            as_iterator=False):
+        """ Initializes object
+
+            Args:
+                data_holding_element (DataHoldingElement): Data source
+                directory (String): Directory entries are stored in, created
+                    if it does not exist
+                max_size (int, optional): Maximal size of cache in bytes
+                as_iterator (bool): Whether to act as decorator
+        """
+        super(CacheDecorator, self).__init__(data_holding_element, as_iterator)
+        self._directory = directory
+        self._max_size = max_size
+        self._hit = False
+
+    @property
+    def directory(self):
+        """ Returns directory entries are stored in
+
+            Returns:
+                String
+        """
+        return self._directory
+
+    @property
+    def hit(self):
+        """ Returns whether last call of ``get_data`` was a cache hit
+
+            Returns:
+                bool
+        """
+        return self._hit
+
+    def _parameters(self):
+        """ Returns parameters of all decorators below this one and the
+            source of the stack.
+
+            Returns:
+                List, DataHoldingElement
+        """
+        parameters = []
+        element = self._element
+        while True:
+            # emg.pipeline.Pipeline provides the equivalent decorator stack
+            if not isinstance(element, AbstractDataDecorator) and \
+                    isinstance(getattr(element, 'decorator', None),
+                            AbstractDataDecorator):
+                element = element.decorator
+            if not isinstance(element, AbstractDataDecorator):
+                break
+            attributes = []
+            for name, value in sorted(vars(element).items()):
+                if name not in self._ignored and isinstance(value,
+                        (int, long, float, str, unicode, bool, tuple, list,
+                            type(None))):
+                    attributes.append((name, value))
+            parameters.append((type(element).__name__, attributes))
+            element = element._element
+        return parameters, element
+
+    def key(self, **kwargs):
+        """ Returns key of entry holding the result of ``get_data`` called
+            with ``kwargs``.
+
+            Args:
+                kwargs (Dictionary): Arguments for ``get_data``
+
+            Returns:
+                String
+        """
+        parameters, source = self._parameters()
+        hasher = hashlib.sha1()
+        hasher.update(repr(parameters))
+        hasher.update(repr(sorted(kwargs.items())))
+        for recording, trials in self._recordings(source, **kwargs):
+            data = recording.data
+            hasher.update(repr((
+                recording.session.identifier,
+                recording.identifier,
+                data.data.shape,
+                data.data.dtype.str,
+                data.frequency,
+                list(data.columns),
+                data.checksum(),
+                [(t.identifier, t.start_index, t.stop_index) for t in trials]
+                )))
+        return hasher.hexdigest()
+
+    def _recordings(self, source, **kwargs):
+        """ Returns the Recordings ``source.get_data(**kwargs)`` returns data
+            of, together with the Trials of each Recording.
+
+            Args:
+                source (DataHoldingElement): Source of decorator stack
+                kwargs (Dictionary): Arguments for ``get_data``
+
+            Returns:
+                List of tuples (model.model.Recording, List of
+                model.model.Trial)
+
+            Raises:
+                TypeError if source is not an Experiment, Session, Recording
+                or Trial
+        """
+        if isinstance(source, Trial):
+            return [(source.recording, [source])]
+        if isinstance(source, Recording):
+            recordings = [source]
+        elif isinstance(source, (Experiment, Session)):
+            if isinstance(source, Experiment):
+                sessions = kwargs.get('sessions')
+                if sessions is None:
+                    sessions = source.sessions.keys()
+                sessions = [source.sessions[s] for s in sorted(sessions)]
+            else:
+                sessions = [source]
+            modality = kwargs.get('modality')
+            if modality is not None and not isinstance(modality,
+                    (str, unicode)):
+                modality = modality.identifier
+            recordings = []
+            for session in sessions:
+                recordings.extend([session.recordings[r] for r in
+                    sorted(session.recordings) if modality is None or
+                    session.recordings[r].modality.identifier == modality])
+        else:
+            raise TypeError(('CacheDecorator: Unsupported source {}, ' + \
+                    'expected Experiment, Session, Recording or ' + \
+                    'Trial').format(type(source).__name__))
+        return [(recording, sorted(recording.trials.values(),
+            key=lambda t: (t.start_index, t.stop_index, t.identifier)))
+            for recording in recordings]
+
+    def _write(self, target, results):
+        """ Writes results to a new entry
+
+            Args:
+                target (String): Directory of entry
+                results (numpy.ndarray, List): Result of decorators below
+        """
+        if not os.path.isdir(self._directory):
+            os.makedirs(self._directory)
+        # Entry is written to a temporary directory first and moved
+        # afterwards so that an interrupted write never leaves a valid
+        # looking entry.
+        tmp = tempfile.mkdtemp(dir=self._directory, prefix='.tmp')
+        path = os.path.join(tmp, 'data.npy')
+        if isinstance(results, np.ndarray):
+            meta = {'type': 'array'}
+            np.save(path, results)
+        else:
+            meta = {'type': 'list', 'items': []}
+            arrays = _to_arrays(results)
+            size = sum([array.size for array in arrays])
+            dtype = np.result_type(*set([array.dtype for array in arrays])) \
+                    if len(arrays) > 0 else np.float64
+            data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                    shape=(size,))
+            offset = 0
+            for element, array in zip(results, arrays):
+                data[offset:offset + array.size] = array.reshape(-1)
+                item = {'offset': offset, 'shape': list(array.shape)}
+                if isinstance(element, np.ndarray):
+                    item['kind'] = 'array'
+                else:
+                    item['kind'] = 'container'
+                    item['frequency'] = element.frequency
+                    item['columns'] = [c.item() if isinstance(c, np.generic)
+                            else c for c in element.columns]
+                meta['items'].append(item)
+                offset += array.size
+            del data
+        with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.rename(tmp, target)
+
+    def _read(self, target):
+        """ Reads results from an entry
+
+            Args:
+                target (String): Directory of entry
+
+            Returns:
+                numpy.ndarray or List, None if entry does not exist
+        """
+        try:
+            with open(os.path.join(target, 'meta.json'), 'r') as fh:
+                meta = json.load(fh)
+            data = np.load(os.path.join(target, 'data.npy'), mmap_mode='c')
+        except (IOError, ValueError):
+            return None
+        # Mark entry as recently used
+        os.utime(os.path.join(target, 'meta.json'), None)
+        if meta['type'] == 'array':
+            return data
+
+        results = []
+        for item in meta['items']:
+            size = int(np.prod(item['shape']))
+            array = data[item['offset']:item['offset'] + size] \
+                    .reshape(item['shape'])
+            if item['kind'] == 'array':
+                results.append(array)
+            else:
+                results.append(DataContainer(array, item['frequency'],
+                    item['columns']))
+        return results
+
+    def _size(self, target):
+        """ Returns size of an entry in bytes """
+        return sum([os.path.getsize(os.path.join(target, name))
+            for name in os.listdir(target)])
+
+    def _evict(self, keep=None):
+        """ Removes least recently used entries until the size of the cache
+            is at most ``max_size``.
+
+            Args:
+                keep (String, optional): Key of entry that is not removed
+        """
+        if self._max_size is None:
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self._directory):
+            target = os.path.join(self._directory, name)
+            meta = os.path.join(target, 'meta.json')
+            if name.startswith('.') or not os.path.isfile(meta):
+                continue
+            size = self._size(target)
+            total += size
+            entries.append((os.path.getmtime(meta), name, size))
+        for used, name, size in sorted(entries):
+            if total <= self._max_size:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self._directory, name))
+            total -= size
+
+    def get_data(self, **kwargs):
+        """ Returns results of decorators below from cache if possible,
+            otherwise computes and stores them.
+
+            Args:
+                kwargs (Dictionary): arguments for other methods
+
+            Returns:
+                numpy.ndarray if decorators below return an array, else
+                List or iterator of model.model.DataContainer
+        """
+        key = self.key(**kwargs)
+        target = os.path.join(self._directory, key)
+        results = self._read(target)
+        self._hit = results is not None
+        if results is None:
+            results = self._element.get_data(**kwargs)
+            if not isinstance(results, np.ndarray):
+                results = list(results)
+            self._write(target, results)
+            self._evict(keep=key)
+
+        if self._is_iterator and not isinstance(results, np.ndarray):
+            return iter(results)
+        else:
+            return results
+
+
 class SubscriberDecorator(AbstractDataDecorator):
     """ Wraps an subscriber from package ``online.subscriber`` to use data received
         by subscriber with Decorators
@@ -691,8 +1372,8 @@ class SubscriberDecorator(AbstractDataDecorator):
             Args:
                 subscriber (online.subscriber.Subscriber): Subscriber yielding data
         """
-        super(PadzeroDecorator, self).__init__(None, True)
-        self._subscriber = subscriber 
+        super(SubscriberDecorator, self).__init__(None, True)
+        self._subscriber = subscriber
 
     def get_data(self):
         """ Returns a generator yielding DataContainer obtained from subscriber
@@ -702,10 +1383,11 @@ class SubscriberDecorator(AbstractDataDecorator):
         """
         while True:
             message = self._subscriber.queue.get()
-            parsed = ArrayMessage.deserialize(message)
+            batch = ArrayMessage.deserialize_batch(message)
             self._subscriber.queue.task_done()
-            yield DataContainer.from_array(
-                parsed.data,
-                int(parsed.data.shape[0] / ArrayMessage.duration)
-            )
+            for parsed in batch:
+                frequency = parsed.samplingrate
+                if not frequency:
+                    frequency = int(parsed.data.shape[0] / parsed.duration)
+                yield DataContainer.from_array(parsed.values, frequency)
     
@@ -0,0 +1,478 @@
+""" This module contains a lazy pipeline over the decorators defined in
+    ``emg.datadecorators``.
+
+    A stack of decorators processes data stage by stage: Each decorator
+    requests all trials from the decorator below it, transforms them and
+    hands the complete list (or generator) on. A ``Pipeline`` records the
+    same stack as a chain of stages and executes all stages on one trial
+    before the next trial is requested. Nothing is computed before
+    ``get_data`` is called.
+
+    Example:
+        Both of the following pipelines compute the same array:
+
+        >>> pipeline = Pipeline(experiment).rectify().rms(0.1) \
+                .resample(500).window(0.2, stride=0.1).to_array3d()
+        >>> pipeline = Pipeline.from_decorator(
+                ArrayDecorator3D(
+                    WindowDecorator(0.2,
+                        SamplingDecorator(500,
+                            RmsDecorator(0.1,
+                                RectificationDecorator(experiment)
+                                )
+                            ),
+                        stride=0.1
+                        )
+                    )
+                )
+        >>> X = pipeline.get_data(modality='emg')
+"""
+
+import copy
+import multiprocessing
+import os
+import sys
+import numpy as np
+from multiprocessing.sharedctypes import RawArray
+sys.path.insert(0, os.path.dirname(os.path.join(
+    os.path.realpath(__file__),
+    os.path.pardir
+    )))
+from model.model import DataContainer
+from model.model import DataHoldingElement
+from emg.datadecorators import AbstractDataDecorator
+from emg.datadecorators import ArrayDecorator2D
+from emg.datadecorators import ArrayDecorator3D
+from emg.datadecorators import RectificationDecorator
+from emg.datadecorators import RmsDecorator
+from emg.datadecorators import SamplingDecorator
+from emg.datadecorators import WindowDecorator
+
+
+def _run(container, stages, source, views):
+    """ Executes ``stages`` on one trial
+
+        Args:
+            container (model.model.DataContainer): Trial to process
+            stages (List): Remaining stages
+            source (numpy.ndarray): Data of the trial as returned by the
+                source. Must not be overwritten.
+            views (bool): Whether windows of a final ``WindowDecorator`` are
+                returned as one strided view
+
+        Yields:
+            model.model.DataContainer or, if ``views`` is set, numpy.ndarray
+    """
+    for i, stage in enumerate(stages):
+        if isinstance(stage, WindowDecorator):
+            if i == len(stages) - 1 and views:
+                yield stage._view(container)
+            else:
+                for window in stage._windows(container):
+                    for result in _run(window, stages[i + 1:], source, views):
+                        yield result
+            return
+        elif isinstance(stage, RectificationDecorator):
+            stage._transform(
+                    container,
+                    inplace=not np.may_share_memory(container.data, source)
+                    )
+        else:
+            stage._transform(container)
+    yield container
+
+
+# State of worker processes, set by ``_init_worker``
+_worker = {}
+
+def _init_worker(buffer, dtype, stages, views):
+    """ Initializes worker process of a parallel pipeline
+
+        Args:
+            buffer (multiprocessing.sharedctypes.RawArray): Samples of all
+                trials
+            dtype (numpy.dtype): Type of samples
+            stages (List): Stages of pipeline
+            views (bool): See ``_run``
+    """
+    _worker['data'] = np.frombuffer(buffer, dtype=dtype)
+    _worker['stages'] = stages
+    _worker['views'] = views
+
+def _process_trial(task):
+    """ Executes stages of pipeline on one trial in a worker process
+
+        Args:
+            task (Tuple): Offset of trial in shared buffer, shape, frequency
+                and columns of trial
+
+        Returns:
+            List of results, see ``_run``
+    """
+    offset, shape, frequency, columns = task
+    source = _worker['data'][offset:offset + shape[0] * shape[1]].reshape(shape)
+    container = DataContainer(source, frequency, columns)
+    results = []
+    for result in _run(container, _worker['stages'], source, _worker['views']):
+        if isinstance(result, np.ndarray):
+            result = np.array(result)
+        results.append(result)
+    return results
+
+
+class Pipeline(DataHoldingElement):
+    """ Lazily evaluated chain of decorators processing one trial at a time.
+
+        Decorators that work on single trials (rectification, RMS,
+        resampling and windowing) are executed as stages of the pipeline.
+        When the chain is built the stages are fused:
+
+        - Rectification directly followed by RMS is dropped, since squaring
+          removes the sign anyway.
+        - Rectification of data not shared with a recording is done in
+          place.
+        - If the terminal decorator is an ``ArrayDecorator3D``, windows are
+          passed on as strided views and copied only once into the result.
+
+        Intermediate results of a trial are released before the next trial
+        is processed. Elements of the chain which are no such stage, e.g.
+        ``PadzeroDecorator``, are treated as source of the pipeline.
+
+        If ``processes`` is not one, trials are distributed over a process
+        pool. The samples of all trials are copied once into shared memory
+        the workers read from, only the results are sent back. Results are
+        returned in the order of the trials.
+
+        Attributes:
+            source (model.model.DataHoldingElement): Element providing
+                the trials
+            stages (List): Decorators executed for each trial, in order
+            terminal (AbstractDataDecorator): Array decorator assembling the
+                result, None if list of containers is returned
+            decorator (AbstractDataDecorator): Equivalent (eager) stack of
+                decorators
+            processes (int): Number of worker processes, None for one per
+                CPU
+    """
+    stage_types = (
+            RectificationDecorator,
+            RmsDecorator,
+            SamplingDecorator,
+            WindowDecorator
+            )
+    terminal_types = (ArrayDecorator2D, ArrayDecorator3D)
+
+    def __init__(self, source, as_iterator=False, processes=1):
+        """ Initializes object
+
+            Args:
+                source (model.model.DataHoldingElement): Element providing
+                    the trials, e.g. an experiment
+                as_iterator (bool, optional): If set and no terminal array
+                    decorator is given, ``get_data`` returns a generator
+                processes (int, optional): Maximal number of worker
+                    processes. One processes trials in this process, None
+                    uses one worker per CPU.
+
+            Raises:
+                ValueError if ``processes`` is smaller than one
+        """
+        super(Pipeline, self).__init__()
+        if processes is not None and processes < 1:
+            raise ValueError('Pipeline: processes must be at least one, ' + \
+                    'got {}'.format(processes))
+        self._source = source
+        self._stages = []
+        self._terminal = None
+        self._decorator = source
+        self._is_iterator = as_iterator
+        self._processes = processes
+
+    @classmethod
+    def from_decorator(cls, decorator, as_iterator=False, processes=1):
+        """ Alternative constructor, records an existing stack of decorators
+            as pipeline.
+
+            Args:
+                decorator (AbstractDataDecorator): Top most decorator of stack
+                as_iterator (bool, optional): See ``__init__``
+                processes (int, optional): See ``__init__``
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        terminal = None
+        element = decorator
+        if isinstance(element, cls.terminal_types):
+            terminal = element
+            element = element._element
+
+        stages = []
+        while isinstance(element, cls.stage_types):
+            stages.insert(0, element)
+            element = element._element
+
+        pipeline = cls(element, as_iterator, processes)
+        for stage in stages:
+            pipeline._add(stage)
+        if terminal is not None:
+            pipeline._set_terminal(terminal)
+        pipeline._decorator = decorator
+        return pipeline
+
+    @property
+    def source(self):
+        """ Returns element providing the trials
+
+            Returns:
+                model.model.DataHoldingElement
+        """
+        return self._source
+
+    @property
+    def stages(self):
+        """ Returns stages in the order they are executed, after fusion
+
+            Returns:
+                List of AbstractDataDecorator
+        """
+        return self._fuse(self._stages)
+
+    @property
+    def terminal(self):
+        """ Returns array decorator assembling the result
+
+            Returns:
+                AbstractDataDecorator
+        """
+        return self._terminal
+
+    @property
+    def processes(self):
+        """ Returns maximal number of worker processes
+
+            Returns:
+                int
+        """
+        return self._processes
+
+    @property
+    def decorator(self):
+        """ Returns stack of decorators equivalent to this pipeline
+
+            Returns:
+                AbstractDataDecorator
+        """
+        return self._decorator
+
+    def _add(self, stage):
+        """ Appends a stage to the pipeline
+
+            Args:
+                stage (AbstractDataDecorator): Decorator working on single
+                    trials
+
+            Returns:
+                emg.pipeline.Pipeline
+
+            Raises:
+                ValueError if terminal decorator has already been added
+        """
+        if self._terminal is not None:
+            raise ValueError('Pipeline: Cannot add stage after terminal ' + \
+                    'array decorator')
+        self._stages.append(stage)
+        self._decorator = stage
+        return self
+
+    def _set_terminal(self, terminal):
+        """ Sets array decorator assembling the result
+
+            Args:
+                terminal (AbstractDataDecorator): ArrayDecorator2D or
+                    ArrayDecorator3D
+
+            Returns:
+                emg.pipeline.Pipeline
+
+            Raises:
+                ValueError if terminal decorator has already been added
+        """
+        if self._terminal is not None:
+            raise ValueError('Pipeline: Terminal array decorator already set')
+        self._terminal = terminal
+        self._decorator = terminal
+        return self
+
+    def rectify(self):
+        """ Appends ``RectificationDecorator``
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._add(RectificationDecorator(self._decorator))
+
+    def rms(self, windowsize, alignment='valid'):
+        """ Appends ``RmsDecorator``. See ``RmsDecorator`` for arguments.
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._add(RmsDecorator(windowsize, self._decorator,
+            alignment=alignment))
+
+    def resample(self, frequency, method='auto'):
+        """ Appends ``SamplingDecorator``. See ``SamplingDecorator`` for
+            arguments.
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._add(SamplingDecorator(frequency, self._decorator,
+            method=method))
+
+    def window(self, windowsize, stride=None, in_samples=False):
+        """ Appends ``WindowDecorator``. See ``WindowDecorator`` for
+            arguments.
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._add(WindowDecorator(windowsize, self._decorator,
+            stride=stride, in_samples=in_samples))
+
+    def to_array3d(self, out=None):
+        """ Terminates pipeline with ``ArrayDecorator3D``
+
+            Args:
+                out (numpy.ndarray, String, optional): See ``ArrayDecorator3D``
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._set_terminal(ArrayDecorator3D(self._decorator, out))
+
+    def to_array2d(self, out=None):
+        """ Terminates pipeline with ``ArrayDecorator2D``
+
+            Args:
+                out (numpy.ndarray, String, optional): See ``ArrayDecorator2D``
+
+            Returns:
+                emg.pipeline.Pipeline
+        """
+        return self._set_terminal(ArrayDecorator2D(self._decorator, out))
+
+    def _fuse(self, stages):
+        """ Returns stages with rectifications removed that are directly
+            followed by RMS filtering or another rectification.
+
+            Args:
+                stages (List): Stages of pipeline
+
+            Returns:
+                List
+        """
+        fused = []
+        for stage in reversed(stages):
+            if isinstance(stage, RectificationDecorator) and len(fused) > 0 \
+                    and isinstance(fused[0], (RectificationDecorator, RmsDecorator)):
+                continue
+            fused.insert(0, stage)
+        return fused
+
+    def _iterate(self, datalist):
+        """ Processes one trial after another
+
+            Args:
+                datalist (Iterable): Trials returned by source
+
+            Yields:
+                model.model.DataContainer or numpy.ndarray
+        """
+        stages = self.stages
+        views = isinstance(self._terminal, ArrayDecorator3D)
+        for container in datalist:
+            for result in _run(container, stages, container.data, views):
+                yield result
+
+    def _iterate_parallel(self, datalist):
+        """ Processes trials in a pool of worker processes
+
+            Args:
+                datalist (Iterable): Trials returned by source
+
+            Returns:
+                List of model.model.DataContainer or numpy.ndarray
+        """
+        datalist = list(datalist)
+        if len(datalist) == 0:
+            return []
+        dtype = np.result_type(*set([c.data.dtype for c in datalist]))
+        buffer = RawArray('b', sum([c.data.size for c in datalist]) * dtype.itemsize)
+        shared = np.frombuffer(buffer, dtype=dtype)
+        tasks = []
+        offset = 0
+        for container in datalist:
+            shape = container.data.shape
+            shared[offset:offset + container.data.size].reshape(shape)[:] = \
+                    container.data
+            tasks.append((offset, shape, container.frequency, container.columns))
+            offset += container.data.size
+
+        # Stages are sent to workers without the decorators below them
+        stages = []
+        for stage in self.stages:
+            stage = copy.copy(stage)
+            stage._element = None
+            stages.append(stage)
+
+        processes = self._processes
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        processes = min(processes, len(tasks))
+        pool = multiprocessing.Pool(
+                processes=processes,
+                initializer=_init_worker,
+                initargs=(
+                    buffer,
+                    dtype,
+                    stages,
+                    isinstance(self._terminal, ArrayDecorator3D)
+                    )
+                )
+        try:
+            chunksize = max(1, len(tasks) // (4 * processes))
+            results = []
+            for result in pool.imap(_process_trial, tasks, chunksize):
+                results.extend(result)
+        finally:
+            pool.close()
+            pool.join()
+        return results
+
+    def get_data(self, **kwargs):
+        """ Executes pipeline.
+
+            Args:
+                kwargs (Dictionary): Arguments passed to ``get_data`` of source
+
+            Note:
+                If trials are processed in parallel, all results are
+                collected before they are returned, also if ``as_iterator``
+                is set.
+
+            Returns:
+                numpy.ndarray if a terminal array decorator is set, else
+                List or iterator of model.model.DataContainer
+        """
+        if self._processes == 1:
+            results = self._iterate(self._source.get_data(**kwargs))
+        else:
+            results = self._iterate_parallel(self._source.get_data(**kwargs))
+        if self._terminal is not None:
+            return self._terminal._return(results)
+        elif self._is_iterator:
+            return results
+        else:
+            return list(results)
@@ -2,13 +2,18 @@ import model
 import numpy as np
 import pandas as pd
 import warnings
+import logging
+import multiprocessing
+import time
 import sys
 import os
 sys.path.insert(0, os.path.join(
     os.path.dirname(os.path.realpath(os.path.join(__file__, os.path.pardir))),
     'emg'
     ))
+sys.path.insert(0, os.path.dirname(os.path.realpath(os.path.join(__file__, os.path.pardir))))
 import emg.data
+import data.wayeeggal as wayeeggal
 
 def create_kb(data = None):
     if data is None:
@@ -439,6 +444,147 @@ def sport_kb():
     model.Trial(rec, 52, 4, 'max_extensor')
     return experiment
 
+WEIGHTS = {1: '165g', 2: '330g', 4: '660g'}
+""" Mapping of weight codes in WAY-EEG-GAL meta files to weights """
+
+SURFACES = {1: 'sandpaper', 2: 'suede', 3: 'silk'}
+""" Mapping of surface codes in WAY-EEG-GAL meta files to surfaces """
+
+
+def _prepare_meta(meta):
+    """ Shifts all times and durations of a WAY-EEG-GAL meta file by the
+        2.002s lead time of the recordings.
+
+        Args:
+            meta (pandas.core.DataFrame): Meta information to sessions
+
+        Returns:
+            pandas.core.DataFrame
+    """
+    cols = [col for col in meta.columns if col.startswith('t') or col.startswith('Dur_')]
+    meta.loc[:,cols] = meta.loc[:, cols] - 2.002
+    return meta
+
+
+def _create_emg_eeg_setup(exp, session):
+    """ Creates Setup with EMG, EEG and kinematic Modalities and their channels
+        from the data of one session.
+
+        Args:
+            exp (emgframework.model.model.Experiment): Experiment setup belongs to
+            session (Dictionary): Data of one session
+
+        Returns:
+            emgframework.model.model.Setup
+    """
+    setup = model.Setup(exp)
+    mod_emg = model.Modality(setup, session['emg_sr'], 'emg')
+    mod_emg.add_channels(session['emg_data'].columns)
+    mod_eeg = model.Modality(setup, session['eeg_sr'], 'eeg')
+    mod_eeg.add_channels(session['eeg_data'].columns)
+    mod_kin = model.Modality(setup, session['kin_sr'], 'kin')
+    mod_kin.add_channels([c for c in session['kin_data'].columns
+        if c in wayeeggal.KIN_COLUMNS])
+    return setup
+
+
+def _add_emg_eeg_session(exp, setup, subj, meta, session, markers=None):
+    """ Adds one session with EMG, EEG and kinematic Recordings and the
+        Trials defined in the meta file to an Experiment.
+
+        Args:
+            exp (emgframework.model.model.Experiment): Experiment to extend
+            setup (emgframework.model.model.Setup): Setup of session
+            subj (emgframework.model.model.Subject): Subject of session
+            meta (pandas.core.DataFrame): Meta information to sessions
+            session (Dictionary): Data of one session
+            markers (List, optional): Columns of meta file added as events
+
+        Returns:
+            emgframework.model.model.Session
+    """
+    mod_emg = setup.modalities['emg']
+    mod_eeg = setup.modalities['eeg']
+    mod_kin = setup.modalities['kin']
+    # Select data of from metadata belonging to in `session` specified session
+    meta_session = meta.loc[meta.loc[:, 'Run'] == session['session'], :]
+    meta_session.reset_index(inplace=True)
+    sess = model.Session(exp, setup, subj, 'session_' + str(session['session']))
+    # Creating Recordings
+    # ----------------------------------------------------------------------------------
+    rec_emg = model.Recording(
+            sess,
+            mod_emg,
+            data=session['emg_data'],
+            identifier='emg_data'
+        )
+    rec_eeg = model.Recording(
+            sess,
+            mod_eeg,
+            data=session['eeg_data'],
+            identifier='eeg_data'
+        )
+    rec_kin = model.Recording(
+            sess,
+            mod_kin,
+            data=session['kin_data'].loc[:, mod_kin.channel_order],
+            identifier='kin_data'
+            )
+
+    # Creating Trials
+    # ----------------------------------------------------------------------------------
+    emg_duration = float(session['emg_data'].shape[0]) / session['emg_sr']
+    for i in range(meta_session.shape[0]):
+        start = meta_session.loc[i, 'StartTime']
+        if i == meta_session.shape[0] - 1:
+            duration = emg_duration - meta_session.loc[i, 'StartTime']
+        else:
+            duration = meta_session.loc[i + 1, 'StartTime'] - meta_session.loc[i, 'StartTime']
+
+        if (start + duration) * session['emg_sr'] > session['emg_data'].shape[0]:
+            warning = (
+                    'WARNING - EMG data does not contain enough data points. Has ' +
+                    '{samples:d} data points but {needed:d} are required. Skipped ' +
+                    'Lift {lift:d}'
+                ).format(
+                        samples = session['emg_data'].shape[0],
+                        needed = int((start + duration) * session['emg_sr']),
+                        lift = i
+                    )
+            warnings.warn(warning)
+            continue
+
+        if (start + duration) *session['eeg_sr'] > session['eeg_data'].shape[0]:
+            warning = (
+                    'WARNING - EEG data does not contain enough data points. Has ' +
+                    '{samples:d} data points but {needed:d} are required. Skipped ' +
+                    'Lift {lift:d}'
+                ).format(
+                        samples = session['eeg_data'].shape[0],
+                        needed = int((start + duration) * session['eeg_sr']),
+                        lift = i
+                    )
+            warnings.warn(warning)
+            continue
+
+        label = WEIGHTS[meta_session.loc[i, 'CurW']]# + '_' + SURFACES[meta_session.loc[i, 'CurS']]
+        trials = []
+        for recording, prefix in [(rec_emg, 'emg'), (rec_eeg, 'eeg'), (rec_kin, 'kin')]:
+            trials.append(model.Trial(
+                    recording=recording,
+                    start=start,
+                    duration=duration,
+                    identifier=prefix + '_lift' + str(i),
+                    label=label
+                ))
+
+        if markers is not None:
+            for marker in markers:
+                for trial in trials:
+                    trial.add_event(marker, meta_session.loc[i, marker])
+    return sess
+
+
 def create_emg_eeg_kb(meta, sessions, markers=None):
     """ Builds an `emgframework.model.model.Experiment` using information extracted from
         `P#_AllLifts.mat` and data extracted from `HS_P#_S#.mat`.
@@ -452,142 +598,101 @@ def create_emg_eeg_kb(meta, sessions, markers=None):
         Returns:
             emgframework.model.model.Experiment
     """
-    cols = [col for col in meta.columns if col.startswith('t') or col.startswith('Dur_')]
-    meta.loc[:,cols] = meta.loc[:, cols] - 2.002
-    # Define mapping for weights and surface
-    weights = {}
-    weights[1] = '165g'
-    weights[2] = '330g'
-    weights[4] = '660g'
-    surface = {}
-    surface[1] = 'sandpaper'
-    surface[2] = 'suede'
-    surface[3] = 'silk'
+    meta = _prepare_meta(meta)
 
     # Create Experiment
     # ==================================================================================
     exp = model.Experiment()
     subj = model.Subject(sessions[0]['initials'])
+    exp.put_subject(subj)
 
     # Creating Setup and Modalities
     # ==================================================================================
-    setup = model.Setup(exp)
-    kin_cols = [
-            'Px1 - position x sensor 1',
-            'Px2 - position x sensor 2',
-            'Px3 - position x sensor 3',
-            'Px4 - position x sensor 4',
-            'Py1 - position y sensor 1',
-            'Py2 - position y sensor 2',
-            'Py3 - position y sensor 3',
-            'Py4 - position y sensor 4',
-            'Pz1 - position z sensor 1',
-            'Pz2 - position z sensor 2',
-            'Pz3 - position z sensor 3',
-            'Pz4 - position z sensor 4'
-            ]
-    mod_emg = model.Modality(setup, sessions[0]['emg_sr'], 'emg')
-    for s in sessions[0]['emg_data'].columns:
-        model.Sample(mod_emg, s)
-    mod_eeg = model.Modality(setup, sessions[0]['eeg_sr'], 'eeg')
-    for s in sessions[0]['eeg_data'].columns:
-        model.Sample(mod_eeg, s)
-    mod_kin = model.Modality(setup, sessions[0]['kin_sr'], 'kin')
-    for s in sessions[0]['kin_data'].columns:
-        if s in kin_cols:
-            model.Sample(mod_kin, s)
+    setup = _create_emg_eeg_setup(exp, sessions[0])
 
     # Creating Session, Recordings and Trials
     # ==================================================================================
     for session in sessions:
-        # Select data of from metadata belonging to in `session` specified session
-        meta_session = meta.loc[meta.loc[:, 'Run'] == session['session'], :]
-        meta_session.reset_index(inplace=True)
-        sess = model.Session(exp, setup, subj, 'session_' + str(session['session']))
-        # Creating Recordings
-        # ----------------------------------------------------------------------------------
-        rec_emg = model.Recording(
-                sess,
-                data=session['emg_data'],
-                identifier='emg_data',
-                modality = mod_emg.Identifier
-            )
-        rec_eeg = model.Recording(
-                sess,
-                data=session['eeg_data'],
-                identifier='eeg_data',
-                modality = mod_eeg.Identifier
-            )
-        rec_kin = model.Recording(
-                sess,
-                data=session['kin_data'].loc[:, kin_cols],
-                identifier='kin_data',
-                modality = mod_kin.Identifier
-                )
+        _add_emg_eeg_session(exp, setup, subj, meta, session, markers)
+    return exp
 
-        # Creating Trials
-        # ----------------------------------------------------------------------------------
-        for i in range(meta_session.shape[0]):
-            start = meta_session.loc[i, 'StartTime']
-            if i == meta_session.shape[0] - 1:
-                duration = float(session['emg_data'].shape[0])/4000. - meta_session.loc[i, 'StartTime']
-            else:
-                duration = meta_session.loc[i + 1, 'StartTime'] - meta_session.loc[i, 'StartTime']
-
-            if (start + duration) * session['emg_sr'] > session['emg_data'].shape[0]:
-                warning = (
-                        'WARNING - EMG data does not contain enough data points. Has ' +
-                        '{samples:d} data points but {needed:d} are required. Skipped ' +
-                        'Lift {lift:d}'
-                    ).format(
-                            samples = session['emg_data'].shape[0],
-                            needed = int((start + duration) * session['emg_sr']),
-                            lift = i
-                        )
-                warnings.warn(warning)
-                continue
-
-            if (start + duration) *session['eeg_sr'] > session['eeg_data'].shape[0]:
-                warning = (
-                        'WARNING - EEG data does not contain enough data points. Has ' +
-                        '{samples:d} data points but {needed:d} are required. Skipped ' +
-                        'Lift {lift:d}'
-                    ).format(
-                            samples = session['eeg_data'].shape[0],
-                            needed = int((start + duration) * session['eeg_sr']),
-                            lift = i
-                        )
-                warnings.warn(warning)
-                continue
-
-            t_emg = model.Trial(
-                    recording=rec_emg,
-                    start=start,
-                    duration=duration,
-                    identifier =  'emg_lift' + str(i),
-                    label = weights[meta_session.loc[i, 'CurW']]# + '_' + surface[meta_session.loc[i, 'CurS']]
-                )
-            t_eeg = model.Trial(
-                    recording=rec_eeg,
-                    start=start,
-                    duration=duration,
-                    identifier =  'eeg_lift' + str(i),
-                    label = weights[meta_session.loc[i, 'CurW']]# + '_' + surface[meta_session.loc[i, 'CurS']]
-                )
-            t_kin = model.Trial(
-                    recording=rec_kin,
-                    start=start,
-                    duration=duration,
-                    identifier =  'kin_lift' + str(i),
-                    label = weights[meta_session.loc[i, 'CurW']]# + '_' + surface[meta_session.loc[i, 'CurS']]
-                )
 
-            if markers is not None:
-                for marker in markers:
-                    t_emg.add_marker((meta_session.loc[i, marker], marker))
-                    t_eeg.add_marker((meta_session.loc[i, marker], marker))
-                    t_kin.add_marker((meta_session.loc[i, marker], marker))
-    return exp
+def _update_cache(args):
+    """ Converts one session to its cache unless a valid cache exists,
+        executed in worker processes of ``build_emg_eeg_kb``. Only the path
+        is returned, data is memory mapped by the parent process instead of
+        being pickled.
+
+        Args:
+            args (Tuple): Path to `HS_P#_S#.mat` file and cache directory
+
+        Returns:
+            path (String), seconds needed (float)
+    """
+    path, cache_dir = args
+    start = time.time()
+    wayeeggal.update_cache(path, cache_dir)
+    return path, time.time() - start
+
+
+def build_emg_eeg_kb(meta_path, session_paths, cache_dir, markers=None,
+        processes=None):
+    """ Builds an `emgframework.model.model.Experiment` like ``create_emg_eeg_kb``
+        but reads the meta file and the sessions itself. Sessions are
+        converted to binary arrays in a pool of processes (see
+        ``data.wayeeggal.convert_session``), memory mapped and added to the
+        Experiment as they arrive.
+
+        Args:
+            meta_path (String): Path to `P#_AllLifts.mat`
+            session_paths (List): Paths to `HS_P#_S#.mat` files
+            cache_dir (String): Directory with cached sessions, see
+                ``data.wayeeggal.read_session``
+            markers (List, optional): Columns of meta file added as events
+            processes (int, optional): Number of worker processes. Defaults
+                to number of CPUs
+
+        Note:
+            Sessions are added in the order they finish loading, not in the
+            order of ``session_paths``.
+            Recordings of the returned Experiment memory map files in
+            ``cache_dir``, which must not be removed while the Experiment
+            is in use.
+
+        Returns:
+            emgframework.model.model.Experiment, Dictionary mapping each
+            session path to the seconds needed for loading (``load``) and
+            building Recordings and Trials (``build``)
+    """
+    meta = _prepare_meta(wayeeggal.read_meta_file(meta_path))
+    exp = model.Experiment()
+    setup = None
+    subj = None
+    timings = {}
+
+    pool = multiprocessing.Pool(processes=processes)
+    try:
+        results = pool.imap_unordered(
+                _update_cache,
+                [(path, cache_dir) for path in session_paths]
+                )
+        for path, load_time in results:
+            start = time.time()
+            session = wayeeggal.read_session(path, cache_dir)
+            load_time += time.time() - start
+            start = time.time()
+            if setup is None:
+                subj = model.Subject(session['initials'])
+                exp.put_subject(subj)
+                setup = _create_emg_eeg_setup(exp, session)
+            _add_emg_eeg_session(exp, setup, subj, meta, session, markers)
+            timings[path] = {'load': load_time, 'build': time.time() - start}
+            logging.info('Session {} loaded in {:.2f}s, built in {:.2f}s'.format(
+                path, load_time, timings[path]['build']))
+    finally:
+        pool.close()
+        pool.join()
+    return exp, timings
 
 def create_kb_for_testing():
     experiment = model.Experiment()
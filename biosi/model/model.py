@@ -101,33 +101,87 @@
 
 import numpy as np
 import pandas as pd
+import os
+import re
+import struct
 import sys
 import cPickle as pkl
 import warnings
+import hashlib
 import logging
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
 from math import isnan
 logging.basicConfig(level=logging.DEBUG)
 
+
+def to_index(seconds, frequency):
+    """ Converts a point in time to the index of the respective sample.
+
+        Args:
+            seconds (float): Point in time in seconds
+            frequency (int): Sampling rate
+
+        Returns:
+            int
+    """
+    # Add this constant bc python seems to be numerically unstable here and
+    # sometimes subtracts one element
+    return int(seconds * frequency + 0.001)
+
+
 class DataContainer(object):
-    """ Wrapper for a pandas.core.DataFrame to support additional
-        functionality.
+    """ Holds the data of a recording, trial or window as two dimensional
+        numpy array together with the names of its columns.
+
+        A pandas.core.DataFrame of the data is only created if attribute
+        ``dataframe`` is accessed. The frame shares memory with the array.
 
         Attributes:
-            dataframe (pandas.DataFrame): Holds data
+            data (numpy.ndarray): Holds data, samples on first axis
+            columns (pandas.Index): Names of columns
+            dataframe (pandas.DataFrame): Data as frame, built on first access
             frequency (int): Samplingrate of data
             events (List): List of events associated with data
     """
 
-    def __init__(self, dataframe, frequency):
+    def __init__(self, data, frequency, columns=None):
         """ Initialises object. For alternative constuctors see classemthods
 
             Args:
-                dataframe (pandas.core.DataFrame): Frame containing data
+                data (numpy.ndarray, pandas.core.DataFrame): Two dimensional
+                    array or frame containing data
                 frequency (int): Sampling-Rate with which data was recorded
+                columns (List, optional): Names of columns. If not set names
+                    of frame or the positions of the columns are used
+
+            Raises:
+                AssertionError if data is not two dimensional or number of
+                    columns does not match second dimension of data
         """
-        self._dataframe = dataframe
+        if isinstance(data, pd.DataFrame):
+            if columns is None:
+                columns = data.columns
+            data = data.values
+        else:
+            data = np.asarray(data)
+        assert data.ndim == 2, 'model.model.DataContainer: Data must have ' + \
+                'two dimensions, {} dimensions given'.format(data.ndim)
+        if columns is None:
+            columns = pd.RangeIndex(data.shape[1])
+        elif not isinstance(columns, pd.Index):
+            columns = pd.Index(columns)
+        assert columns.size == data.shape[1], ('model.model.DataContainer: ' + \
+                'Got {} column names for {} columns').format(
+                        columns.size, data.shape[1])
+        self._data = data
+        self._columns = columns
+        self._dataframe = None
         self._frequency = frequency
         self._events = None
+        self._checksum = None
 
     @classmethod
     def from_array(cls, array, frequency, columns=None):
@@ -141,19 +195,16 @@ class DataContainer(object):
             Returns:
                 model.model.DataContainer
         """
-        df = pd.DataFrame(array)
-        if columns is not None:
-            df.columns = columns
-        return DataContainer(df, frequency)
+        return DataContainer(array, frequency, columns)
 
     @property
     def columns(self):
         """ Returns headers of data
 
             Returns:
-                List
+                pandas.Index
         """
-        return self._dataframe.columns
+        return self._columns
 
     @property
     def data(self):
@@ -162,12 +213,12 @@ class DataContainer(object):
             Returns:
                 numpy.ndarray
         """
-        return self._dataframe.values
+        return self._data
 
     @data.setter
     def data(self, values):
-        """ Sets data of wrapped pandas.core.DataFrame. Requires values to have
-            the same dimension on the second axis as original values
+        """ Sets data of container. Requires values to have the same dimension
+            on the second axis as original values
 
             Args:
                 values (np.ndarray): New values
@@ -179,19 +230,28 @@ class DataContainer(object):
                 'Argument ``values`` has wrong number of dimensions. ' + \
                 'Two dimensions are expected, {} dimensions are received'.format(
                      values.ndim)
-        assert values.shape[1] == self.dataframe.shape[1], 'model.model.' + \
+        assert values.shape[1] == self._data.shape[1], ('model.model.' + \
                 'DataContainer.data (setter): Second axis has wrong number of' + \
-                'dimensions. Expcted are {}, received are {}'.format(
-                        self.dataframe.shape[1], values.shape[1])
-        self._dataframe = pd.DataFrame(values, columns=self.dataframe.columns)
+                'dimensions. Expcted are {}, received are {}').format(
+                        self._data.shape[1], values.shape[1])
+        self._data = values
+        self._dataframe = None
+        self._checksum = None
 
     @property
     def dataframe(self):
-        """ Returns wrapped dataframe
+        """ Returns data as frame. The frame is created on first access and
+            shares memory with attribute ``data``.
 
             Returns:
                 pandas.core.DataFrame
         """
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame(
+                    self._data,
+                    columns=self._columns,
+                    copy=False
+                    )
         return self._dataframe
 
     @property
@@ -200,7 +260,7 @@ class DataContainer(object):
         """
         # calculate duration anew every time since duration might change depending
         # on applied data transformations
-        return float(self.dataframe.shape[0]) / float(self.frequency)
+        return float(self._data.shape[0]) / float(self.frequency)
 
     @property
     def events(self):
@@ -301,18 +361,108 @@ class DataContainer(object):
                         )
         if columns is not None:
             for col in columns:
-                assert col in self.dataframe.columns, ('Column {} is not in ' + \
+                assert col in self._columns, ('Column {} is not in ' + \
                         'data container').format(col)
+            columns = self.column_indices(columns)
+        return self.slice_samples(start, stop, columns)
+
+    def column_indices(self, columns):
+        """ Returns positions of columns in data
+
+            Args:
+                columns (List): List of column names
+
+            Returns:
+                List of int
+
+            Raises:
+                KeyError if a column is not in data container
+        """
+        indices = self.columns.get_indexer(columns)
+        if (indices < 0).any():
+            raise KeyError('Columns {} are not in data container'.format(
+                [columns[i] for i in np.flatnonzero(indices < 0)]))
+        return indices.tolist()
 
+    def get_samples(self, start, stop, columns=None):
+        """ Returns samples ``start`` to ``stop`` as numpy array. Fast path
+            of ``__getitem__``: Indices are not validated and no
+            DataContainer is created.
+
+            Args:
+                start (int): Index of first sample
+                stop (int): Index after last sample
+                columns (List, optional): Positions of columns to return, see
+                    ``column_indices``
+
+            Note:
+                Returns a view on the data if ``columns`` is not set.
+
+            Returns:
+                numpy.ndarray
+        """
+        if columns is None:
+            return self._data[start:stop]
+        return self._data[start:stop, columns]
+
+    def slice_samples(self, start, stop, columns=None):
+        """ Returns samples ``start`` to ``stop`` as DataContainer. Fast path
+            of ``__getitem__`` taking sample indices instead of seconds.
+            Indices are not validated.
+
+            Args:
+                start (int): Index of first sample
+                stop (int): Index after last sample
+                columns (List, optional): Positions of columns to return, see
+                    ``column_indices``
+
+            Note:
+                Data of returned container is a view on the data of this
+                container if ``columns`` is not set.
+
+            Returns:
+                model.model.DataContainer
+        """
         if columns is None:
-            dat = self.data[start:stop, :]
-            container = DataContainer.from_array(dat, self.frequency, self.columns)
+            names = self._columns
         else:
-            dat = self.dataframe.iloc[start:stop, :]
-            dat = dat.loc[:, columns]
-            dat.reset_index(inplace=True, drop=True)
-            container = DataContainer(dat, self.frequency)
-        return container
+            names = self._columns[columns]
+        return DataContainer(
+                self.get_samples(start, stop, columns),
+                self.frequency,
+                names
+                )
+
+    def set_samples(self, start, stop, values):
+        """ Sets samples ``start`` to ``stop``. Fast path of ``__setitem__``
+            taking sample indices instead of seconds. Indices are not
+            validated.
+
+            Args:
+                start (int): Index of first sample
+                stop (int): Index after last sample
+                values (array like): New data
+        """
+        self._data[start:stop] = values
+        self._checksum = None
+
+    def checksum(self):
+        """ Returns SHA1 checksum of data. The checksum is computed on the
+            first call and kept until data is changed through this container,
+            i.e. by the ``data`` setter, ``__setitem__`` or ``set_samples``.
+
+            Note:
+                Changes made through views on the data, e.g. containers
+                returned by ``slice_samples``, are not detected.
+
+            Returns:
+                String
+        """
+        if self._checksum is None:
+            hasher = hashlib.sha1()
+            hasher.update(np.ascontiguousarray(self._data).view(np.uint8))
+            self._checksum = hasher.hexdigest()
+        return self._checksum
 
     @property
     def num_channels(self):
@@ -321,7 +471,7 @@ class DataContainer(object):
             Returns:
                 int
         """
-        return self.dataframe.shape[1]
+        return self._data.shape[1]
 
     def one_hot_event(self, event_name):
         """ Returns a one-hot array with the same first dimension as DataContainer.
@@ -337,20 +487,30 @@ class DataContainer(object):
                 AssertionError if no events are defined
                 KeyError if ``event_name`` could not be found
         """
-        assert len(self.events) > 0, 'No events defined for DataContainer'
-        exists = False
-        onehot = np.zeros(self.samples, dtype=np.float)
-        for event in self.events:
-            if event.name == event_name:
-                exists = True
-                start = int(event.start * self.frequency)
-                if event.duration is None:
-                    stop = start + 1
-                else:
-                    stop = int((event.start + event.duration) * self.frequency)
-                onehot[start:stop] = 1
-        if not exists:
+        assert self.events is not None and len(self.events) > 0, \
+                'No events defined for DataContainer'
+        if isinstance(self.events, EventStore):
+            events = self.events.named(event_name)
+        else:
+            events = [event for event in self.events if event.name == event_name]
+        if len(events) == 0:
             raise KeyError('Event with name {} could not be found'.format(event_name))
+        starts = np.array([event.start for event in events], dtype=np.float64)
+        durations = np.array([np.nan if event.duration is None else event.duration
+            for event in events], dtype=np.float64)
+        start = (starts * self.frequency).astype(np.int64)
+        stop = np.where(
+                np.isnan(durations),
+                start + 1,
+                ((starts + np.nan_to_num(durations)) * self.frequency).astype(np.int64)
+                )
+        start = np.clip(start, 0, self.samples)
+        stop = np.clip(stop, 0, self.samples)
+        # Mark begin and end of each event and integrate
+        changes = np.zeros(self.samples + 1, dtype=np.int64)
+        np.add.at(changes, start, 1)
+        np.add.at(changes, stop, -1)
+        onehot = (np.cumsum(changes[:-1]) > 0).astype(np.float)
         return onehot
 
     def __setitem__(self, slice, data):
@@ -398,7 +558,8 @@ class DataContainer(object):
                 'duration is: {}, requested startpoint was: {}'.format(
                         self.duration, float(stop)/self.frequency
                         )
-        self.dataframe.iloc[start:stop, :] = data
+        self._data[start:stop] = data
+        self._checksum = None
 
     @property
     def samples(self):
@@ -407,7 +568,7 @@ class DataContainer(object):
             Returns:
                 int
         """
-        return self.dataframe.shape[0]
+        return self._data.shape[0]
 
     @property
     def shape(self):
@@ -416,17 +577,19 @@ class DataContainer(object):
             Returns:
                 Shape object
         """
-        return self.dataframe.shape
+        return self._data.shape
 
 
 class Event(object):
-    """ Models event in trial. Can also be used to model labels.
+    """ Models event in trial. Can also be used to model labels. Events
+        are read-only, since ``EventStore`` indexes them by their times.
 
         Attributes:
             name (String): Name of event
             start (float): Starttime of event in seconds
             duration (float): Duration of event in seconds
     """
+    __slots__ = ('_name', '_start', '_duration')
 
     def __init__(self, name, start, duration=None):
         """ Initializes object
@@ -447,7 +610,7 @@ class Event(object):
             Returns:
                 float
         """
-        if isnan(self._duration):
+        if self._duration is None or isnan(self._duration):
             return None
         return self._duration
 
@@ -469,15 +632,6 @@ class Event(object):
         """
         return self._start
 
-    @start.setter
-    def start(self, start):
-        """ Sets new start time of event.
-
-            Args:
-                start (float): Start point in seconds
-        """
-        self._start = start
-
     def to_string(self):
         str = 'Event {} at {}s'.format(self.name, self.start)
         if self.duration is not None:
@@ -485,9 +639,312 @@ class Event(object):
         return str
 
 
+# Names of events, equal names of all stores share one string object
+_event_names = {}
+
+
+class EventStore(object):
+    """ Events ordered by their start time. Range queries use binary search
+        and take ``O(log n + k)`` for ``k`` returned events. Events
+        overlapping an interval are found with a segment tree holding the
+        largest end time of each range of events in ``O((k + 1) log n)``.
+
+        Events can be added in any order, the store is sorted once when it
+        is queried next. Events added as columns are kept as columns until
+        they are returned by a query. Start and duration are stored as arrays
+        of doubles, equal names share one string object.
+
+        Attributes:
+            max_duration (float): Duration of longest event
+    """
+    __slots__ = ('_events', '_starts', '_durations', '_labels', '_names',
+            '_sorted', '_max_duration', '_ends')
+
+    def __init__(self, events=None):
+        """ Initializes object
+
+            Args:
+                events (Iterable, optional): model.model.Event objects
+        """
+        # Columns of events, in the same order as ``_events``
+        self._events = []
+        self._starts = array('d')
+        self._durations = array('d')
+        self._labels = []
+        # Events by name, built on demand by ``named``
+        self._names = None
+        self._sorted = True
+        self._max_duration = 0.
+        # Segment tree of end times, built on demand by ``_end_tree``
+        self._ends = None
+        if events is not None:
+            self.extend(events)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """ Alternative constructor, creates store from a DataFrame
+
+            Args:
+                frame (pandas.core.DataFrame): Frame with columns
+                    ``<event name>``, ``<start>`` and optionally
+                    ``<duration>``
+
+            Returns:
+                model.model.EventStore
+        """
+        store = cls()
+        store.add_frame(frame)
+        return store
+
+    @property
+    def max_duration(self):
+        """ Returns duration of longest event in store
+
+            Returns:
+                float
+        """
+        return self._max_duration
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self.between())
+
+    def _materialize(self, first, last):
+        """ Returns events at positions ``first`` to ``last``, creates event
+            objects of events added as columns.
+
+            Returns:
+                List of model.model.Event
+        """
+        events = self._events
+        for i in range(first, last):
+            if events[i] is None:
+                events[i] = Event(self._labels[i], self._starts[i],
+                        self._durations[i])
+        return events[first:last]
+
+    def add(self, event):
+        """ Adds a single event
+
+            Args:
+                event (model.model.Event): Event to add
+        """
+        duration = event.duration
+        if len(self._starts) > 0 and event.start < self._starts[-1]:
+            self._sorted = False
+        self._events.append(event)
+        self._starts.append(event.start)
+        self._durations.append(np.nan if duration is None else duration)
+        self._labels.append(_event_names.setdefault(event.name, event.name))
+        self._names = None
+        self._ends = None
+        if duration is not None and duration > self._max_duration:
+            self._max_duration = duration
+
+    def extend(self, events):
+        """ Adds multiple events
+
+            Args:
+                events (Iterable): model.model.Event objects
+        """
+        for event in events:
+            self.add(event)
+
+    def add_frame(self, frame):
+        """ Adds events stored in a DataFrame
+
+            Args:
+                frame (pandas.core.DataFrame): Frame with columns
+                    ``<event name>``, ``<start>`` and optionally
+                    ``<duration>``
+        """
+        if frame.shape[1] > 2:
+            durations = frame.iloc[:, 2].values
+        else:
+            durations = None
+        self.add_columns(frame.iloc[:, 0].values, frame.iloc[:, 1].values,
+                durations)
+
+    def add_columns(self, names, starts, durations=None):
+        """ Adds events given as columns
+
+            Args:
+                names (array like): Names of events
+                starts (array like): Start of events in seconds
+                durations (array like, optional): Duration of events in
+                    seconds, NaN or None for events without duration
+
+            Raises:
+                ValueError if columns have different length
+        """
+        starts = np.asarray(starts, dtype=np.float64)
+        if durations is None:
+            durations = np.full(starts.shape[0], np.nan)
+        else:
+            durations = np.asarray(durations, dtype=np.float64)
+        names = np.asarray(names).tolist()
+        if not len(names) == starts.shape[0] == durations.shape[0]:
+            raise ValueError(('EventStore.add_columns: Columns have ' + \
+                    'different length {}, {} and {}').format(len(names),
+                        starts.shape[0], durations.shape[0]))
+        if starts.shape[0] == 0:
+            return
+
+        if (len(self._starts) > 0 and starts[0] < self._starts[-1]) or \
+                (np.diff(starts) < 0).any():
+            self._sorted = False
+        if not np.isnan(durations).all():
+            self._max_duration = max(self._max_duration, np.nanmax(durations))
+
+        # Event objects are created when they are requested first
+        self._events.extend([None] * starts.shape[0])
+        self._starts.fromstring(starts.tostring())
+        self._durations.fromstring(durations.tostring())
+        self._labels.extend([_event_names.setdefault(n, n) for n in names])
+        self._names = None
+        self._ends = None
+
+    def columns(self, from_=None, to=None):
+        """ Returns names, starts and durations of events starting within
+            interval ``[from_, to)``, see ``between``.
+
+            Returns:
+                names (List), starts (array.array), durations (array.array)
+        """
+        first, last = self._range(from_, to)
+        return (
+                self._labels[first:last],
+                self._starts[first:last],
+                self._durations[first:last]
+                )
+
+    def _sort(self):
+        """ Sorts events by their start time if necessary """
+        if not self._sorted:
+            starts = np.frombuffer(self._starts)
+            order = np.argsort(starts, kind='mergesort')
+            self._starts = array('d', starts[order].tostring())
+            self._durations = array('d',
+                    np.frombuffer(self._durations)[order].tostring())
+            order = order.tolist()
+            self._events = [self._events[i] for i in order]
+            self._labels = [self._labels[i] for i in order]
+            self._sorted = True
+
+    def _range(self, from_, to):
+        """ Returns positions of first and after last event starting within
+            interval ``[from_, to)``
+
+            Returns:
+                int, int
+        """
+        self._sort()
+        first = 0 if from_ is None else bisect_left(self._starts, from_)
+        last = len(self._starts) if to is None else bisect_left(self._starts, to)
+        return first, last
+
+    def between(self, from_=None, to=None):
+        """ Returns events starting within interval ``[from_, to)``
+
+            Args:
+                from_ (float, optional): Start of interval, if not set
+                    interval begins with first event
+                to (float, optional): End of interval, if not set interval
+                    ends with last event
+
+            Returns:
+                List of model.model.Event
+        """
+        first, last = self._range(from_, to)
+        return self._materialize(first, last)
+
+    def overlapping(self, from_, to):
+        """ Returns events overlapping interval ``[from_, to)``. Events
+            without duration are treated as points in time.
+
+            Args:
+                from_ (float): Start of interval
+                to (float): End of interval
+
+            Returns:
+                List of model.model.Event
+        """
+        first, last = self._range(from_, to)
+        tree = self._end_tree()
+        leaves = len(tree) // 2
+        # Events starting before the interval and ending within or after it,
+        # subtrees ending before the interval or starting after ``first``
+        # are skipped. Left children are visited first to keep the order.
+        ret = []
+        stack = [(1, 0, leaves)]
+        while len(stack) > 0:
+            node, low, high = stack.pop()
+            if low >= first or tree[node] <= from_:
+                continue
+            if node >= leaves:
+                ret.extend(self._materialize(low, high))
+            else:
+                middle = (low + high) // 2
+                stack.append((2 * node + 1, middle, high))
+                stack.append((2 * node, low, middle))
+        ret.extend(self._materialize(first, last))
+        return ret
+
+    def _end_tree(self):
+        """ Returns segment tree over end times of sorted events. Leaf
+            ``leaves + i`` holds end of ``i``-th event, each inner node the
+            maximum of its children. Events without duration end at
+            ``-inf``, i.e. never overlap an interval they start before.
+
+            Returns:
+                numpy.ndarray of length ``2 * leaves``
+        """
+        if self._ends is None:
+            self._sort()
+            count = len(self._starts)
+            leaves = 1
+            while leaves < count:
+                leaves *= 2
+            tree = np.full(2 * leaves, -np.inf)
+            if count > 0:
+                ends = np.frombuffer(self._starts) + \
+                        np.frombuffer(self._durations)
+                ends[np.isnan(ends)] = -np.inf
+                tree[leaves:leaves + count] = ends
+            level = leaves
+            while level > 1:
+                tree[level // 2:level] = np.maximum(tree[level:2 * level:2],
+                        tree[level + 1:2 * level:2])
+                level //= 2
+            self._ends = tree
+        return self._ends
+
+    def named(self, name):
+        """ Returns all events with name ``name``
+
+            Args:
+                name (String): Name of events
+
+            Returns:
+                List of model.model.Event
+        """
+        if self._names is None:
+            self._sort()
+            self._names = {}
+            for event in self._materialize(0, len(self._events)):
+                if event.name in self._names:
+                    self._names[event.name].append(event)
+                else:
+                    self._names[event.name] = [event]
+        return self._names.get(name, [])
+
+
 class DataHoldingElement(object):
     """ Base class for Decorator Pattern
     """
+    __slots__ = ()
     def __getitem__(self, key):
         """ Returns data over time. Start, Stop, Step in seconds
         """
@@ -575,34 +1032,179 @@ class Experiment(DataHoldingElement):
             trials.extend(session.get_data(modality=modality, channels=channels))
         return trials
 
-    def get_data_by_labels(self, labels, sessions=None, recordings=None):
+    def get_array(self, modality, sessions=None, channels=None, labels=None,
+            out=None):
+        """ Returns the data of all trials of a specific modality as one
+            contiguous array together with an index describing which rows
+            belong to which trial.
+
+            In contrast to ``get_data`` no DataContainer is created per trial.
+            The total number of samples is computed first, the result is
+            allocated once and the samples of each trial are copied directly
+            from the data of their recording.
+
+            Args:
+                modality (String): Identifier of an modality. Only data of
+                    recordings with this modality are returned
+                sessions (List, optional): List of Strings. If set only data of
+                    the specified sessions is returned
+                channels (List, optional): Identifiers of channels to return.
+                    If not set all channels are returned
+                labels (List, optional): If set only trials with one of those
+                    labels are returned
+                out (numpy.ndarray, optional): Array the result is written to,
+                    e.g. a memory mapped file. Must have the shape of the result
+
+            Returns:
+                array (numpy.ndarray): Samples of all trials stacked along
+                    the first axis
+                index (pandas.DataFrame): One row per trial with columns
+                    ``session``, ``recording``, ``trial``, ``label``, ``start``
+                    and ``stop``. Trial occupies rows ``start`` to ``stop - 1``
+                    of ``array``
+
+            Raises:
+                ValueError: If recordings have different number of channels
+                ValueError: If ``out`` does not have the shape of the result
+        """
+        if sessions is None:
+            sessions = self._session_order
+
+        # Collect sample ranges first, no data is copied here
+        parts = []
+        index = {
+            'session': [],
+            'recording': [],
+            'trial': [],
+            'label': [],
+            'start': [],
+            'stop': []
+        }
+        rows = 0
+        dtypes = []
+        for s in sessions:
+            session = self.sessions[s]
+            if modality not in session.setup.modalities:
+                continue
+            for recording in session.get_recordings(modality):
+                data = recording.data
+                if channels is None:
+                    columns = None
+                    num_columns = data.num_channels
+                else:
+                    columns = data.column_indices(channels)
+                    num_columns = len(columns)
+                if len(parts) > 0 and num_columns != parts[0][1]:
+                    raise ValueError((
+                        'Recording {} has {} channels, expected {}'
+                        ).format(recording.identifier, num_columns, parts[0][1])
+                    )
+                ranges = []
+                for trial in recording.get_trials(labels):
+                    samples = trial.stop_index - trial.start_index
+                    ranges.append((trial.start_index, trial.stop_index))
+                    index['session'].append(session.identifier)
+                    index['recording'].append(recording.identifier)
+                    index['trial'].append(trial.identifier)
+                    index['label'].append(trial.label)
+                    index['start'].append(rows)
+                    index['stop'].append(rows + samples)
+                    rows += samples
+                parts.append((data, num_columns, columns, ranges))
+                dtypes.append(data.data.dtype)
+
+        num_columns = parts[0][1] if len(parts) > 0 else 0
+        if out is None:
+            dtype = np.result_type(*dtypes) if len(dtypes) > 0 else np.float64
+            out = np.empty((rows, num_columns), dtype=dtype)
+        elif out.shape != (rows, num_columns):
+            raise ValueError((
+                'Shape of out is {}, result has shape {}'
+                ).format(out.shape, (rows, num_columns))
+            )
+
+        row = 0
+        for data, _, columns, ranges in parts:
+            for start, stop in ranges:
+                if columns is None:
+                    out[row:row + stop - start] = data.get_samples(start, stop)
+                else:
+                    # Copy column by column to avoid the intermediate copy
+                    # of fancy indexing
+                    for i, column in enumerate(columns):
+                        out[row:row + stop - start, i] = \
+                                data.get_samples(start, stop, column)
+                row += stop - start
+
+        index = pd.DataFrame(
+                index,
+                columns=['session', 'recording', 'trial', 'label', 'start', 'stop']
+                )
+        return out, index
+
+    def get_data_by_labels(self, labels=None, sessions=None, recordings=None,
+            modality=None, channels=None):
         """ Returns data of all trials with the labels specified in ''labels''.
-            Returned DataFrame does not have an MultiIndex
 
             Args:
+                labels (list, optional): List with class labels. If not set
+                    data to all labels is returned
                 sessions (list, optional): List of session Ids
-                labels (list, optional): List with class labels
                 recordings (list, optional): List of identifiers of recordings
+                modality (String, optional): If set only recordings of this
+                    modality are considered
+                channels (List, optional): Identifiers of channels to return
 
             Returns:
-                Labels, DataContainer
+                List of DataContainer, List of String
         """
         if sessions is None:
             sessions = self._session_order
 
         sequences = []
-        labels = []
+        ret_labels = []
         for session in sessions:
-            if session in self._session_order:
+            if session in self.sessions:
                 d, l = self.sessions[session].get_data_by_labels(
                         labels=labels,
                         recordings=recordings,
-                        as_list=as_list,
-                        pandas=pandas
+                        modality=modality,
+                        channels=channels
                         )
                 sequences.extend(d)
-                labels.extend(l)
-        return sequences, labels
+                ret_labels.extend(l)
+        return sequences, ret_labels
+
+    def get_trials_by_label(self, modality, labels=None, sessions=None):
+        """ Returns the trials of a modality grouped by their label, e.g. to
+            draw a class balanced sample of trials.
+
+            Args:
+                modality (String): Identifier of an modality
+                labels (list, optional): List with class labels. If not set
+                    all labels are returned
+                sessions (list, optional): List of session Ids
+
+            Returns:
+                Dictionary mapping labels to lists of model.model.Trial
+        """
+        if sessions is None:
+            sessions = self._session_order
+
+        trials = {}
+        for s in sessions:
+            session = self.sessions[s]
+            if modality not in session.setup.modalities:
+                continue
+            for recording in session.get_recordings(modality):
+                if labels is None:
+                    selected = recording.label_set
+                else:
+                    selected = labels
+                for label in selected:
+                    trials.setdefault(label, []).extend(
+                            recording.get_trials([label]))
+        return trials
 
     def get_frequency(self, setup=None, modality=None):
         """ Returns frequency of one modality of one session.
@@ -1093,6 +1695,7 @@ class Channel(object):
                 generic one will be used. It is strongly recommended to use a 
                 identifier here.
     """
+    __slots__ = ('_modality', '_identifier')
 
     def __init__(self, modality, identifier=None):
         """ Initializes object.
@@ -1262,32 +1865,40 @@ class Session(DataHoldingElement):
             df.append(self.recordings[idx].get_all_data())
         return df
 
-    def get_data_by_labels(self, labels, recordings=None):
+    def get_data_by_labels(self, labels=None, recordings=None, modality=None,
+            channels=None):
         """ Returns data of all trials with the labels specified in ''labels''.
-            Returned DataFrame does not have an MultiIndex
 
             Args:
-                labels (list, optional): List with class labels
+                labels (list, optional): List with class labels. If not set
+                    data to all labels is returned
                 recordings (list, optional): List of identifiers of recordings
+                modality (String, optional): If set only recordings of this
+                    modality are considered
+                channels (List, optional): Identifiers of channels to return
 
             Returns:
-                DataContainer, Labels
+                List of DataContainer, List of String
         """
         if recordings is None:
             recordings = self._recording_order
 
         sequences = []
-        labels = []
-        for recording in recordings:
-            if recording in self._recording_order:
-                d, l = self.recordings[recording].get_data_by_labels(
-                        labels=labels,
-                        as_list=as_list,
-                        pandas=pandas
-                        )
-                sequences.extend(d)
-                labels.extend(l)
-        return sequences, labels
+        ret_labels = []
+        for rid in recordings:
+            if rid not in self.recordings:
+                continue
+            recording = self.recordings[rid]
+            if modality is not None and \
+                    recording.modality.identifier != modality:
+                continue
+            d, l = recording.get_data_by_labels(
+                    labels=labels,
+                    channels=channels
+                    )
+            sequences.extend(d)
+            ret_labels.extend(l)
+        return sequences, ret_labels
 
     def get_data(self, modality=None, channels=None):
         """ Returns trials of all recordings associated with ``modality``
@@ -1353,7 +1964,7 @@ class Session(DataHoldingElement):
         """
         ret = []
         for rid in self._recording_order:
-            if modality == self.recordings[rid].modality:
+            if modality == self.recordings[rid].modality.identifier:
                 ret.append(self.recordings[rid])
 
         if len(ret) == 0:
@@ -1450,7 +2061,7 @@ class Recording(DataHoldingElement):
     """
 
     def __init__(self, session, modality, location=None, data=None,
-            identifier=None):
+            identifier=None, mmap_mode=None):
         """ Initializes object.
 
             Args:
@@ -1461,13 +2072,20 @@ class Recording(DataHoldingElement):
                     parameter is set and no data is given, data will be retrieved from file.
                 data (pandas.DataFrame, optional): DataFrame with channels of this recording.
                 identifier (string, optional): Identifier of one instance
+                mmap_mode (string, optional): If set, data is kept in a memory
+                    mapped ``.npy`` file at ``location`` instead of RAM. One of
+                    ``r``, ``r+`` or ``c`` (see numpy.load). Only data touched
+                    by trials and decorators is read from disk.
 
             Note:
                 Either ``data`` or ``location`` has to be set. If both are set, ``location``
                 is ignored, data is not read from file.
+                If both are set and ``mmap_mode`` is set as well, ``data`` is
+                written to ``location`` and memory mapped from there.
 
             Raises:
                 ValueError: Raised if both, location and data are not set
+                ValueError: Raised if ``mmap_mode`` is set without ``location``
         """
 
         self._session = session
@@ -1476,28 +2094,41 @@ class Recording(DataHoldingElement):
         self._trials = {}
         self._identifier = identifier
         self._trial_order = []
+        # Start of each trial within the relevant data, i.e. the cumulative
+        # duration of all trials before it
+        self._offsets = []
+        self._duration = 0
+        # Position of each trial in ``_trial_order`` and positions of the
+        # trials carrying a label, in ascending order
+        self._positions = {}
+        self._label_index = {}
         self._modality = modality
-        self._events = []
+        # EventStore of all trials, built on demand by ``get_events``
+        self._events = None
 
         if self._identifier is None:
             self._identifier = 'recording' + str(len(self._session.recordings))
 
         if (data is None) and (location is None):
             raise ValueError('Neither location nor data set in Recording')
+        if (mmap_mode is not None) and (location is None):
+            raise ValueError('Memory mapped Recording requires location to be set')
 
+        datactrl = DataController()
         if data is None:
-            datactrl = DataController()
-            data = datactrl.read_data_from_file(location)
+            data = datactrl.read_data_from_file(location, mmap_mode=mmap_mode)
         else:
-            if type(data) is pd.DataFrame:
+            if isinstance(data, pd.DataFrame):
                 data = data.values
-            elif type(data) is np.ndarray:
+            elif isinstance(data, np.ndarray):
                 pass
             else:
                 raise ValueError('Data is of unsupported type. Expected ' + \
                         '"numpy.ndarray or pandas.core.DataFrame. Got {}'
                         .format(type(data))
                         )
+            if mmap_mode is not None:
+                data = datactrl.write_npy_data(location, data, mmap_mode)
         self._data = DataContainer.from_array(
                 data,
                 self._modality.frequency,
@@ -1576,38 +2207,84 @@ class Recording(DataHoldingElement):
                 events (Dictionary like): Dictionary or pandas.core.DataFrame
                     dictionary must use trial name as key and map to a 2D list
                     of the form ``[[<event name>, <start>, <duration>], [...]]``.
-                    DataFrame must have trial identifier as column index.
-                    columns must be in order ``<event name>``, ``<start>``,
-                    ``<stop>``
+                    DataFrame must have trial identifier as first column.
+                    Further columns must be in order ``<event name>``,
+                    ``<start>``, ``<duration>``
 
             Note:
                 start of each event must be relative to the **beginning of the
                 trial** it belongs to.
         """
-        def get_keys(toplevel):
-            """ Returns trirals identifier as list """
-            if type(toplevel) is dict:
-                return toplevel.keys()
-            elif type(toplevel) is pd.DataFrame:
-                return toplevel.iloc[:, 0].unique().tolist()
-            else:
-                raise AttributeError('Unknwon type encountered in model.model' + \
-                        '.Recording.add_events. Type {} not supported for ' + \
-                        'argument events'.format(type(toplevel)))
-
-        def yield_record(toplevel, key):
-            if type(toplevel) is dict:
-                for record in toplevel[key]:
-                    yield record
-            elif type(toplevel) is pd.DataFrame:
-                sliced = toplevel.loc[toplevel.iloc[:, 0] == key]
-                #sliced = sliced.drop_duplicates()
-                for i in range(sliced.shape[0]):
-                    yield sliced.iloc[i, 1:].values.tolist()
-
-        for key in get_keys(events):
-            for record in yield_record(events, key):
-                self.trials[key].add_event(*record)
+        if type(events) is dict:
+            trials = []
+            names = []
+            starts = []
+            durations = []
+            for key, records in events.iteritems():
+                for record in records:
+                    trials.append(key)
+                    names.append(record[0])
+                    starts.append(record[1])
+                    durations.append(record[2] if len(record) > 2 else None)
+            durations = [np.nan if d is None else d for d in durations]
+            self.put_events(trials, names, starts, durations)
+        elif type(events) is pd.DataFrame:
+            self.put_events(
+                    events.iloc[:, 0].values,
+                    events.iloc[:, 1].values,
+                    events.iloc[:, 2].values,
+                    events.iloc[:, 3].values if events.shape[1] > 3 else None
+                    )
+        else:
+            raise AttributeError(('Unknwon type encountered in model.model' + \
+                    '.Recording.add_events. Type {} not supported for ' + \
+                    'argument events').format(type(events)))
+
+    def put_events(self, trials, names, starts, durations=None):
+        """ Adds events given as columns. Events are grouped by trial in one
+            pass and added to each trial at once.
+
+            Args:
+                trials (array like): Identifier of trial of each event
+                names (array like): Names of events
+                starts (array like): Start of events in seconds relative to
+                    the beginning of their trial
+                durations (array like, optional): Duration of events in
+                    seconds, NaN for events without duration
+
+            Raises:
+                IndexError if a trial does not exist
+                ValueError if columns have different length
+        """
+        trials = np.asarray(trials)
+        names = np.asarray(names)
+        starts = np.asarray(starts, dtype=np.float64)
+        if durations is None:
+            durations = np.full(starts.shape[0], np.nan)
+        else:
+            durations = np.asarray(durations, dtype=np.float64)
+        if not trials.shape[0] == names.shape[0] == starts.shape[0] == \
+                durations.shape[0]:
+            raise ValueError('Recording.put_events: Columns have different length')
+
+        # Groups are numbered in order of first appearance
+        codes, keys = pd.factorize(trials)
+        keys = keys.tolist()
+        for key in keys:
+            if key not in self.trials:
+                raise IndexError('Recording {} has no trial with identifier {}'
+                        .format(self.identifier, key))
+        # Stable sort keeps order of events within a trial
+        order = np.argsort(codes, kind='mergesort')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes))))
+        for group, key in enumerate(keys):
+            rows = order[bounds[group]:bounds[group + 1]]
+            self.trials[key].events.add_columns(
+                    names[rows],
+                    starts[rows],
+                    durations[rows]
+                    )
+        self.invalidate_events()
 
     def add_trials(self, trials):
         """ Convenience function to add multiple trials at once.
@@ -1624,35 +2301,58 @@ class Recording(DataHoldingElement):
                 When using DataFrame, duration can be replaced by time trial
                 ends. This columns must then be named `stop`.
         """
+        if type(trials) is list:
+            columns = zip(*trials) if len(trials) > 0 else [[], []]
+        elif type(trials) is np.ndarray:
+            columns = [trials[:, i] for i in range(trials.shape[1])]
+        elif type(trials) is pd.DataFrame:
+            columns = [trials.iloc[:, i].values for i in range(trials.shape[1])]
+            if 'stop' in trials.columns:
+                # if column stop exists calculate duration of trial
+                columns[1] = trials['stop'].values - columns[0]
+        else:
+            raise AttributeError('Unsupported type for argument trials ' + \
+                    'in model.model.Recording.add_trials. Expected ' + \
+                    'numpy.ndarray, pandas.core.DataFrame or list. ' + \
+                    'ecountered {}'.format(type(trials)))
 
-        def yield_record(trials):
-            if type(trials) is list:
-                for trial in trials:
-                    yield trial
-            elif type(trials) is np.ndarray:
-                for i in range(trials.shape[0]):
-                    yield trials[i].tolist()
-            elif type(trials) is pd.DataFrame:
-                for i in range(trials.shape[0]):
-                    record = trials.loc[i, :].values.tolist()
-                    if 'stop' in trials.columns:
-                        # if column stop exists calculate duration of trial
-                        record[1] = record[1] - record[0]
-                    yield record
-            else:
-                raise AttributeError('Unsupported type for argument trials ' + \
-                        'in model.model.Recording.add_trials. Expected ' + \
-                        'numpy.ndarray, pandas.core.DataFrame or list. ' + \
-                        'ecountered {}'.format(type(trials)))
-
-        for rec in yield_record(trials):
-            if len(rec) == 2:
-                rec.append(None)
-            elif len(rec) != 3:
-                raise ArgumnentError('Wrong number of arguments given for ' + \
-                        'constructing trial in model.model.Recording.' + \
-                        'add_trials. Expected 2 or three, got {}'.format(len(rec)))
-            Trial(self, rec[0], rec[1], rec[2])
+        if len(columns) not in [2, 3]:
+            raise ValueError('Wrong number of arguments given for ' + \
+                    'constructing trial in model.model.Recording.' + \
+                    'add_trials. Expected 2 or three, got {}'.format(len(columns)))
+        self.put_trials(*columns)
+
+    def put_trials(self, starts, durations, identifiers=None, labels=None):
+        """ Adds trials given as columns
+
+            Args:
+                starts (array like): Start of trials in seconds
+                durations (array like): Duration of trials in seconds
+                identifiers (array like, optional): Identifiers of trials
+                labels (array like, optional): Class labels of trials
+
+            Returns:
+                List of model.model.Trial
+
+            Raises:
+                ValueError if columns have different length
+        """
+        starts = np.asarray(starts).tolist()
+        durations = np.asarray(durations).tolist()
+        num = len(starts)
+        if identifiers is None:
+            identifiers = [None] * num
+        else:
+            identifiers = list(identifiers)
+        if labels is None:
+            labels = [None] * num
+        else:
+            labels = list(labels)
+        if not num == len(durations) == len(identifiers) == len(labels):
+            raise ValueError('Recording.put_trials: Columns have different length')
+        return [Trial(self, start, duration, identifier, label) for
+                start, duration, identifier, label in
+                zip(starts, durations, identifiers, labels)]
 
     def get_events(self, from_=None, to=None):
         """ Returns events either for whole recording or for a specific time interval
@@ -1676,6 +2376,11 @@ class Recording(DataHoldingElement):
                 end of recording or all events from beginning of recording until `to`
                 are returned.
 
+            Note:
+                Events starting within ``[from_, to)`` are returned. Start of
+                returned events is relative to the beginning of the relevant
+                data. Events stored in trials are not modified.
+
             Raises:
                 IndexError: If either `_from` or `to` is higher than recording's duration
         """
@@ -1689,35 +2394,38 @@ class Recording(DataHoldingElement):
         elif to > self.duration:
             raise IndexError('End point of interval higher than duration of recording')
 
-        duration = 0
-        offset = 0
-        to_pass = None
-        from_pass = None
-        ret = []
-        for trial in self._trial_order:
-            offset = offset + duration
-            duration = self.trials[trial].duration
-
-            if from_ > offset + duration:
-                continue
-            elif (from_ > offset) and (from_ < duration + offset):
-                from_pass = from_ - offset
-            else:
-                from_pass = None
-
-            if to < offset:
-                break
-            elif (to > offset) and (to < duration + offset):
-                to_pass = to - offset
-            else:
-                to_pass = None
+        if self._events is None:
+            self._events = self._build_events()
+        return self._events.between(from_, to)
 
-            tmp = self.trials[trial].get_events(from_=from_pass, to=to_pass)
-            for e in tmp:
-                e.start = e.start + offset
-                ret.append(e)
+    def _build_events(self):
+        """ Collects events of all trials. Start of events is shifted by the
+            offset of the trial they belong to. Events outside of their trial
+            are omitted.
 
-        return ret
+            Returns:
+                model.model.EventStore
+        """
+        names = []
+        starts = []
+        durations = []
+        for identifier, offset in zip(self._trial_order, self._offsets):
+            trial = self.trials[identifier]
+            if trial.num_events == 0:
+                continue
+            columns = trial.events.columns(0, trial.duration)
+            names.extend(columns[0])
+            starts.append(np.asarray(columns[1], dtype=np.float64) + offset)
+            durations.extend(columns[2])
+        store = EventStore()
+        if len(names) > 0:
+            store.add_columns(names, np.concatenate(starts), durations)
+        return store
+
+    def invalidate_events(self):
+        """ Discards index of events. Called when trials or events are added.
+        """
+        self._events = None
 
     def get_data(self, begin=None, end=None, channels=None):
         """ Returns the **relevant** data of a recording object. As a List of
@@ -1741,7 +2449,7 @@ class Recording(DataHoldingElement):
                 List of model.model.DataContainer
         """
         return_list = []
-        if begin > end:
+        if begin is not None and end is not None and begin > end:
             raise ValueError((
                 'Beginning of time interval larger than ending. Beginning was {beg},' +
                 'end was {e}'
@@ -1751,76 +2459,144 @@ class Recording(DataHoldingElement):
             raise ValueError((
                 'Beginning of time interval larger than duration of recording {rec}. ' +
                 'Start point of interval was at {a}s, duration is {b}s'
-                ).format(a=begin, b=self.duration)
+                ).format(rec=self.identifier, a=begin, b=self.duration)
             )
         elif end > self.duration:
             raise ValueError((
                 'End of time interval larger than duration of recording {rec}. ' +
                 'Start point of interval was at {a}s, duration is {b}s'
-                ).format(a=end, b=self.duration)
+                ).format(rec=self.identifier, a=end, b=self.duration)
             )
-        # New data frame is created
-        begin_pass = None
-        end_pass = None
-        stop = 0
-
-        for idx in self._trial_order:
-            offset = stop # Offset has to be set here to ensure its set
-                          # even if continue clause is executed!
-            stop = offset + self.trials[idx].duration
-
-            if begin is not None:
-                if begin > stop:
-                    continue
-                elif (begin > offset) and (begin < stop):
-                    begin_pass = begin - offset
-                else:
-                    begin_pass = None
 
-            if end is not None:
-                if end < offset:
-                    break
-                elif (end > offset) and (end < stop):
-                    end_pass = end - offset
-                else:
-                    end_pass = None
+        first, last = self.trial_range(begin, end)
+        for i in range(first, last):
+            offset = self._offsets[i]
+            trial = self.trials[self._trial_order[i]]
+            if begin is not None and begin > offset:
+                begin_pass = begin - offset
+            else:
+                begin_pass = None
+            if end is not None and end < offset + trial.duration:
+                end_pass = end - offset
+            else:
+                end_pass = None
 
-            return_list.append(self.trials[idx].get_data(
+            return_list.append(trial.get_data(
                 begin=begin_pass,
                 end=end_pass,
                 channels=channels
                 ))
         return return_list
 
-    def get_data_by_labels(self, labels=None):
-        """ Returns data of all trials with the labels specified in ''labels''.
+    def trial_range(self, begin=None, end=None):
+        """ Returns positions (in order trials were added) of trials
+            overlapping the interval ``[begin, end)`` of the relevant data.
+            Trials are looked up by binary search.
 
             Args:
-                labels (list, optional): List with class labels. If not set
-                    data to all labels is returned
+                begin (float, optional): Start of interval in seconds
+                end (float, optional): End of interval in seconds
+
+            Returns:
+                first (int), last (int): Trials ``first`` to ``last - 1``
+                overlap the interval
+        """
+        if begin is None:
+            first = 0
+        else:
+            # Last trial starting at or before begin
+            first = max(bisect_right(self._offsets, begin) - 1, 0)
+            if first < len(self._offsets) and begin >= self._offsets[first] + \
+                    self.trials[self._trial_order[first]].duration:
+                first += 1
+        if end is None:
+            last = len(self._offsets)
+        else:
+            last = bisect_left(self._offsets, end)
+        return first, last
+
+    def get_offset(self, identifier):
+        """ Returns start of a trial within the relevant data
+
+            Args:
+                identifier (String): Identifier of trial
 
             Returns:
-                DataContainer, String
+                float
+        """
+        return self._offsets[self._positions[identifier]]
+
+    def reindex_label(self, identifier, old, new):
+        """ Moves a trial from label ``old`` to label ``new`` in the label
+            index. Called by Trial if its label changes
+
+            Args:
+                identifier (String): Identifier of trial
+                old (String): Previous label of trial, may be None
+                new (String): New label of trial, may be None
+        """
+        position = self._positions[identifier]
+        if old is not None:
+            positions = self._label_index[old]
+            positions.remove(position)
+            if len(positions) == 0:
+                del self._label_index[old]
+        if new is not None:
+            insort(self._label_index.setdefault(new, []), position)
+
+    def get_trials(self, labels=None):
+        """ Returns trials in the order they were added
+
+            Args:
+                labels (List, optional): If set only trials with one of those
+                    labels are returned
+
+            Returns:
+                List of model.model.Trial
         """
         if labels is None:
-            labels = self.get_labels()
+            return [self.trials[idx] for idx in self._trial_order]
+        positions = []
+        for label in set(labels):
+            positions.extend(self._label_index.get(label, []))
+        positions.sort()
+        return [self.trials[self._trial_order[i]] for i in positions]
 
-        trials = []
-        ret_labels = []
+    @property
+    def label_set(self):
+        """ Returns the labels of the trials of this recording
 
-        for idx in self._trial_order:
-            if self.trials[idx].Label in labels:
-                trials.append(self.trials[idx].get_data())
-                ret_labels.append(self.trials[idx].Label)
+            Returns:
+                List of Strings
+        """
+        return self._label_index.keys()
 
-        for lbl in ret_labels:
-            if lbl not in ret_labels:
-                warnings.warn(
-                    'Label %s was not found in any trial of recording %s' %
-                    (str(lbl), str(self.identifier))
-                )
+    def get_data_by_labels(self, labels=None, channels=None):
+        """ Returns data of all trials with the labels specified in ''labels''.
+            Trials are looked up in the label index, trials with other labels
+            are not visited.
+
+            Args:
+                labels (list, optional): List with class labels. If not set
+                    data to all labels is returned
+                channels (List, optional): Identifiers of channels to return
+
+            Returns:
+                List of DataContainer, List of String
+        """
+        if labels is None:
+            labels = self.label_set
+        else:
+            for lbl in labels:
+                if lbl not in self._label_index:
+                    warnings.warn(
+                        'Label %s was not found in any trial of recording %s' %
+                        (str(lbl), str(self.identifier))
+                    )
 
-        return trials, ret_labels
+        trials = self.get_trials(labels)
+        return [trial.get_data(channels=channels) for trial in trials], \
+                [trial.label for trial in trials]
 
     def get_labels(self):
         """ Returns a list of labels for all relevant data points.
@@ -1846,10 +2622,7 @@ class Recording(DataHoldingElement):
             Returns:
                 float
         """
-        duration = 0
-        for trial in self.trials.itervalues():
-            duration += trial.duration
-        return duration
+        return self._duration
 
     @property
     def own_duration(self):
@@ -1894,9 +2667,10 @@ class Recording(DataHoldingElement):
                 accessing data though this classes properties, the updated data is
                 returned, though.
         """
-        for idnt in self._trial_order:
-            start = int(self.trials[idnt].start * self.frequency)
-            end = start + int(self.trials[idnt].duration * self.frequency)
+        frequency = self.get_frequency()
+        for idnt, offset in zip(self._trial_order, self._offsets):
+            start = to_index(offset, frequency)
+            end = start + self.trials[idnt].stop_index - self.trials[idnt].start_index
             self.trials[idnt].set_data(data[start : end])
 
     def get_all_data(self):
@@ -1951,8 +2725,15 @@ class Recording(DataHoldingElement):
         """
         if trial.identifier not in self.trials:
             self.trials[trial.identifier] = trial
+            self._positions[trial.identifier] = len(self._trial_order)
+            if trial.label is not None:
+                self._label_index.setdefault(trial.label, []).append(
+                        len(self._trial_order))
             self._trial_order.append(trial.identifier)
+            self._offsets.append(self._duration)
+            self._duration = self._duration + trial.duration
             self.samples = self.samples + trial.samples
+            self.invalidate_events()
         else:
             raise IndexError('Trial with name ' + trial.identifier + ' already member of recording')
 
@@ -2007,6 +2788,8 @@ class Trial(DataHoldingElement):
             start (float): Start point of trial in seconds relative to the start point
                 of the recording.
     """
+    __slots__ = ('_recording', '_start', '_identifier', '_duration', '_label',
+            '_events', '_samples', '_start_index', '_stop_index')
 
     def __init__(self, recording, start, duration, identifier=None, label=None):
         """ Initializes Object
@@ -2026,8 +2809,11 @@ class Trial(DataHoldingElement):
         self._identifier = identifier
         self._duration = duration
         self._label = label
-        self._events = []
+        # EventStore is created when the first event is added
+        self._events = None
         self._samples = duration * self._recording.modality.frequency
+        self._start_index = to_index(start, self._recording.modality.frequency)
+        self._stop_index = to_index(start + duration, self._recording.modality.frequency)
 
         if self._identifier is None:
             self._identifier = 'trial' + str(len(self._recording.trials))
@@ -2064,6 +2850,24 @@ class Trial(DataHoldingElement):
         """
         return self._duration
 
+    @property
+    def start_index(self):
+        """ Index of first sample of trial in data of recording
+
+            Returns:
+                int
+        """
+        return self._start_index
+
+    @property
+    def stop_index(self):
+        """ Index after last sample of trial in data of recording
+
+            Returns:
+                int
+        """
+        return self._stop_index
+
     @property
     def label(self):
         """ Getter property for attribute label
@@ -2089,7 +2893,10 @@ class Trial(DataHoldingElement):
             Args:
                 label (String): Label of trial
         """
+        old = self._label
         self._label = label
+        if old != label:
+            self._recording.reindex_label(self._identifier, old, label)
 
     def add_event(self, name, start, duration=None):
         """ Adds an event to the trial. Position of event is expected to be
@@ -2100,7 +2907,28 @@ class Trial(DataHoldingElement):
                 start (float): Start time relative to beginning of trial in seconds
                 duration (float): Duration of event in seconds
         """
-        self._events.append(Event(name, start, duration))
+        self.events.add(Event(name, start, duration))
+        self._recording.invalidate_events()
+
+    @property
+    def events(self):
+        """ Returns events of trial
+
+            Returns:
+                model.model.EventStore
+        """
+        if self._events is None:
+            self._events = EventStore()
+        return self._events
+
+    @property
+    def num_events(self):
+        """ Returns number of events of trial
+
+            Returns:
+                int
+        """
+        return 0 if self._events is None else len(self._events)
 
     def get_events(self, from_=None, to=None):
         """ Returns all events contained in the given interval. If no interval borders
@@ -2112,9 +2940,7 @@ class Trial(DataHoldingElement):
                 to (float, optional): End of interval for which events should be retrieved
 
             Note:
-                Returns a copy of the data stored in ``Recording`` and referenced
-                by this trial. Changes to the data returned by this function do
-                not affect the data stored in ``Recording``.
+                Events starting within ``[from_, to)`` are returned.
 
             Raises:
                 IndexError: If either `from_` or `to` exceed duration of trial
@@ -2129,17 +2955,9 @@ class Trial(DataHoldingElement):
         elif to > self.duration:
             raise IndexError('End of time interval out of range (greater than duration)')
 
-        ret = []
-
-        for e in self._events:
-            if e.start < 0 :
-                continue
-            elif (e.start > from_) and (e.start < to):
-                # Substract offset of trial
-                ret.append(e)
-            elif e.start  > self.start + self.duration:
-                break
-        return ret
+        if self._events is None:
+            return []
+        return self._events.between(max(from_, 0), to)
 
     def get_data(self, begin=None, end=None, channels=None):
         """ Returns data within specified interval borders. If no border set start/end
@@ -2161,23 +2979,27 @@ class Trial(DataHoldingElement):
                 model.model.DataContainer
 
             Raises:
-                IndexError: If either `begin` or `end` larger than duration of trial
+                IndexError: If interval is not within trial
         """
+        data = self.recording.data
         if end is None:
-            end = self.start + self.duration
+            stop = self._stop_index
         else:
-            end = self.start + end
+            stop = to_index(self.start + end, data.frequency)
 
         if begin is None:
-            begin = self.start
+            start = self._start_index
         else:
-            begin = self.start + begin
+            start = to_index(self.start + begin, data.frequency)
 
-        if channels is None:
-            container = self.recording.data[begin:end]
-        else:
-            container = self.recording.data[begin:end, channels]
-        return container
+        if not self._start_index <= start <= stop <= self._stop_index:
+            raise IndexError(('Interval [{}, {}) out of range of trial {} ' + \
+                    'with duration {}').format(begin, end, self.identifier,
+                        self.duration))
+
+        if channels is not None:
+            channels = data.column_indices(channels)
+        return data.slice_samples(start, stop, channels)
 
     def get_frequency(self):
         """ Returns frequency of recording trial belongs to
@@ -2195,7 +3017,7 @@ class Trial(DataHoldingElement):
                 to create a new object behind the scenes and the data object in Record
                 class is not changed!
         """
-        self.recording.data[self.start:self.start + self.duration] = data
+        self.recording.data.set_samples(self._start_index, self._stop_index, data)
 
     def to_string(self):
         """ Returns string representation of object.
@@ -2206,7 +3028,7 @@ class Trial(DataHoldingElement):
         string = 'Trial {}: {}s duration, {} samples, label {}'.format(
             self.identifier, self.duration, self.samples, self.label
             )
-        for e in self._events:
+        for e in self.get_events():
             string = string + '\n\t' + e.to_string()
         return string
 
@@ -2215,89 +3037,254 @@ class DataController(object):
     """ Handles reading and writing EMG data from file
     """
 
-    def read_data_from_file(self, path):
+    def read_data_from_file(self, path, mmap_mode=None):
         """ Given path identifies file type and calls respective method
 
             Args:
                 path (String): Path to file from which data should be retrieved
+                mmap_mode (String, optional): Mode to memory map ``.npy``
+                    files with. Ignored for other file types.
 
             Raises:
                 IOError if file specified in path does not exist
                 NotImplementedError if file type not recognized
         """
         if path.endswith('.txt'):
-            return self.read_data_from_file(path)
+            return self.read_data_from_text(path)
         elif path.endswith('.pkl'):
             return self.read_pickled_data(path)
+        elif path.endswith('.npy'):
+            return self.read_npy_data(path, mmap_mode)
         else:
             raise NotImplementedError(
                 'File type of file  %s not supported' % path
             )
 
-    def read_data_from_text(self, path, delimiter = '\t', asNumpy = False, debug = False):
-        """ Reads EMG data from a textfile
+    def read_npy_data(self, path, mmap_mode=None):
+        """ Reads EMG data from a ``.npy`` file.
 
             Args:
-                path (String): Path to the text file which should be read
-                delimiter (String, optional): Delimiter of columns
-                asNumpy (Boolean, optional): If set to true numpy array is returned
-                    instead of Pandas DataFrame
-                debug (boolean): If set to true only first 100 Lines are considered
+                path (String): Path to ``.npy`` file
+                mmap_mode (String, optional): If set, file is memory mapped
+                    using this mode (see numpy.load)
 
             Returns:
-                pandas.core.DataFrame
-                numpy.ndarray
+                numpy.ndarray or numpy.memmap
+
+            Raises:
+                ValueError if array is not two dimensional
+        """
+        arr = np.load(path, mmap_mode=mmap_mode)
+        if arr.ndim != 2:
+            raise ValueError(('Error loading data from file {}. Expected two ' + \
+                    'dimensional array, got {} dimensions').format(path, arr.ndim))
+        return arr
+
+    def write_npy_data(self, path, data, mmap_mode='r+'):
+        """ Writes data to a ``.npy`` file and returns it memory mapped.
+
+            Args:
+                path (String): Path to ``.npy`` file
+                data (numpy.ndarray): Two dimensional array
+                mmap_mode (String, optional): Mode to memory map file with
+
+            Returns:
+                numpy.memmap
         """
+        arr = np.lib.format.open_memmap(path, mode='w+', dtype=data.dtype,
+                shape=data.shape)
+        arr[:] = data
+        arr.flush()
+        del arr
+        return self.read_npy_data(path, mmap_mode)
 
-        with open(path, 'r') as f:
-            count = 0
-            start = 0
-            arr = None
-            for line in f:
-                count = count + 1
+    text_pattern = re.compile('^[ \t]*[a-zA-Z]', re.MULTILINE)
+    """ Lines whose first non-blank character is a letter contain text (e.g.
+        headers of PowerLab exports) and are skipped when reading text files.
+        Values like ``NaN`` or ``inf`` within a line are parsed as floats.
+    """
+
+    def _write_npy_header(self, fh, rows, columns):
+        """ Writes header of a ``.npy`` file for a float64 array to the
+            beginning of ``fh``. Header has always the same length, so it can
+            be written before number of rows is known and updated afterwards.
+
+            Args:
+                fh (File): File opened in binary mode
+                rows (int): Number of rows of array
+                columns (int): Number of columns of array
+        """
+        header = "{{'descr': '<f8', 'fortran_order': False, 'shape': ({:20d}, {:d}), }}".format(
+                rows, columns)
+        magic = np.lib.format.magic(1, 0)
+        # Total length of header must be divisible by 64 and end with newline
+        padding = 64 - (len(magic) + 2 + len(header) + 1) % 64
+        header = header + ' ' * padding + '\n'
+        fh.seek(0)
+        fh.write(magic)
+        fh.write(struct.pack('<H', len(header)))
+        fh.write(header)
+
+    def _split_line(self, line, delimiter):
+        """ Splits a line into its columns. Surrounding whitespace and
+            trailing delimiters are ignored.
+
+            Args:
+                line (String): Line of text file
+                delimiter (String): Delimiter of columns
+
+            Returns:
+                List of String
+        """
+        line = line.strip()
+        if delimiter.isspace():
+            # Consecutive whitespace is one delimiter, as in np.fromstring
+            return line.split()
+        return line.rstrip(delimiter).split(delimiter)
+
+    def _parse_block(self, lines, delimiter, path, count):
+        """ Parses a block of lines from a text file. First column (time
+            values of PowerLab exports) is dropped.
 
-                line = line.strip()
+            Args:
+                lines (List): Lines of text file
+                delimiter (String): Delimiter of columns
+                path (String): Path of file, used for messages
+                count (int): Number of lines read before this block
 
-                if re.match('[a-zA-Z]', line) is not None:
-                    # Skip all lines containing text characters
-                    print 'Warning - skipped line %d:%s' % (count, line)
+            Returns:
+                numpy.ndarray
+        """
+        logger = logging.getLogger('DataController')
+        numbers = range(count + 1, count + len(lines) + 1)
+        text = ''.join(lines)
+        if self.text_pattern.search(text) is not None:
+            for number, line in zip(numbers, lines):
+                if self.text_pattern.search(line) is not None:
+                    logger.debug('Skipped line {} of file {}: {}'.format(
+                        number, path, line.strip()))
+            numbers, lines = zip(*[(n, l) for n, l in zip(numbers, lines)
+                if self.text_pattern.search(l) is None]) or ([], [])
+            text = ''.join(lines)
+        if len(lines) == 0 or text.strip() == '':
+            return None
+        numbers, lines = zip(*[(n, l) for n, l in zip(numbers, lines)
+            if l.strip() != ''])
+
+        if delimiter != ',':
+            text = text.replace(',', '.')
+        if not delimiter.isspace():
+            text = text.replace(delimiter, ' ')
+        width = len(self._split_line(lines[0], delimiter))
+        values = np.fromstring(text, dtype=np.float64, sep=' ')
+
+        if values.size != width * len(lines):
+            # Block contains malformed lines, fall back to parsing line by line
+            rows = []
+            for number, line in zip(numbers, lines):
+                if delimiter != ',':
+                    line = line.replace(',', '.')
+                try:
+                    row = np.array(self._split_line(line, delimiter), dtype='float')
+                except ValueError:
+                    row = None
+                if row is None or row.size != width:
+                    logger.warning(('Error reading line {} in file {}. ' + \
+                            'Line was {}').format(number, path, line.strip()))
                     continue
+                rows.append(row)
+            values = np.array(rows, dtype=np.float64)
+        return values.reshape(-1, width)[:, 1:]
+
+    def read_data_from_text(self, path, delimiter = '\t', asNumpy = False, debug = False,
+            out=None, blocksize=2**24):
+        """ Reads EMG data from a textfile
 
-                start = line.index('\t')
-                    # Skip the first column. Contains only time values (in case of PowerLab
-                    # export
-                line = line.replace(',', '.')
+            File is read in blocks of ``blocksize`` bytes, each block is parsed
+            at once. Result is either stored in an array growing geometrically
+            or written directly to a ``.npy`` file.
 
-                values = line[start + 1: len(line)].split('\t')
-                if arr is None:
-                    arr = np.array(values, dtype = 'float').reshape(1, len(values))
-                else:
-                    try:
-                        arr = np.row_stack((
-                            arr,
-                            np.array(values, dtype = 'float').reshape(1, len(values))
-                        ))
-                    except ValueError as e:
-                        print (
-                                'Error reading line %i in file %s. Line was %s' %
-                                (count, path, line)
-                              )
-                if (count % 10000) == 0:
-                    print '%d lines already read' % count
-                if debug:
-                    if count > 99:
-                        break
+            Args:
+                path (String): Path to the text file which should be read
+                delimiter (String, optional): Delimiter of columns
+                asNumpy (Boolean, optional): If set to true numpy array is returned
+                    instead of Pandas DataFrame
+                debug (boolean): If set to true only first 100 Lines are considered
+                out (String, optional): Path to ``.npy`` file data is written
+                    to. If set, file is returned as memory map.
+                blocksize (int, optional): Approximate number of bytes parsed at
+                    once
 
-        if type(arr) is pd.DataFrame:
-            arr = arr.values
-        elif type(arr) is np.ndarray:
-            pass
-        else:
-            raise ValueError('Error loading data from pickled file. Encountered ' + \
-                    'unsupported data type. Expected pandas.core.DataFrame or ' + \
-                    'numpy.ndarray. Instead got {}'.format(type(arr))
-                    )
+            Note:
+                Commas are interpreted as decimal points if ``delimiter`` is
+                not a comma.
+
+            Returns:
+                numpy.ndarray
+                numpy.memmap if ``out`` is set
+        """
+        arr = None
+        width = None
+        rows = 0
+        count = 0
+        fout = None
+        if out is not None:
+            fout = open(out, 'wb+')
+
+        try:
+            with open(path, 'r') as f:
+                while True:
+                    lines = f.readlines(blocksize)
+                    if len(lines) == 0:
+                        break
+                    if debug:
+                        lines = lines[:100 - count]
+                    values = self._parse_block(lines, delimiter, path, count)
+                    count = count + len(lines)
+                    if values is None:
+                        continue
+
+                    if width is None:
+                        width = values.shape[1]
+                        if fout is None:
+                            # Initial capacity is estimated from size of file
+                            capacity = int(float(os.path.getsize(path)) /
+                                    len(''.join(lines)) * len(lines))
+                            arr = np.empty((max(capacity, values.shape[0]), width))
+                        else:
+                            self._write_npy_header(fout, 0, width)
+                    elif values.shape[1] != width:
+                        raise ValueError((
+                            'Number of columns changed from {} to {} around ' + \
+                            'line {} in file {}'
+                            ).format(width, values.shape[1], count, path))
+
+                    if fout is not None:
+                        fout.write(np.ascontiguousarray(values).tostring())
+                    else:
+                        if rows + values.shape[0] > arr.shape[0]:
+                            # Grow geometrically to keep number of copies low
+                            arr.resize(
+                                (max(2 * arr.shape[0], rows + values.shape[0]), width),
+                                refcheck=False
+                                )
+                        arr[rows:rows + values.shape[0]] = values
+                    rows = rows + values.shape[0]
+                    if debug and count > 99:
+                        break
 
+            if width is None:
+                raise ValueError('Error loading data from text file. No data ' + \
+                        'found in file {}'.format(path))
+            if fout is not None:
+                self._write_npy_header(fout, rows, width)
+        finally:
+            if fout is not None:
+                fout.close()
+
+        if out is not None:
+            return np.load(out, mmap_mode='r+')
+        arr.resize((rows, width), refcheck=False)
         return arr
 
     def read_pickled_data(self, source):
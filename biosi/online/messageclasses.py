@@ -4,37 +4,185 @@
 import numpy as np
 import time
 import struct
+import zlib
 import logging
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
 logging.basicConfig(level=logging.DEBUG)
 
 
+FRAME_MARKER = '\xffBFT'
+""" Precedes number and sizes of joined frames, see ``join_frames``.
+    Distinguishes joined frames from a message sent as a whole.
+"""
+
+
+def frame_table(frames):
+    """ Returns ``FRAME_MARKER`` followed by number and sizes of frames
+
+        Args:
+            frames (List): Strings or buffers
+
+        Returns:
+            String
+    """
+    return FRAME_MARKER + struct.pack('<{}I'.format(len(frames) + 1),
+            len(frames), *[len(f) for f in frames])
+
+
+def join_frames(frames, prefix='', sizes=False):
+    """ Copies frames into one contiguous buffer. Used for transports not
+        supporting multipart messages.
+
+        Args:
+            frames (List): Strings or buffers, e.g. returned by
+                ``ArrayMessage.frames``
+            prefix (String, optional): Prepended to message, e.g. topic
+            sizes (bool, optional): If set ``frame_table`` is written after
+                the prefix, see ``split_frames``
+
+        Returns:
+            bytearray
+    """
+    if sizes:
+        prefix = prefix + frame_table(frames)
+    message = bytearray(len(prefix) + sum([len(f) for f in frames]))
+    view = memoryview(message)
+    view[:len(prefix)] = prefix
+    position = len(prefix)
+    for frame in frames:
+        view[position:position + len(frame)] = frame
+        position += len(frame)
+    return message
+
+
+def split_frames(message, offset=0):
+    """ Splits a message created by ``join_frames`` with ``sizes`` set into
+        its frames. Frames are views on ``message``, data is not copied.
+        A message without ``frame_table``, e.g. sent by an older publisher,
+        is returned as one frame.
+
+        Args:
+            message (String, buffer): Joined frames
+            offset (int, optional): Length of prefix of message
+
+        Returns:
+            List of buffer
+    """
+    start = offset + len(FRAME_MARKER)
+    if len(message) >= start + 4 and \
+            message[offset:start] == FRAME_MARKER:
+        count, = struct.unpack_from('<I', message, start)
+        position = start + 4 * (count + 1)
+        if position <= len(message):
+            sizes = struct.unpack_from('<{}I'.format(count), message,
+                    start + 4)
+            if position + sum(sizes) == len(message):
+                frames = []
+                for size in sizes:
+                    frames.append(buffer(message, position, size))
+                    position += size
+                return frames
+    return [buffer(message, offset)]
+
+
 class ArrayMessage(object):
     """ Represents an array that is going to be send over the wire
+
+        A message consists of a header packed with ``header_format`` followed
+        by the data in C order:
+
+            magic (2s): Always ``AM``
+            version (B): Version of wire format
+            dtype (c): Type of data, see numpy.dtype.char
+            channels (I): Number of columns of data
+            sequence (I): Sequence number of message
+            rows (I): Number of rows of data
+            timestamp (Q): Timestamp data was created in ms
+            samplingrate (d): Sampling rate of data
+            duration (f): Duration the data is representing
+            flags (B): Combination of ``FLAG_SCALED`` and ``FLAG_DELTA``
+            compression (B): Position of compression in ``compressions``
+            padding (2x): Data starts at a multiple of eight bytes
+
+        If ``FLAG_SCALED`` is set, scale and offset of each channel follow
+        the header as float64. Physical values are ``data * scale + offset``.
+        If ``FLAG_DELTA`` is set, the first row is followed by the
+        differences of consecutive rows. Differences of integers wrap around,
+        the encoding is lossless.
+
+        All values are little endian. Messages of version 1, i.e. a header
+        packed with ``legacy_header_format`` followed by float64 data, and
+        of version 2 can still be deserialized.
     """
-    header_format = '<Qfii'
+    magic = 'AM'
+    version = 3
+    header_format = '<2sBcIIIQdfBB2x'
     """ The format of the header appended before the actual data.
         See https://docs.python.org/3/library/struct.html for more information.
         During unpacking this attribute is used to separate data from auxialiary
         information
     """
+    legacy_header_format = '<Qfii'
+    """ Format of header of version 1 messages
+    """
+    compressions = [None, 'zlib', 'lz4']
+    """ Supported compressions of data
+    """
+    FLAG_SCALED = 1
+    FLAG_DELTA = 2
     duration = 0.15
     """ Duration the array represented by this message is representing
     """
-    def __init__(self, data, timestamp=None, sr=None):
+    def __init__(self, data, timestamp=None, sr=None, sequence=0, scale=None,
+            offset=None, compression=None, delta=False):
         """ Initializes object
         
             Args:
                 data (numpy.ndarray): Data for Message
                 timestamp (long): Timestamp data was created in ms
                 sr (int): Sampling-rate of data
+                sequence (int): Sequence number of message
+                scale (numpy.ndarray, optional): Scale of each channel
+                offset (numpy.ndarray, optional): Offset of each channel
+                compression (String, optional): One of ``compressions``
+                delta (bool, optional): Whether to send differences of
+                    consecutive rows. Only supported for integer data
 
             Note:
                 If ``timestamp`` is not given, time when message is
                 created is used
+
+            Raises:
+                ValueError if compression is not supported
         """
+        if compression not in self.compressions:
+            raise ValueError(('ArrayMessage: Compression {} not supported, ' + \
+                    'use one of {}').format(compression, self.compressions))
+        if compression == 'lz4' and lz4 is None:
+            raise ValueError('ArrayMessage: Compression lz4 requires ' + \
+                    'package lz4')
+        if delta and np.dtype(data.dtype).kind not in 'iu':
+            raise ValueError('ArrayMessage: Delta encoding requires integer ' + \
+                    'data, got {}'.format(data.dtype))
         self._logger = logging.getLogger('ArrayMessageLogger')
         self._data = data
         self._samplingrate = None
+        self._sequence = sequence
+        self._compression = compression
+        self._delta = delta
+        self._scale = None
+        self._offset = None
+        if scale is not None or offset is not None:
+            channels = 1 if data.ndim == 1 else data.shape[1]
+            self._scale = np.ones(channels)
+            self._offset = np.zeros(channels)
+            if scale is not None:
+                self._scale[:] = scale
+            if offset is not None:
+                self._offset[:] = offset
         if timestamp is None:
             self._timestamp = int(time.time() * 1000)
         else:
@@ -51,6 +199,36 @@ class ArrayMessage(object):
         """
         return self._data
 
+    @property
+    def values(self):
+        """ Returns data in physical units, i.e. scaled and shifted by scale
+            and offset of channels
+
+            Returns:
+                numpy.ndarray
+        """
+        if self._scale is None:
+            return self._data
+        return self._data * self._scale + self._offset
+
+    @property
+    def scale(self):
+        """ Getter property for attribute scale
+
+            Returns:
+                numpy.ndarray
+        """
+        return self._scale
+
+    @property
+    def offset(self):
+        """ Getter property for attribute offset
+
+            Returns:
+                numpy.ndarray
+        """
+        return self._offset
+
     @property
     def timestamp(self):
         """ Getter property for attribute timestamp
@@ -60,6 +238,49 @@ class ArrayMessage(object):
         """
         return self._timestamp
 
+    @property
+    def samplingrate(self):
+        """ Getter property for attribute samplingrate
+
+            Returns:
+                int
+        """
+        return self._samplingrate
+
+    @property
+    def sequence(self):
+        """ Getter property for attribute sequence
+
+            Returns:
+                int
+        """
+        return self._sequence
+
+    @classmethod
+    def quantize(cls, data, dtype='int16', **kwargs):
+        """ Alternative constructor, stores ``data`` as integers of type
+            ``dtype``. Scale and offset of each channel map the range of the
+            channel onto the range of ``dtype``.
+
+            Args:
+                data (numpy.ndarray): Data for Message
+                dtype (String): Integer type, e.g. ``int16``
+                kwargs: Passed to constructor
+
+            Returns:
+                online.messageclasses.ArrayMessage
+        """
+        info = np.iinfo(dtype)
+        # One dimensional data is a single channel
+        low = np.atleast_1d(data.min(axis=0))
+        high = np.atleast_1d(data.max(axis=0))
+        scale = (high - low) / (float(info.max) - info.min)
+        scale[scale == 0] = 1.
+        offset = low - info.min * scale
+        raw = np.round((data - offset) / scale)
+        raw = np.clip(raw, info.min, info.max).astype(dtype)
+        return cls(raw, scale=scale, offset=offset, **kwargs)
+
     @classmethod
     def get_headerlength(self):
         """ Gets the length of the header based on attribute *header_format*
@@ -69,41 +290,214 @@ class ArrayMessage(object):
         """
         return struct.calcsize(self.header_format)
 
-    def serialize(self, sr):
-        """ Returns a serialized representation of this object
+    def frames(self, sr=None):
+        """ Returns header and data of message as separate frames. The data
+            frame is a view on the array, it is not copied.
 
             Args:
-                sr (int): sampling rate with which data for message was sampled
+                sr (int, optional): sampling rate with which data for message
+                    was sampled. If not set sampling rate of message is used
+
+            Note:
+                Data must not be changed until the frames are sent. Data is
+                encoded into a new buffer if message is delta encoded or
+                compressed.
+
             Returns:
-                serialized object
+                header (String), data (buffer)
         """
+        if sr is None:
+            sr = 0 if self._samplingrate is None else self._samplingrate
+        data = self.data
+        if data.ndim == 1:
+            data = data.reshape(-1, 1)
+        if data.dtype.byteorder == '>':
+            data = data.astype(data.dtype.newbyteorder('<'))
+        # Copies only if data is not contiguous, e.g. a slice of columns
+        data = np.ascontiguousarray(data)
+        flags = 0
+        if self._scale is not None:
+            flags |= self.FLAG_SCALED
+        if self._delta:
+            flags |= self.FLAG_DELTA
+            encoded = np.empty_like(data)
+            encoded[:1] = data[:1]
+            np.subtract(data[1:], data[:-1], out=encoded[1:])
+            data = encoded
         header = struct.pack(
                 self.header_format,
+                self.magic,
+                self.version,
+                data.dtype.char,
+                data.shape[1],
+                self.sequence,
+                data.shape[0],
                 self.timestamp,
-                self.duration,
                 sr,
-                self.data.shape[0]
+                self.duration,
+                flags,
+                self.compressions.index(self._compression)
                 )
-        message = header + self.data.tostring()
-        return message
+        if self._scale is not None:
+            header += np.concatenate((self._scale, self._offset)) \
+                    .astype('<f8').tostring()
+
+        payload = buffer(data)
+        if self._compression == 'zlib':
+            payload = zlib.compress(payload, 1)
+        elif self._compression == 'lz4':
+            payload = lz4.block.compress(payload)
+        return [header, payload]
+
+    def serialize(self, sr=None):
+        """ Returns a serialized representation of this object. Data is
+            copied once, use ``frames`` to avoid the copy.
+
+            Args:
+                sr (int): sampling rate with which data for message was sampled
+            Returns:
+                bytearray
+        """
+        return join_frames(self.frames(sr))
 
     @classmethod
     def deserialize(cls, message):
-        """ Initializes object from a message
+        """ Initializes object from a message. Data is not copied but read
+            from ``message`` directly. Data is read-only if ``message`` is
+            immutable, e.g. a String.
+
+            Args:
+                message (String, buffer, List): Serialized message or header
+                    and data frame as returned by ``frames``
+
+            Returns:
+                online.messageclasses.ArrayMessage
+
+            Raises:
+                ValueError if version of message is not supported
         """
         logger = logging.getLogger('ArrayMessageLogger')
+        if isinstance(message, (list, tuple)):
+            header, payload = message
+        else:
+            header = payload = message
+        if payload is header and cls._is_legacy(message):
+            return cls._deserialize_legacy(message)
+
+        magic, version, dtype, channels, sequence, rows, timestamp, sr, \
+                duration, flags, compression = struct.unpack_from(
+                        cls.header_format, header)
+        if version > cls.version:
+            raise ValueError('ArrayMessage.deserialize: Unsupported version ' + \
+                    '{} of wire format'.format(version))
         headerlength = cls.get_headerlength()
-        header = message[:headerlength]
-        strdata = message[headerlength:]
-        timestamp, duration, sr, nrows = struct.unpack(cls.header_format, header)
+        scale = None
+        offset = None
+        if flags & cls.FLAG_SCALED:
+            calibration = np.frombuffer(header, dtype='<f8',
+                    count=2 * channels, offset=headerlength)
+            scale = calibration[:channels]
+            offset = calibration[channels:]
+            headerlength += calibration.nbytes
+        start = 0 if payload is not header else headerlength
 
+        compression = cls.compressions[compression]
+        if compression is not None:
+            payload = buffer(payload, start)
+            start = 0
+            if compression == 'zlib':
+                payload = zlib.decompress(payload)
+            elif lz4 is None:
+                raise ValueError('ArrayMessage.deserialize: Compression ' + \
+                        'lz4 requires package lz4')
+            else:
+                payload = lz4.block.decompress(payload)
         try:
-            data = np.fromstring(strdata, dtype='float64').reshape(nrows, -1)
+            data = np.frombuffer(
+                    payload,
+                    dtype=np.dtype(dtype).newbyteorder('<'),
+                    count=rows * channels,
+                    offset=start
+                    ).reshape(rows, channels)
         except Exception as e:
             logger.error('Unexpected error while deserializing array. Error was: ' + \
                     '{}'.format(e.message))
             raise e
-        obj = cls(data, timestamp, sr)
+        if flags & cls.FLAG_DELTA:
+            data = np.cumsum(data, axis=0, dtype=data.dtype)
+        obj = cls(data, timestamp, sr, sequence, scale, offset)
         obj.duration = duration
         return obj
 
+    @classmethod
+    def deserialize_batch(cls, message):
+        """ Initializes objects from a message that may contain several
+            coalesced messages, i.e. the header and data frames of each
+            message one after the other.
+
+            Args:
+                message (String, buffer, List): Serialized message or list of
+                    frames
+
+            Returns:
+                List of online.messageclasses.ArrayMessage
+        """
+        if not isinstance(message, (list, tuple)):
+            return [cls.deserialize(message)]
+        return [cls.deserialize(message[i:i + 2]) for i in
+                range(0, len(message), 2)]
+
+    @classmethod
+    def _is_legacy(cls, message):
+        """ Returns whether a single serialized message is of version 1.
+            Messages of version 1 start with a timestamp instead of
+            ``magic``, whose first bytes may equal ``magic`` by chance.
+            Therefore the remaining header and the length of the message are
+            checked as well.
+
+            Args:
+                message (String, buffer): Serialized message
+
+            Returns:
+                bool
+        """
+        headerlength = cls.get_headerlength()
+        if message[:2] != cls.magic or len(message) < headerlength:
+            return True
+        magic, version, dtype, channels, sequence, rows, timestamp, sr, \
+                duration, flags, compression = struct.unpack_from(
+                        cls.header_format, message)
+        try:
+            dtype = np.dtype(dtype)
+        except TypeError:
+            return True
+        if version < 2 or dtype.kind not in 'biuf' or \
+                flags > cls.FLAG_SCALED | cls.FLAG_DELTA or \
+                compression >= len(cls.compressions):
+            return True
+        if flags & cls.FLAG_SCALED:
+            headerlength += 16 * channels
+        if cls.compressions[compression] is None:
+            return len(message) != headerlength + \
+                    rows * channels * dtype.itemsize
+        return len(message) <= headerlength
+
+    @classmethod
+    def _deserialize_legacy(cls, message):
+        """ Initializes object from a message of version 1
+        """
+        logger = logging.getLogger('ArrayMessageLogger')
+        headerlength = struct.calcsize(cls.legacy_header_format)
+        timestamp, duration, sr, nrows = struct.unpack_from(
+                cls.legacy_header_format, message)
+
+        try:
+            data = np.frombuffer(message, dtype='<f8', offset=headerlength) \
+                    .reshape(nrows, -1)
+        except Exception as e:
+            logger.error('Unexpected error while deserializing array. Error was: ' + \
+                    '{}'.format(e.message))
+            raise e
+        obj = cls(data, timestamp, sr)
+        obj.duration = duration
+        return obj
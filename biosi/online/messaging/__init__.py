@@ -4,10 +4,13 @@
 
 TECHNOLOGY = 'nanomsg'
 #TECHNOLOGY = 'zmq'
-""" Defines whether to use NanoMSG or ZMQ for publisher/subsciber functionality.
+#TECHNOLOGY = 'shm'
+""" Defines whether to use NanoMSG, ZMQ or shared memory for
+    publisher/subsciber functionality.
     Set ``TECHNOLOGY`` to:
         - nanomsg
         - zmq
+        - shm (publisher and subscribers on the same host only)
     to get respective implementations
 """
 class HiddenComponent(object):
@@ -33,10 +36,11 @@ class HiddenComponent(object):
 class HiddenPublisher(HiddenComponent):
     """ Abstract base class for ZMQ/Nanomsg implementations of Publisher"""
     def publish(self, message):
-        """ Publishes message
+        """ Publishes message under topic of publisher
             
             Args:
-                message (String): Message to publish
+                message (String, List): Message to publish, either as one
+                    String or as list of frames (Strings or buffers)
         """
         pass
 
@@ -44,16 +48,27 @@ class HiddenPublisher(HiddenComponent):
 class HiddenSubscriber(HiddenComponent):
     """ Abstract base class for ZMQ/Nanomsg implementations of Subscriber"""
     def receive(self):
-        """ Receives a message
+        """ Receives a message. Topic is removed from message.
         """
         pass
 
-if TECHNOLOGY == 'nanomsg':
-    from nanomsgcomponents import NanomsgPublisher as Publisher
-    from nanomsgcomponents import NanomsgSubscriber as Subscriber
-elif TECHNOLOGY == 'zmq':
-    from zeromqcomponents import ZmqPublisher as Publisher
-    from zeromqcomponents import ZmqSubscriber as Subscriber
-else:
-    raise NotImplementedError('Technology {} not implemented'.format(TECHNOLOGY))
-
+try:
+    if TECHNOLOGY == 'nanomsg':
+        from nanomsgcomponents import NanomsgPublisher as Publisher
+        from nanomsgcomponents import NanomsgSubscriber as Subscriber
+    elif TECHNOLOGY == 'zmq':
+        from zeromqcomponents import ZmqPublisher as Publisher
+        from zeromqcomponents import ZmqSubscriber as Subscriber
+    elif TECHNOLOGY == 'shm':
+        from sharedmemorycomponents import SharedMemoryPublisher as Publisher
+        from sharedmemorycomponents import SharedMemorySubscriber as Subscriber
+    else:
+        raise NotImplementedError('Technology {} not implemented'.format(
+            TECHNOLOGY))
+except ImportError as _error:
+    # Package of technology is missing. Other backends, e.g. the shared memory
+    # components, remain importable, the error is raised on first use
+    def Publisher(*args, **kwargs):
+        raise ImportError('Technology {} not available: {}'.format(
+            TECHNOLOGY, _error))
+    Subscriber = Publisher
@@ -9,6 +9,8 @@ from nanomsg import NanoMsgAPIError
 from . import HiddenComponent
 from . import HiddenPublisher
 from . import HiddenSubscriber
+from online.messageclasses import join_frames
+from online.messageclasses import split_frames
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -38,9 +40,13 @@ class NanomsgPublisher(HiddenPublisher):
         """ Publishes message
 
             Args:
-                message (String): Message to publish
+                message (String, List): Message to publish. Frames are copied
+                    into one buffer together with their sizes since nanomsg
+                    has no multipart messages
         """
-        self._socket.send('{}|{}'.format(self._topic, message))
+        if not isinstance(message, (list, tuple)):
+            message = [message]
+        self._socket.send(join_frames(message, self._topic + '|', sizes=True))
 
     def __enter__(self):
         """ Statement used for the `` with ... as ...:`` returns
@@ -84,10 +90,13 @@ class NanomsgSubscriber(HiddenSubscriber):
         """ Receives a message
 
             Returns:
-                String
+                buffer or List of buffers if message has multiple frames
         """
         message = self._socket.recv()
-        return message[len(self.topic) + 1:]
+        frames = split_frames(message, len(self.topic) + 1)
+        if len(frames) == 1:
+            return frames[0]
+        return frames
 
     def __enter__(self):
         """ Statement used for the `` with ... as ...:`` returns
@@ -0,0 +1,372 @@
+""" This module contains publisher/subscriber components exchanging messages
+    through a ring buffer in shared memory. Publisher and subscribers have
+    to run on the same host.
+
+    The ring buffer is a memory mapped file in ``/dev/shm`` (or the directory
+    for temporary files if it does not exist) named after url and topic. It
+    consists of a header followed by ``slots`` slots:
+
+        header (8 uint64): magic, version, number of slots, size of slot,
+            number of messages published, three reserved values
+        slot (2 uint64 + slot_size bytes): sequence, length of message,
+            message as joined by ``online.messageclasses.join_frames``
+
+    The publisher is the only writer. Before writing a message to slot
+    ``n % slots`` it sets the sequence of the slot to ``2n + 1``, afterwards
+    to ``2n + 2`` and increments the number of published messages. A
+    subscriber keeps its own cursor, i.e. the number of the next message to
+    read. It copies a message out of its slot and accepts it if the sequence
+    of the slot was ``2n + 2`` before and after copying. Otherwise the
+    publisher has overwritten the slot and the subscriber skips ahead, see
+    ``SharedMemorySubscriber.dropped``. No locks are used.
+
+    Note:
+        Ordering of stores is taken from the CPU, which is sufficient on x86.
+        Only POSIX platforms are supported: A publisher replaces and removes
+        the backing file while subscribers may still map it.
+"""
+import numpy as np
+import os
+import re
+import tempfile
+import time
+from . import HiddenComponent
+from . import HiddenPublisher
+from . import HiddenSubscriber
+from online.messageclasses import frame_table
+from online.messageclasses import split_frames
+import struct
+import logging
+logging.basicConfig(level=logging.DEBUG)
+
+MAGIC = 0x4d485342  # 'BSHM'
+VERSION = 2
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 16
+SLOTS = 64
+""" Default number of slots of ring buffer
+"""
+SLOT_SIZE = 2 ** 18
+""" Default size of one slot in bytes, i.e. maximum size of a message
+"""
+SHM_DIRECTORY = '/dev/shm' if os.path.isdir('/dev/shm') else \
+        tempfile.gettempdir()
+SUPPORTED = os.name == 'posix'
+""" Whether the platform allows to replace and remove mapped files
+"""
+
+
+def _check_platform():
+    """ Raises NotImplementedError if platform is not supported
+    """
+    if not SUPPORTED:
+        raise NotImplementedError(('Shared memory transport requires a ' + \
+                'POSIX platform, use nanomsg or zmq on {}').format(os.name))
+
+
+def get_path(url, topic):
+    """ Returns path of file backing the ring buffer of ``url`` and ``topic``
+
+        Args:
+            url (String): Url of the form ``<transport>://<name>``, e.g.
+                ``shm://emg`` or ``inproc://emg``
+            topic (String): Topic of publisher
+
+        Returns:
+            String
+
+        Raises:
+            ValueError if url refers to another host
+    """
+    transport, _, name = url.partition('://')
+    if transport not in ['shm', 'inproc', 'ipc']:
+        raise ValueError('Shared memory transport does not support url {}'
+                .format(url))
+    name = re.sub('[^A-Za-z0-9_.-]', '_', '{}-{}'.format(name, topic))
+    return os.path.join(SHM_DIRECTORY, 'biosi-' + name)
+
+
+class RingMemory(object):
+    """ Views on the memory mapped ring buffer
+
+        Attributes:
+            header (numpy.ndarray): Header as uint64
+            meta (List): Sequence and length of each slot as uint64 arrays
+            slots (List): Payload of each slot as uint8 arrays
+            slot_size (int): Size of payload of one slot
+            inode (int): Inode of mapped file
+    """
+
+    def __init__(self, path, create=False, slots=SLOTS, slot_size=SLOT_SIZE):
+        """ Maps ring buffer into memory
+
+            Args:
+                path (String): Path of file backing the ring buffer
+                create (bool, optional): If set the file is created and
+                    initialized, otherwise an existing file is mapped
+                slots (int, optional): Number of slots, only used if
+                    ``create`` is set
+                slot_size (int, optional): Size of slot in bytes, only used
+                    if ``create`` is set
+
+            Raises:
+                IOError if file does not exist and ``create`` is not set
+                ValueError if file is not a ring buffer
+        """
+        if create:
+            # Round up to keep all values aligned to eight bytes
+            slot_size = (slot_size + 7) // 8 * 8
+            size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + slot_size)
+            # Create new file and replace an existing one at once so that
+            # subscribers never map a partially initialized file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(struct.pack('<4Q', MAGIC, VERSION, slots, slot_size))
+                fh.truncate(size)
+            os.rename(tmp, path)
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r+')
+        memory = self._mmap.view(np.ndarray)
+        self.inode = os.stat(path).st_ino
+        self.header = memory[:HEADER_SIZE].view('<u8')
+        if self.header[0] != MAGIC or self.header[1] != VERSION:
+            raise ValueError('File {} is not a ring buffer of version {}'
+                    .format(path, VERSION))
+        slots = int(self.header[2])
+        self.slot_size = int(self.header[3])
+        self.meta = []
+        self.slots = []
+        for i in range(slots):
+            start = HEADER_SIZE + i * (SLOT_HEADER_SIZE + self.slot_size)
+            self.meta.append(memory[start:start + SLOT_HEADER_SIZE].view('<u8'))
+            start += SLOT_HEADER_SIZE
+            self.slots.append(memory[start:start + self.slot_size])
+
+    def close(self):
+        """ Unmaps memory
+        """
+        self.header = None
+        self.meta = None
+        self.slots = None
+        self._mmap = None
+
+
+class SharedMemoryPublisher(HiddenPublisher):
+    """ Publisher class writing messages to a ring buffer in shared memory
+
+        Attributes:
+            topic (String): Topic publisher publishs to
+            path (String): Path of file backing the ring buffer
+    """
+    def __init__(self, url, topic, slots=SLOTS, slot_size=SLOT_SIZE):
+        """ Initializes object
+
+            Args:
+                url (String): url to publish messages to, e.g. ``shm://emg``
+                topic (String): Topic to publish messages under
+                slots (int, optional): Number of messages buffered
+                slot_size (int, optional): Maximum size of a message in bytes
+
+            Raises:
+                NotImplementedError if platform is not POSIX
+        """
+        _check_platform()
+        super(SharedMemoryPublisher, self).__init__(topic)
+        self._path = get_path(url, topic)
+        self._memory = RingMemory(self._path, True, slots, slot_size)
+        self._logger = logging.getLogger('SharedMemoryPublisher')
+
+    @property
+    def path(self):
+        """ Returns path of file backing the ring buffer
+
+            Returns:
+                String
+        """
+        return self._path
+
+    def publish(self, message):
+        """ Publishes message
+
+            Args:
+                message (String, List): Message to publish. Frames are
+                    copied into a slot together with their sizes
+
+            Raises:
+                ValueError if message is larger than a slot
+        """
+        if not isinstance(message, (list, tuple)):
+            message = [message]
+        memory = self._memory
+        sizes = frame_table(message)
+        length = len(sizes) + sum([len(f) for f in message])
+        if length > memory.slot_size:
+            raise ValueError(('Message of {} bytes does not fit into slot ' + \
+                    'of {} bytes').format(length, memory.slot_size))
+
+        sequence = int(memory.header[4])
+        slot = sequence % len(memory.slots)
+        meta = memory.meta[slot]
+        payload = memory.slots[slot]
+        meta[0] = 2 * sequence + 1
+        position = 0
+        for frame in [sizes] + list(message):
+            payload[position:position + len(frame)] = np.frombuffer(frame,
+                    dtype=np.uint8)
+            position += len(frame)
+        meta[1] = length
+        meta[0] = 2 * sequence + 2
+        memory.header[4] = sequence + 1
+
+    def __enter__(self):
+        """ Statement used for the `` with ... as ...:`` returns
+            the object to use in the ``with`` block
+
+            Returns:
+                SharedMemoryPublisher
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """ Executed when leaving ``with`` block, regardless whether
+            because of an exception or normal program flow
+        """
+        inode = self._memory.inode
+        self._memory.close()
+        # Subscribers already attached keep their mapping
+        if os.path.exists(self._path) and os.stat(self._path).st_ino == inode:
+            os.unlink(self._path)
+
+
+class SharedMemorySubscriber(HiddenSubscriber):
+    """ Subscriber class reading messages from a ring buffer in shared memory.
+        Each subscriber receives all messages published after it attached
+        to the ring buffer, unless it falls behind by more than the number of
+        slots.
+
+        Attributes:
+           topic (String): Topic subscriber subscribes to
+           dropped (int): Number of messages overwritten before they were read
+    """
+    def __init__(self, url, topic, timeout=0.5, spin=1000):
+        """ Initializes object
+
+            Args:
+                url (String): url to publish messages to
+                topic (String): Topic to publish messages under
+                timeout (float, optional): Seconds to wait for a message
+                spin (int, optional): Number of polls before subscriber starts
+                    to sleep between polls. Spinning minimizes latency
+
+            Raises:
+                NotImplementedError if platform is not POSIX
+        """
+        _check_platform()
+        super(SharedMemorySubscriber, self).__init__(topic)
+        self._path = get_path(url, topic)
+        self._timeout = timeout
+        self._spin = spin
+        self._memory = None
+        self._cursor = None
+        self._dropped = 0
+        self._logger = logging.getLogger('SharedMemorySubscriber')
+
+    @property
+    def dropped(self):
+        """ Returns number of messages overwritten before they were read
+
+            Returns:
+                int
+        """
+        return self._dropped
+
+    def _attach(self):
+        """ Maps ring buffer if publisher created it (again). Returns
+            whether ring buffer is mapped.
+
+            Returns:
+                bool
+        """
+        try:
+            inode = os.stat(self._path).st_ino
+        except OSError:
+            return self._memory is not None
+        if self._memory is None or self._memory.inode != inode:
+            if self._memory is not None:
+                self._memory.close()
+            self._memory = RingMemory(self._path)
+            self._cursor = int(self._memory.header[4])
+        return True
+
+    def _read(self):
+        """ Returns next message or None if no message is available
+
+            Returns:
+                List of buffers
+        """
+        memory = self._memory
+        published = int(memory.header[4])
+        if self._cursor >= published:
+            return None
+        if published - self._cursor > len(memory.slots):
+            self._dropped += published - self._cursor - len(memory.slots)
+            self._cursor = published - len(memory.slots)
+        slot = self._cursor % len(memory.slots)
+        meta = memory.meta[slot]
+        expected = 2 * self._cursor + 2
+        if meta[0] != expected:
+            self._dropped += 1
+            self._cursor += 1
+            return None
+        message = bytearray(int(meta[1]))
+        np.frombuffer(message, dtype=np.uint8)[:] = \
+                memory.slots[slot][:len(message)]
+        if meta[0] != expected:
+            # Slot was overwritten while copying
+            self._dropped += 1
+            self._cursor += 1
+            return None
+        self._cursor += 1
+        return split_frames(message)
+
+    def receive(self):
+        """ Receives a message
+
+            Returns:
+                buffer or List of buffers if message has multiple frames
+
+            Raises:
+                IOError if no message arrived within timeout
+        """
+        deadline = time.time() + self._timeout
+        polls = 0
+        while True:
+            if self._memory is not None or self._attach():
+                frames = self._read()
+                if frames is not None:
+                    if len(frames) == 1:
+                        return frames[0]
+                    return frames
+            polls += 1
+            if polls > self._spin:
+                if time.time() > deadline:
+                    # Publisher may have been restarted
+                    self._attach()
+                    raise IOError('No message received on {} within {}s'
+                            .format(self._path, self._timeout))
+                time.sleep(0.0001)
+
+    def __enter__(self):
+        """ Statement used for the `` with ... as ...:`` returns
+            the object to use in the ``with`` block
+
+            Returns:
+                SharedMemorySubscriber
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """ Executed when leaving ``with`` block, regardless whether
+            because of an exception or normal program flow
+        """
+        if self._memory is not None:
+            self._memory.close()
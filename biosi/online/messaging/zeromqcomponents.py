@@ -39,9 +39,13 @@ class ZmqPublisher(HiddenPublisher):
         """ Publishes message
 
             Args:
-                message (String): Message to publish
+                message (String, List): Message to publish. Frames are sent
+                    as parts of one multipart message without copying
         """
-        self._socket.send_multipart([self.topic, message])
+        if isinstance(message, (list, tuple)):
+            self._socket.send_multipart([self.topic] + list(message), copy=False)
+        else:
+            self._socket.send_multipart([self.topic, message])
 
     def __enter__(self):
         """ Statement used for the `` with ... as ...:`` returns
@@ -75,7 +79,7 @@ class ZmqSubscriber(HiddenSubscriber):
                 url (String): url to publish messages to
                 topic (String): Topic to publish messages under
         """
-        super(ZmqSubscriber, self).__init__(url)
+        super(ZmqSubscriber, self).__init__(topic)
         self._context = Context()
         self._socket = self._context.socket(SUB)
         self._socket.setsockopt(SUBSCRIBE, topic)
@@ -87,10 +91,12 @@ class ZmqSubscriber(HiddenSubscriber):
         """ Receives a message
 
             Returns:
-                String
+                buffer or List of buffers if message has multiple frames
         """
-        topic, message = self._socket.recv_multipart()
-        return message
+        frames = self._socket.recv_multipart(copy=False)
+        if len(frames) == 2:
+            return frames[1].buffer
+        return [frame.buffer for frame in frames[1:]]
 
     def __enter__(self):
         """ Statement used for the `` with ... as ...:`` returns
@@ -4,16 +4,31 @@ import online
 from threading import Thread
 from threading import currentThread
 from messaging import Publisher
-from Queue import Queue, Empty
+from ringbuffer import RingBuffer
+from Queue import Empty
+import time
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
 
 class AbstractPublisher(Thread):
     """ Abstract base class for concrete publisher classes
+
+        Messages are taken from the queue in batches. The frames of all
+        messages of a batch are sent as one multipart message, see
+        ``online.messageclasses.ArrayMessage.deserialize_batch``. A batch is
+        sent as soon as one of the following holds:
+            - it contains ``max_batch`` messages
+            - it contains at least ``max_bytes`` bytes
+            - the queue is empty and the first message of the batch was
+              taken from the queue ``max_latency`` seconds ago
+
+        With the defaults a batch contains the messages queued at the time
+        it is taken, i.e. messages are coalesced only under load.
     """
 
-    def __init__(self, topic, url, name, abort=None):
+    def __init__(self, topic, url, name, abort=None, max_batch=64,
+            max_bytes=2 ** 20, max_latency=0., capacity=256, policy='block'):
         """ Initializes object
 
             Args:
@@ -21,22 +36,38 @@ class AbstractPublisher(Thread):
                 url (String): URL to which data is published
                 name (String): Name of Thread
                 abort (threading.Event): Inidcates if Thread should abort
+                max_batch (int, optional): Maximum number of messages sent
+                    at once. Set to one to send each message on its own
+                max_bytes (int, optional): Size after which a batch is sent
+                max_latency (float, optional): Time in seconds to wait for
+                    further messages before a batch is sent
+                capacity (int, optional): Maximum number of queued messages
+                policy (String, optional): Behaviour if queue is full, see
+                    ``online.ringbuffer.RingBuffer``. By default sources wait
+                    until the publisher catches up
         """
         super(AbstractPublisher, self).__init__(name=name)
-        self._queue = Queue()
+        assert max_batch >= 1, 'AbstractPublisher: max_batch must be ' + \
+                'at least one, got {}'.format(max_batch)
+        self._queue = RingBuffer(capacity, policy)
         self._url = url
         self._topic = topic
         self._abort = abort
+        self._max_batch = max_batch
+        self._max_bytes = max_bytes
+        self._max_latency = max_latency
+        self._batch_sizes = {}
 
     @property
     def queue(self):
         """ Getter property for queue attribute.
 
             Queue contains messages (already serialized) to send it over the
-            network
+            network, either as String or as list of frames, see
+            ``online.messageclasses.ArrayMessage.frames``
 
             Returns:
-                Queue.queue
+                online.ringbuffer.RingBuffer
         """
         return self._queue
 
@@ -51,11 +82,96 @@ class AbstractPublisher(Thread):
         """
         return self._url
 
+    @property
+    def batch_sizes(self):
+        """ Returns how often batches of each size have been sent
+
+            Returns:
+                dict: Number of messages in batch to number of batches
+        """
+        return dict(self._batch_sizes)
+
+    @property
+    def mean_batch_size(self):
+        """ Returns mean number of messages per batch sent so far
+
+            Returns:
+                float
+        """
+        batches = sum(self._batch_sizes.values())
+        if batches == 0:
+            return 0.
+        messages = sum([k * v for k, v in self._batch_sizes.items()])
+        return float(messages) / batches
+
     def _cleanup(self):
         """ Clean ressources up after abortion
         """
         pass
 
+    def _next_batch(self):
+        """ Returns the next batch of messages, see class documentation
+
+            Returns:
+                List
+
+            Raises:
+                Queue.Empty if no message was queued within 10 seconds
+        """
+        batch = [self.queue.get(timeout=10)]
+        size = self._size(batch[0])
+        deadline = time.time() + self._max_latency
+        while len(batch) < self._max_batch and size < self._max_bytes:
+            items = self.queue.drain(self._max_batch - len(batch),
+                    self._max_bytes - size, self._size)
+            if len(items) == 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items = [self.queue.get(timeout=remaining)]
+                except Empty:
+                    break
+            for item in items:
+                batch.append(item)
+                size += self._size(item)
+        return batch
+
+    def _size(self, message):
+        """ Returns number of bytes of a message
+
+            Args:
+                message (String, List): Message or list of frames
+
+            Returns:
+                int
+        """
+        if isinstance(message, (list, tuple)):
+            return sum([len(frame) for frame in message])
+        return len(message)
+
+    def _publish(self, publisher, batch):
+        """ Publishes a batch of messages. Frames of consecutive messages
+            given as lists of frames are sent together, messages given as
+            String are sent on their own.
+
+            Args:
+                publisher (messaging.Publisher): Socket wrapper
+                batch (List): Messages
+        """
+        frames = []
+        for message in batch:
+            if isinstance(message, (list, tuple)):
+                frames.extend(message)
+            else:
+                if len(frames) > 0:
+                    publisher.publish(frames)
+                    frames = []
+                publisher.publish(message)
+        if len(frames) > 0:
+            publisher.publish(frames)
+        self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
     def run(self):
         """ Starts Thread
 
@@ -65,10 +181,9 @@ class AbstractPublisher(Thread):
         with Publisher(self._url, self._topic) as publisher:
             while True:
                 try:
-                    sample = self.queue.get(timeout=10)
-                    message = self._topic + sample
-                    publisher.publish(message)
-                    self.queue.task_done()
+                    batch = self._next_batch()
+                    self._publish(publisher, batch)
+                    self.queue.task_done(len(batch))
                 except Exception as e:
                     self._cleanup()
                     if self._abort is not None:
@@ -88,7 +203,7 @@ class EmgPublisher(AbstractPublisher):
     """ Publisher for EMG data
     """
 
-    def __init__(self, url, name='EmgPublisher', abort=None):
+    def __init__(self, url, name='EmgPublisher', abort=None, **kwargs):
         """ Initializes Object
 
             Args:
@@ -96,6 +211,7 @@ class EmgPublisher(AbstractPublisher):
                 name (String): Name of thread
                 abort (threading.Event): Used for singalling thread to
                     stop execution
+                kwargs: Batching parameters, see AbstractPublisher
 
             Examples:
                 >>> url = 'inproc://<identifier>'
@@ -120,14 +236,15 @@ class EmgPublisher(AbstractPublisher):
                 `<address>` can be an IPv4, IPv6 address or DNS name, `<port>`
                 is the numeric port.
         """
-        super(EmgPublisher, self).__init__('emg', url, name, abort=abort)
+        super(EmgPublisher, self).__init__('emg', url, name, abort=abort,
+                **kwargs)
 
 
 class KinPublisher(AbstractPublisher):
     """ Publisher for kinematic data
     """
 
-    def __init__(self, url, name='KinPublisher', abort=None):
+    def __init__(self, url, name='KinPublisher', abort=None, **kwargs):
         """ Initializes Object
 
             Args:
@@ -135,6 +252,7 @@ class KinPublisher(AbstractPublisher):
                 name (String): Name of thread
                 abort (threading.Event): Used for singalling thread to
                     stop execution
+                kwargs: Batching parameters, see AbstractPublisher
 
             Examples:
                 >>> url = 'inproc://<identifier>'
@@ -159,5 +277,6 @@ class KinPublisher(AbstractPublisher):
                 `<address>` can be an IPv4, IPv6 address or DNS name, `<port>`
                 is the numeric port.
         """
-        super(KinPublisher, self).__init__('kin', url, name, abort=abort)
+        super(KinPublisher, self).__init__('kin', url, name, abort=abort,
+                **kwargs)
 
@@ -0,0 +1,241 @@
+""" Module contains a bounded queue used to pass messages between sources,
+    publishers and subscribers
+"""
+from Queue import Empty
+from Queue import Full
+from threading import Condition
+from threading import Lock
+import time
+
+
+class RingBuffer(object):
+    """ First in first out queue with a fixed number of slots. Slots are
+        allocated once and reused, producer and consumer share one lock.
+        Implements the methods of ``Queue.Queue`` used by publishers and
+        subscribers.
+
+        Attributes:
+            capacity (int): Number of slots
+            policy (String): Behaviour if an item is put into a full buffer:
+                block: Wait until a slot is free
+                drop_oldest: Oldest item is discarded
+                drop_newest: New item is discarded
+            dropped (int): Number of discarded items
+            high_water (int): Largest number of items buffered at once
+    """
+    policies = ['block', 'drop_oldest', 'drop_newest']
+
+    def __init__(self, capacity, policy='block'):
+        """ Initializes object
+
+            Args:
+                capacity (int): Number of slots
+                policy (String, optional): One of ``policies``
+        """
+        assert capacity > 0, 'RingBuffer: Capacity must be positive, ' + \
+                'got {}'.format(capacity)
+        assert policy in self.policies, ('RingBuffer: Policy {} not ' + \
+                'supported, use one of {}').format(policy, self.policies)
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._policy = policy
+        # Position of oldest item and number of items
+        self._head = 0
+        self._size = 0
+        self._unfinished = 0
+        self._dropped = 0
+        self._high_water = 0
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        self._not_full = Condition(self._lock)
+        self._all_done = Condition(self._lock)
+
+    @property
+    def capacity(self):
+        """ Returns number of slots
+
+            Returns:
+                int
+        """
+        return self._capacity
+
+    @property
+    def policy(self):
+        """ Returns overflow policy
+
+            Returns:
+                String
+        """
+        return self._policy
+
+    @property
+    def dropped(self):
+        """ Returns number of items discarded because buffer was full
+
+            Returns:
+                int
+        """
+        return self._dropped
+
+    @property
+    def high_water(self):
+        """ Returns largest number of items buffered at once
+
+            Returns:
+                int
+        """
+        return self._high_water
+
+    def qsize(self):
+        """ Returns number of buffered items
+
+            Returns:
+                int
+        """
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def full(self):
+        return self._size == self._capacity
+
+    def _wait(self, condition, ready, block, timeout, error):
+        """ Waits on ``condition`` until ``ready`` returns True. Lock must
+            be held.
+
+            Raises:
+                ``error`` if not ready in time
+        """
+        if not block:
+            if not ready():
+                raise error
+        elif timeout is None:
+            while not ready():
+                condition.wait()
+        else:
+            end = time.time() + timeout
+            while not ready():
+                remaining = end - time.time()
+                if remaining <= 0:
+                    raise error
+                condition.wait(remaining)
+
+    def _pop(self):
+        """ Removes and returns oldest item. Lock must be held.
+        """
+        item = self._slots[self._head]
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self._capacity
+        self._size -= 1
+        return item
+
+    def put(self, item, block=True, timeout=None):
+        """ Appends an item. If buffer is full item is handled according to
+            policy.
+
+            Args:
+                item (Object): Item to append
+                block (bool, optional): Whether to wait for a free slot, only
+                    used by policy ``block``
+                timeout (float, optional): Maximum time to wait in seconds
+
+            Returns:
+                bool: False if item was discarded
+
+            Raises:
+                Queue.Full if no slot became free in time
+        """
+        with self._lock:
+            if self._size == self._capacity:
+                if self._policy == 'drop_newest':
+                    self._dropped += 1
+                    return False
+                elif self._policy == 'drop_oldest':
+                    self._pop()
+                    self._dropped += 1
+                    self._unfinished -= 1
+                else:
+                    self._wait(self._not_full,
+                            lambda: self._size < self._capacity,
+                            block, timeout, Full)
+            self._slots[(self._head + self._size) % self._capacity] = item
+            self._size += 1
+            self._unfinished += 1
+            if self._size > self._high_water:
+                self._high_water = self._size
+            self._not_empty.notify()
+            return True
+
+    def get(self, block=True, timeout=None):
+        """ Removes and returns oldest item
+
+            Args:
+                block (bool, optional): Whether to wait for an item
+                timeout (float, optional): Maximum time to wait in seconds
+
+            Returns:
+                Object
+
+            Raises:
+                Queue.Empty if no item arrived in time
+        """
+        with self._lock:
+            self._wait(self._not_empty, lambda: self._size > 0, block,
+                    timeout, Empty)
+            item = self._pop()
+            self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def drain(self, count, limit=None, weight=len):
+        """ Removes and returns up to ``count`` items without blocking
+
+            Args:
+                count (int): Maximum number of items
+                limit (float, optional): If set no further items are removed
+                    once the sum of the weights of removed items reaches
+                    ``limit``
+                weight (Callable, optional): Returns weight of an item, e.g.
+                    its size in bytes
+
+            Returns:
+                List
+        """
+        with self._lock:
+            if limit is None:
+                items = [self._pop() for _ in range(min(count, self._size))]
+            else:
+                items = []
+                total = 0
+                while len(items) < count and self._size > 0 and total < limit:
+                    items.append(self._pop())
+                    total += weight(items[-1])
+            if len(items) > 0:
+                self._not_full.notify(len(items))
+        return items
+
+    def task_done(self, count=1):
+        """ Marks ``count`` items as processed, see ``Queue.task_done``
+
+            Args:
+                count (int, optional): Number of items
+
+            Raises:
+                ValueError if called more often than items were put
+        """
+        with self._lock:
+            if count > self._unfinished:
+                raise ValueError('RingBuffer: task_done called too many times')
+            self._unfinished -= count
+            if self._unfinished == 0:
+                self._all_done.notify_all()
+
+    def join(self):
+        """ Blocks until all items have been processed
+        """
+        with self._lock:
+            while self._unfinished > 0:
+                self._all_done.wait()
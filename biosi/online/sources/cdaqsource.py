@@ -99,7 +99,9 @@ class CdaqSource(AbstractSource):
                         byref(self._read),
                         None
                         )
-                yield data
+                # Messages reference the yielded array until they are sent,
+                # the buffer is reused by the next read
+                yield data.copy()
         except pydaq.DAQError as err:
             logging.error('PyCDAQmx error in CdaqSource. Error was {}'.format(
                 str(err)))
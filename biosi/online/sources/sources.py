@@ -4,7 +4,7 @@
 """
 from threading import Thread
 from threading import currentThread
-from Queue import Queue
+from Queue import Full
 import json
 import cPickle
 import time
@@ -61,14 +61,25 @@ class AbstractSource(Thread):
             Runs as long as new data is available. If `acquire_data` returns
             `None` thread is terminated
         """
+        sequence = 0
         for sample in self.acquire_data():
             if sample is None:
                 print 'No new data available - shutting down data source'
                 if self._abort is not None:
                     self._abort.set()
                 break
-            message = ArrayMessage(sample)
-            self._publisher.queue.put(message.serialize(self.samplingrate))
+            message = ArrayMessage(sample, sequence=sequence)
+            frames = message.frames(self.samplingrate)
+            sequence += 1
+            # Wait for publisher if its queue is full, but keep checking
+            # whether to abort
+            while True:
+                try:
+                    self._publisher.queue.put(frames, timeout=1)
+                    break
+                except Full:
+                    if self._abort is not None and self._abort.is_set():
+                        break
 
             if self._abort is not None:
                 if self._abort.is_set():
@@ -101,7 +112,22 @@ class FileSource(AbstractSource):
         currently from WAY-GAAL experiment thing a session
     """
 
-    def __init__(self, publisher, samplingrate, modality, path='data/P1/HS_P1_S1.mat', abort=None, name='FileSource'):
+    def __init__(self, publisher, samplingrate, modality, path='data/P1/HS_P1_S1.mat',
+            abort=None, name='FileSource', cache_dir=None):
+        """ Initializes object
+
+            Args:
+                publisher (online.publisher.AbstractPublisher): Reference to
+                    publisher thread object
+                samplingrate (int): Sampling Rate of data provided by source
+                modality (String): Key of data in session, e.g. ``emg_data``
+                path (String): Path to `HS_P#_S#.mat` file
+                abort (threading.Event, optional): Event signalling, that
+                    Thread should shut down
+                name (String): Name of Thread
+                cache_dir (String, optional): Directory with cached sessions,
+                    see ``data.wayeeggal.read_session``
+        """
         super(FileSource, self).__init__(publisher, samplingrate, name, abort=abort)
         self._file = path
         """ Path to pickled numpy ndarray
@@ -109,7 +135,10 @@ class FileSource(AbstractSource):
         self._data = None
         try:
             with open(self._file, 'rb') as fh:
-                self._data = wayeeggal.read_session(self._file)[modality].values
+                self._data = wayeeggal.read_session(
+                        self._file,
+                        cache_dir=cache_dir
+                        )[modality].values
         except Exception as e:
             print 'Error while opening file {}. Error was {}'.format(
                     self._file, e.message
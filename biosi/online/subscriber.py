@@ -4,8 +4,8 @@ import online
 from threading import currentThread
 from threading import Thread
 from messaging import Subscriber
+from ringbuffer import RingBuffer
 #from nanomsg import EBADF, ENOTSUP, EFSM, EAGAIN, EINTER, ETIMEDOUT, ETERM
-from Queue import Queue
 import json
 import matplotlib.pyplot as plt
 import logging
@@ -30,16 +30,18 @@ logging.basicConfig(level=logging.DEBUG)
 def array_iterator(msgclass, subscriber):
     while True:
         message = subscriber.queue.get()
-        parsed = msgclass.deserialize(message)
+        parsed = msgclass.deserialize_batch(message)
         subscriber.queue.task_done()
-        yield parsed
+        for obj in parsed:
+            yield obj
 
 
 class AbstractSubscriber(Thread):
     """ Abstract base class for concrete subscribers
     """
 
-    def __init__(self, url, topic, name, abort=None):
+    def __init__(self, url, topic, name, abort=None, capacity=256,
+            policy='drop_oldest'):
         """ Initiates object
 
             Args:
@@ -47,11 +49,16 @@ class AbstractSubscriber(Thread):
                 topic (String): Topic to subscribe to
                 name (String): Name of Thread
                 abort (threading.Event): Inidcates if Thread should abort
+                capacity (int, optional): Maximum number of received messages
+                    not yet consumed
+                policy (String, optional): Behaviour if queue is full, see
+                    ``online.ringbuffer.RingBuffer``. By default the oldest
+                    messages are discarded if the consumer falls behind
         """
         super(AbstractSubscriber, self).__init__(name=name)
         self._url = url
         self._topic = topic
-        self._qeueu = Queue()
+        self._qeueu = RingBuffer(capacity, policy)
         self._abort = abort
 
     @property
@@ -70,7 +77,7 @@ class AbstractSubscriber(Thread):
             queue contains messages as they are received by subscriber.
             Messages are not preprocessed or deserialized.
 
-            Return Queue.Queue
+            Return online.ringbuffer.RingBuffer
         """
         return self._qeueu
 
@@ -94,8 +101,7 @@ class AbstractSubscriber(Thread):
         with Subscriber(self._url, self._topic) as subscriber:
             while True:
                 try:
-                    message = subscriber.receive()
-                    self.queue.put(message[len(self.topic):])
+                    self.queue.put(subscriber.receive())
                 except Exception as e:
                     logging.info('Error during receiving of data in ' + \
                             'AbstractSubscriber Error was : {}'.format(e.message))
@@ -117,13 +123,15 @@ class EmgSubscriber(AbstractSubscriber):
     """ Subscriber for EMG data
     """
 
-    def __init__(self, url, name='EmgSubscriber', abort=None):
+    def __init__(self, url, name='EmgSubscriber', abort=None, **kwargs):
         """ Initiates object
 
             Args:
                 url (String): Url of local ressource to bind to.
                 name (String): Name of thread
                 abort (threading.Event): Signals Thread to stop exection
+                kwargs: Size and overflow policy of queue, see
+                    AbstractSubscriber
 
             Examples:
                 >>> url = 'inproc://<identifier>'
@@ -148,20 +156,23 @@ class EmgSubscriber(AbstractSubscriber):
                 `<address>` can be an IPv4, IPv6 address or DNS name, `<port>`
                 is the numeric port.
         """
-        super(EmgSubscriber, self).__init__(url, 'emg', name, abort=abort)
+        super(EmgSubscriber, self).__init__(url, 'emg', name, abort=abort,
+                **kwargs)
 
 
 class KinSubscriber(AbstractSubscriber):
     """ Subscriber for Kinematic data
     """
 
-    def __init__(self, url, name='KinSubscriber', abort=None):
+    def __init__(self, url, name='KinSubscriber', abort=None, **kwargs):
         """ Initiates object
 
             Args:
                 url (String): Url of local ressource to bind to.
                 name (String): Name of thread
                 abort (threading.Event): Signals Thread to stop exection
+                kwargs: Size and overflow policy of queue, see
+                    AbstractSubscriber
 
             Examples:
                 >>> url = 'inproc://<identifier>'
@@ -186,4 +197,5 @@ class KinSubscriber(AbstractSubscriber):
                 `<address>` can be an IPv4, IPv6 address or DNS name, `<port>`
                 is the numeric port.
         """
-        super(KinSubscriber, self).__init__(url, 'kin', name, abort=abort)
+        super(KinSubscriber, self).__init__(url, 'kin', name, abort=abort,
+                **kwargs)
@@ -0,0 +1,77 @@
+""" Writes small files in the format of the WAY-EEG-GAL dataset
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+import data.wayeeggal as wayeeggal
+import numpy as np
+import scipy.io
+
+
+def _cell(strings):
+    cell = np.empty((1, len(strings)), dtype=object)
+    for i, string in enumerate(strings):
+        cell[0, i] = string
+    return cell
+
+
+def _struct(**fields):
+    names = fields.pop('order')
+    struct = np.empty((1, 1), dtype=[(name, object) for name in names])
+    for name in names:
+        struct[0, 0][name] = fields[name]
+    return struct
+
+
+def write_session(path, session=1, samples=400, sr=100):
+    """ Writes a `HS_P#_S#.mat` file with ``samples`` samples of EMG and
+        half as many of every other modality.
+    """
+    data = {
+            'emg': np.arange(samples * 3.).reshape(samples, 3) + session,
+            'eeg': np.arange(samples * 2.).reshape(samples / 2, 4) - session,
+            'kin': np.arange(samples * 7.).reshape(samples / 2, 14),
+            'env': np.ones((samples / 2, 2)),
+            'misc': np.zeros((samples / 2, 1))
+            }
+    columns = {
+            'emg': ['emg{}'.format(i) for i in range(3)],
+            'eeg': ['eeg{}'.format(i) for i in range(4)],
+            'kin': wayeeggal.KIN_COLUMNS + ['F1', 'F2'],
+            'env': ['CurW', 'CurS'],
+            'misc': ['misc']
+            }
+    fields = {
+            'name': 'T',
+            'participant': np.array([[3]]),
+            'session': np.array([[session]]),
+            'emg': _struct(order=['data', 'names', 'sr'], data=data['emg'],
+                names=_cell(columns['emg']), sr=np.array([[sr]]))
+            }
+    for modality in wayeeggal.MODALITIES[1:]:
+        fields[modality] = _struct(order=['names', 'data', 'sr'],
+                data=data[modality], names=_cell(columns[modality]),
+                sr=np.array([[sr / 2]]))
+    order = ['name', 'participant', 'session'] + wayeeggal.MODALITIES
+    scipy.io.savemat(path, {'hs': _struct(order=order, **fields)})
+
+
+def write_meta(path, sessions=(1, 2), lifts=3):
+    """ Writes a `P#_AllLifts.mat` file with ``lifts`` lifts per session
+        starting every second.
+    """
+    rows = []
+    for session in sessions:
+        for lift in range(lifts):
+            rows.append([session, lift + 1, lift + 0.5, lift + 3.,
+                [1, 2, 4][lift % 3]])
+    headers = np.empty((5, 1), dtype=object)
+    for i, header in enumerate(['Run', 'Lift', 'StartTime', 'tLift', 'CurW']):
+        headers[i, 0] = header
+    scipy.io.savemat(path, {'P': _struct(order=['data', 'names'],
+        data=np.array(rows), names=headers)})
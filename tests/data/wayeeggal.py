@@ -0,0 +1,105 @@
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from tests.data.synthetic import write_session
+import data.wayeeggal as wayeeggal
+
+
+class FakeShutil(object):
+    """ Does not remove the cache, like a process whose cache was replaced
+        by another process before its own could be moved into place.
+    """
+    def __init__(self, target):
+        self.target = target
+
+    def rmtree(self, path, ignore_errors=False):
+        if path != self.target:
+            shutil.rmtree(path, ignore_errors)
+
+
+class TestCache(object):
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.path = os.path.join(self.directory, 'HS_P3_S1.mat')
+        write_session(self.path)
+        self.target = os.path.join(self.cache_dir, 'HS_P3_S1')
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def assert_equal_sessions(self, expected, actual):
+        for key in ['initials', 'subject', 'session']:
+            assert expected[key] == actual[key], 'Wrong {}'.format(key)
+        for modality in wayeeggal.MODALITIES:
+            assert expected[modality + '_sr'] == actual[modality + '_sr']
+            assert expected[modality + '_data'].equals(
+                    actual[modality + '_data']), \
+                            'Data of {} does not match'.format(modality)
+
+    def test_miss(self):
+        session = wayeeggal.read_session(self.path, self.cache_dir)
+        assert sorted(os.listdir(self.cache_dir)) == ['HS_P3_S1'], \
+                'Temporary files left in cache'
+        self.assert_equal_sessions(wayeeggal.read_session(self.path), session)
+
+    def test_mmap(self):
+        wayeeggal.convert_session(self.path, self.cache_dir)
+        session = wayeeggal.read_session(self.path, self.cache_dir)
+        for modality in wayeeggal.MODALITIES:
+            values = session[modality + '_data'].values
+            assert not values.flags.writeable
+            while not isinstance(values, np.memmap) and \
+                    isinstance(values.base, np.ndarray):
+                values = values.base
+            assert isinstance(values, np.memmap), \
+                    'Data of {} not memory mapped'.format(modality)
+
+    def test_hit(self):
+        wayeeggal.read_session(self.path, self.cache_dir)
+        inode = os.stat(self.target).st_ino
+        wayeeggal.read_session(self.path, self.cache_dir)
+        assert os.stat(self.target).st_ino == inode, 'Valid cache replaced'
+
+    def test_invalidation(self):
+        wayeeggal.read_session(self.path, self.cache_dir)
+        write_session(self.path, session=2)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        session = wayeeggal.read_session(self.path, self.cache_dir)
+        assert session['session'] == 2, 'Cache not renewed after mtime changed'
+        write_session(self.path, session=2, samples=600)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        session = wayeeggal.read_session(self.path, self.cache_dir)
+        assert session['emg_data'].shape[0] == 600, \
+                'Cache not renewed after size changed'
+
+    def test_concurrent_conversion(self):
+        wayeeggal.convert_session(self.path, self.cache_dir)
+        try:
+            wayeeggal.shutil = FakeShutil(self.target)
+            target = wayeeggal.convert_session(self.path, self.cache_dir)
+        finally:
+            wayeeggal.shutil = shutil
+        assert target == self.target
+        assert os.listdir(self.cache_dir) == ['HS_P3_S1'], \
+                'Temporary files left in cache'
+        self.assert_equal_sessions(wayeeggal.read_session(self.path),
+                wayeeggal.read_session(self.path, self.cache_dir))
+        os.utime(self.path, (0, 0))
+        try:
+            wayeeggal.shutil = FakeShutil(self.target)
+            wayeeggal.convert_session(self.path, self.cache_dir)
+            assert False, 'Outdated cache accepted'
+        except OSError:
+            pass
+        finally:
+            wayeeggal.shutil = shutil
@@ -0,0 +1,95 @@
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.path.pardir,
+    os.path.pardir,
+    'biosi'
+    ))
+import emg.data as data
+import model.model as model
+
+
+class AlignTrialsTest(object):
+    def setup(self):
+        # Two blocks of three samples and one remaining sample
+        self.trial = np.array([
+            [5., -5.],
+            [-1., 1.],
+            [-1., 1.],
+            [3., -1.],
+            [3., 5.],
+            [3., -1.],
+            [100., -100.]
+            ])
+
+    def reduce(self, reducer):
+        reduced = data.align_trials([self.trial], 3, reducer)
+        assert len(reduced) == 1
+        assert reduced[0].shape == (2, 2), 'Remaining sample not omitted'
+        return reduced[0]
+
+    def test_mean(self):
+        assert np.array_equal(self.reduce('mean'), [[1., -1.], [3., 1.]])
+
+    def test_median(self):
+        assert np.array_equal(self.reduce('median'), [[-1., 1.], [3., -1.]])
+
+    def test_max_abs(self):
+        assert np.array_equal(self.reduce('max_abs'), [[5., 5.], [3., 5.]])
+
+    def test_rms(self):
+        assert np.array_equal(self.reduce('rms'), [[3., 3.], [3., 3.]])
+
+    def test_default(self):
+        assert np.array_equal(data.align_trials([self.trial], 3)[0],
+                self.reduce('mean')), 'Default reducer is not mean'
+
+    def test_short_trials(self):
+        reduced = data.align_trials([self.trial[:2], self.trial], 4, 'rms')
+        assert reduced[0].shape == (0, 2), 'Trial shorter than block reduced'
+        assert np.allclose(reduced[1], [[3., np.sqrt(7.)]])
+
+    def test_unknown_reducer(self):
+        try:
+            data.align_trials([self.trial], 3, 'sum')
+            assert False, 'Unknown reducer accepted'
+        except ValueError:
+            pass
+
+
+class AlignTest(object):
+    def setup(self):
+        experiment = model.Experiment()
+        subject = model.Subject('subject1')
+        experiment.put_subject(subject)
+        setup = model.Setup(experiment)
+        emg = model.Modality(setup, 20, 'emg')
+        kin = model.Modality(setup, 5, 'kin')
+        model.Channel(emg, 'flexor')
+        model.Channel(emg, 'extensor')
+        model.Channel(kin, 'Pos-X')
+        session = model.Session(experiment, setup, subject, 'session1')
+        self.data = np.column_stack((np.arange(80.), -np.arange(80.)))
+        self.emg = model.Recording(session, emg, data=self.data,
+                identifier='emg_recording')
+        self.kin = model.Recording(session, kin, data=np.zeros((20, 1)),
+                identifier='kin_recording')
+        for start, duration in [(0, 2), (2, 1.1)]:
+            model.Trial(self.emg, start, duration)
+            model.Trial(self.kin, start, duration)
+
+    def test_align(self):
+        aligned = data.align(self.emg, self.kin, 'max_abs')
+        assert [a.shape for a in aligned] == [(10, 2), (5, 2)], \
+                'Wrong shapes {}'.format([a.shape for a in aligned])
+        assert np.array_equal(aligned[0], np.abs(self.data[3:40:4]))
+        assert np.array_equal(aligned[1], np.abs(self.data[43:60:4]))
+
+    def test_align_fails(self):
+        try:
+            data.align(self.kin, self.emg)
+            assert False, 'Recording with lower frequency reduced'
+        except AssertionError:
+            pass
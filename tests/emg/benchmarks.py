@@ -0,0 +1,106 @@
+""" Benchmarks for decorators working on long recordings. Run this file
+    directly, timings are printed to stdout.
+"""
+import numpy as np
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.path.pardir,
+    os.path.pardir,
+    'biosi'
+    ))
+import emg.datadecorators as datadecorators
+import model.model as model
+
+
+def time_call(function, *args):
+    """ Returns seconds a single call of ``function`` took """
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def benchmark_rms(durations=(60, 600, 3600), frequency=4000, channels=2,
+        windowsize=0.1):
+    """ Filters recordings of increasing duration with ``RmsDecorator``. Time
+        per sample should stay constant for a filter scaling linearly.
+
+        Args:
+            durations (Tuple): Durations of recordings in seconds
+            frequency (int): Sampling rate of recordings
+            channels (int): Number of channels of recordings
+            windowsize (float): Size of RMS window in seconds
+    """
+    print 'RmsDecorator: {} Hz, {} channels, window of {}s'.format(
+            frequency, channels, windowsize)
+    for alignment in datadecorators.RmsDecorator.alignments:
+        decorator = datadecorators.RmsDecorator(windowsize, None,
+                alignment=alignment)
+        for duration in durations:
+            container = model.DataContainer.from_array(
+                    np.random.randn(duration * frequency, channels),
+                    frequency
+                    )
+            seconds = time_call(
+                    decorator._rms,
+                    int(windowsize * frequency),
+                    container
+                    )
+            print '\t{:8s} {:6d}s: {:8.3f}s total, {:6.1f}ns per sample'.format(
+                    alignment, duration, seconds,
+                    seconds / container.samples * 1e9)
+
+
+def benchmark_window(duration=60, frequency=4000, channels=4, windowsize=400):
+    """ Windows one recording with a stride of one sample with
+        ``WindowDecorator`` returning strided views.
+
+        Args:
+            duration (int): Duration of recording in seconds
+            frequency (int): Sampling rate of recording
+            channels (int): Number of channels of recording
+            windowsize (int): Size of window in samples
+    """
+    container = model.DataContainer.from_array(
+            np.random.randn(duration * frequency, channels),
+            frequency
+            )
+    decorator = datadecorators.WindowDecorator(windowsize, None, stride=1,
+            in_samples=True, as_view=True)
+    start = time.time()
+    view = decorator._view(container)
+    seconds = time.time() - start
+    print 'WindowDecorator: {} windows of {} samples from {}s in {:.6f}s'.format(
+            view.shape[0], windowsize, duration, seconds)
+
+
+def benchmark_sampling(trials=(10, 100), duration=10, frequency=500,
+        target=120, channels=64):
+    """ Resamples lists of trials by a rational ratio with
+        ``SamplingDecorator``. Trials of equal length are filtered in one call.
+
+        Args:
+            trials (Tuple): Number of trials per run
+            duration (int): Duration of trials in seconds
+            frequency (int): Sampling rate of trials
+            target (int): Sampling rate to resample trials to
+            channels (int): Number of channels of trials
+    """
+    print 'SamplingDecorator: {} Hz to {} Hz, {} channels, {}s trials'.format(
+            frequency, target, channels, duration)
+    decorator = datadecorators.SamplingDecorator(target, None)
+    for num in trials:
+        containers = [model.DataContainer.from_array(
+                np.random.randn(duration * frequency, channels), frequency)
+                for i in range(num)]
+        seconds = time_call(decorator._return, containers)
+        print '\t{:4d} trials: {:8.3f}s total, {:6.1f}ns per sample'.format(
+                num, seconds, seconds / (num * duration * frequency) * 1e9)
+
+
+if __name__ == '__main__':
+    benchmark_rms()
+    benchmark_window()
+    benchmark_sampling()
@@ -1,7 +1,9 @@
 import numpy as np
 import pandas as pd
 import os
+import shutil
 import sys
+import tempfile
 sys.path.insert(0, os.path.join(
     os.path.dirname(os.path.realpath(__file__)),
     os.path.pardir,
@@ -10,6 +12,7 @@ sys.path.insert(0, os.path.join(
 import logging
 from nose.tools import with_setup
 import emg.datadecorators as datadecorators
+import emg.pipeline as pipeline
 import model.model as model
 logging.basicConfig(level=logging.DEBUG)
 
@@ -137,7 +140,7 @@ class SamplingDecoratorTest(AbstractDataDecoratorTest):
                 10
                 )
         decorator = datadecorators.SamplingDecorator(5, None, False)
-        ret = decorator._downsample(container.frequency, container)
+        ret = decorator._downsample(container)
         assert ret.shape[1] == 2, 'Second dimension errorenous'
         assert ret.shape[0] == 25, 'First dimension errorenous, expected ' + \
                 '{} got {}'.format(25, ret.shape[0])
@@ -149,7 +152,7 @@ class SamplingDecoratorTest(AbstractDataDecoratorTest):
                 10
                 )
         decorator = datadecorators.SamplingDecorator(20, None, False)
-        ret = decorator._upsample(container.frequency, container)
+        ret = decorator._upsample(container)
         assert ret.shape[1] == 2, 'Second dimension errorenous'
         assert ret.shape[0] == 10, 'First dimension errorenous, expected ' + \
                 '{} got {}'.format(10, ret.shape[0])
@@ -217,6 +220,48 @@ class SamplingDecoratorTest(AbstractDataDecoratorTest):
                     # Ten: 200 elements, sr of 20, trial length 2s -> 40 samples
                     # downsampling factor 4 --> 10
 
+    def test_polyphase(self):
+        # 20 Hz to 30 Hz is no integer ratio: up 3, down 2
+        decorator = datadecorators.SamplingDecorator(
+                frequency=30,
+                data_holding_element=self.experiment,
+                as_iterator=False
+                )
+        trials = decorator.get_data(**{'modality': 'emg'})
+        assert len(trials) == 10, 'Wrong number of trials {}'.format(len(trials))
+        for trial in trials:
+            assert trial.data.shape == (60, 4), 'Wrong shape {}'.format(
+                    trial.data.shape)
+            assert trial.frequency == 30
+        taps = datadecorators.SamplingDecorator.taps(3, 2)
+        assert taps is datadecorators.SamplingDecorator.taps(3, 2), \
+                'Filter taps are not cached'
+
+        decorator = datadecorators.SamplingDecorator(
+                frequency=30,
+                data_holding_element=self.experiment,
+                as_iterator=True
+                )
+        for trial, expected in zip(decorator.get_data(modality='emg'), trials):
+            assert np.allclose(trial.data, expected.data), 'Stacked ' + \
+                    'resampling differs from resampling each trial'
+
+    def test_polyphase_constant(self):
+        container = model.DataContainer.from_array(np.ones((500, 2)), 500)
+        decorator = datadecorators.SamplingDecorator(120, None,
+                method='polyphase')
+        ret = decorator._resample(container)
+        assert ret.shape == (120, 2), 'Wrong shape {}'.format(ret.shape)
+        # Filter has unit gain, away from the edges signal must be preserved
+        assert np.allclose(ret[20:-20], 1, atol=1e-2)
+
+    def test_method_fails(self):
+        try:
+            datadecorators.SamplingDecorator(10, None, method='linear')
+            assert False, 'No ValueError for unknown method'
+        except ValueError:
+            pass
+
 
 class WindowDecoratorTest(AbstractDataDecoratorTest):
     def test_iterate(self):
@@ -249,6 +294,40 @@ class WindowDecoratorTest(AbstractDataDecoratorTest):
                     'got {}'.format(window.shape[0])
 
 
+    def test_view(self):
+        decorator = datadecorators.WindowDecorator(
+                windowsize=10,
+                stride=5,
+                data_holding_element=self.experiment,
+                as_iterator=False,
+                in_samples=True,
+                as_view=True
+                )
+        views = decorator.get_data(**{'modality':'emg'})
+        control = datadecorators.WindowDecorator(
+                windowsize=0.5,
+                stride=0.25,
+                data_holding_element=self.experiment,
+                as_iterator=False
+                ).get_data(**{'modality':'emg'})
+        assert len(views) == 10, 'Expected one view per trial, got ' + \
+                '{}'.format(len(views))
+        windows = np.concatenate(views, axis=0)
+        assert windows.shape == (70, 10, 4), 'Wrong shape of windows ' + \
+                '{}'.format(windows.shape)
+        for i in range(len(control)):
+            assert np.array_equal(windows[i], control[i].data), 'Window ' + \
+                    '{} does not match DataContainer window'.format(i)
+        assert not views[0].flags.writeable, 'View must be read-only'
+
+    def test_in_samples_fails(self):
+        try:
+            datadecorators.WindowDecorator(0.5, None, in_samples=True)
+            assert False, 'No TypeError raised for non integer window size'
+        except TypeError as e:
+            self.logger.debug(e.message)
+
+
 class RmsDecoratorTest(AbstractDataDecoratorTest):
     def test_rms(self):
         decorator = datadecorators.RmsDecorator(0.5, None, False)
@@ -264,6 +343,38 @@ class RmsDecoratorTest(AbstractDataDecoratorTest):
         assert filtered[0,0] == first_element, 'Error in calculation, ' + \
                 'expected {} but was {}'.format(first_element, filtered[0,0])
 
+    def test_rms_reference(self):
+        values = np.random.randn(200, 3)
+        container = model.DataContainer.from_array(values, 10)
+        control = np.array([
+            np.sqrt(np.mean(np.square(values[i:i + 5]), axis=0))
+            for i in range(values.shape[0] - 4)
+            ])
+        filtered = datadecorators.RmsDecorator(0.5, None, False)._rms(5, container)
+        assert np.allclose(filtered, control), 'Filtered values do not ' + \
+                'match reference for valid alignment'
+
+        decorator = datadecorators.RmsDecorator(0.5, None, False, 'causal')
+        filtered = decorator._rms(5, container)
+        assert filtered.shape == values.shape, 'Causal filter changed shape ' + \
+                'to {}'.format(filtered.shape)
+        assert np.allclose(filtered[4:], control), 'Causal filter does not ' + \
+                'match reference'
+
+        decorator = datadecorators.RmsDecorator(0.5, None, False, 'centred')
+        filtered = decorator._rms(5, container)
+        assert filtered.shape == values.shape, 'Centred filter changed shape ' + \
+                'to {}'.format(filtered.shape)
+        assert np.allclose(filtered[2:-2], control), 'Centred filter does ' + \
+                'not match reference'
+
+    def test_alignment_fails(self):
+        try:
+            datadecorators.RmsDecorator(0.5, None, False, 'acausal')
+            assert False, 'No ValueError raised for unknown alignment'
+        except ValueError as e:
+            self.logger.debug(e.message)
+
     def test_iterate(self):
         decorator = datadecorators.RmsDecorator(0.5, self.experiment, True)
         counter = 0
@@ -286,11 +397,42 @@ class RmsDecoratorTest(AbstractDataDecoratorTest):
 
 class ArrayDecoratorTest(AbstractDataDecoratorTest):
     def test_return(self):
-        decorator = datadecorators.ArrayDecorator(self.experiment)
+        decorator = datadecorators.ArrayDecorator3D(self.experiment)
         array = decorator.get_data(**{'modality':'emg'})
         assert array.shape[0] == 10, 'First axis wrong, 10 != {}'.format(array.shape[0])
         assert array.shape[1] == 40, 'Second axis wrong, 40 != {}'.format(array.shape[0])
         assert array.shape[2] == 4, 'THird axis wrong, 4 != {}'.format(array.shape[0])
+        control = self.experiment.get_data(modality='emg')
+        for i in range(len(control)):
+            assert np.array_equal(array[i], control[i].data), ('Trial {} ' + \
+                    'not stacked correctly').format(i)
+
+    def test_return_views(self):
+        windows = datadecorators.WindowDecorator(10, self.experiment, stride=10,
+                in_samples=True, as_view=True)
+        array = datadecorators.ArrayDecorator3D(windows).get_data(
+                **{'modality':'emg'})
+        assert array.shape == (40, 10, 4), 'Wrong shape {}'.format(array.shape)
+
+    def test_return_out(self):
+        out = np.zeros((10, 40, 4))
+        decorator = datadecorators.ArrayDecorator3D(self.experiment, out=out)
+        array = decorator.get_data(**{'modality':'emg'})
+        assert array is out, 'Result not written to out-buffer'
+        try:
+            datadecorators.ArrayDecorator3D(self.experiment,
+                    out=np.zeros((2, 40, 4))).get_data(**{'modality':'emg'})
+            assert False, 'No ValueError raised for out-buffer of wrong shape'
+        except ValueError as e:
+            self.logger.debug(e.message)
+
+    def test_return_2d(self):
+        decorator = datadecorators.ArrayDecorator2D(self.experiment)
+        array = decorator.get_data(**{'modality':'emg'})
+        assert array.shape == (400, 4), 'Wrong shape {}'.format(array.shape)
+        control = np.row_stack([c.data for c in self.experiment.get_data(
+            modality='emg')])
+        assert np.array_equal(array, control), 'Trials not stacked correctly'
 
 
 class PadzeroDecoratorTest(AbstractDataDecoratorTest):
@@ -318,3 +460,190 @@ class PadzeroDecoratorTest(AbstractDataDecoratorTest):
             assert trial.shape[0] == 11, 'Wrong first dim 11 != {}'.format(trial.shape[0])
             self.logger.debug(trial.data)
 
+
+class CacheDecoratorTest(AbstractDataDecoratorTest):
+    def setup(self):
+        super(CacheDecoratorTest, self).setup()
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit(self):
+        decorator = datadecorators.CacheDecorator(
+                datadecorators.RmsDecorator(0.2, self.experiment),
+                self.directory
+                )
+        computed = decorator.get_data(modality='emg')
+        assert not decorator.hit, 'Empty cache reported hit'
+        cached = decorator.get_data(modality='emg')
+        assert decorator.hit, 'Repeated call not answered from cache'
+        assert len(cached) == len(computed), 'Wrong number of trials'
+        for trial, expected in zip(cached, computed):
+            assert np.array_equal(trial.data, expected.data)
+            assert list(trial.columns) == list(expected.columns)
+            assert trial.frequency == expected.frequency
+
+        decorator = datadecorators.CacheDecorator(
+                datadecorators.RmsDecorator(0.4, self.experiment),
+                self.directory
+                )
+        decorator.get_data(modality='emg')
+        assert not decorator.hit, 'Changed parameters reported hit'
+
+    def test_array(self):
+        decorator = datadecorators.CacheDecorator(
+                datadecorators.ArrayDecorator3D(
+                    datadecorators.WindowDecorator(0.5, self.experiment,
+                        stride=0.5)
+                    ),
+                self.directory
+                )
+        computed = decorator.get_data(modality='emg')
+        cached = decorator.get_data(modality='emg')
+        assert decorator.hit
+        assert np.array_equal(cached, computed)
+
+    def test_changed_data(self):
+        decorator = datadecorators.CacheDecorator(self.experiment,
+                self.directory)
+        key = decorator.key(modality='emg')
+        assert decorator.key(modality='kin') != key, 'Key ignores arguments'
+        recording = self.experiment.sessions['session1'].recordings[
+                'emg_recording1']
+        trial = recording.trials.values()[0]
+        trial.set_data(trial.get_data().data + 1)
+        changed = decorator.key(modality='emg')
+        assert changed != key, 'Key ignores data'
+        model.Trial(recording, 0, 1, 'extra')
+        assert decorator.key(modality='emg') != changed, 'Key ignores trials'
+
+    def test_key_reads_no_data(self):
+        decorator = datadecorators.CacheDecorator(
+                datadecorators.RmsDecorator(0.2, self.experiment),
+                self.directory
+                )
+        decorator.key(modality='emg')
+        calls = []
+        get_data = self.experiment.get_data
+        self.experiment.get_data = lambda **kwargs: calls.append(kwargs) or \
+                get_data(**kwargs)
+        try:
+            decorator.key(modality='emg')
+            assert calls == [], 'Key read data of source'
+            decorator.get_data(modality='emg')
+            assert len(calls) == 1, 'Source read {} times on miss'.format(
+                    len(calls))
+        finally:
+            del self.experiment.get_data
+
+    def test_nested(self):
+        inner = datadecorators.CacheDecorator(self.experiment,
+                os.path.join(self.directory, 'inner'))
+        keys = []
+        for i in range(2):
+            outer = datadecorators.CacheDecorator(
+                    datadecorators.RmsDecorator(0.2, inner), self.directory)
+            outer.get_data(modality='emg')
+            keys.append(outer.key(modality='emg'))
+        assert outer.hit and keys[0] == keys[1], \
+                'State of nested cache changes key'
+
+    def test_evict(self):
+        decorators = [datadecorators.CacheDecorator(
+                    datadecorators.RmsDecorator(windowsize, self.experiment),
+                    self.directory,
+                    max_size=1
+                    ) for windowsize in [0.2, 0.4]]
+        decorators[0].get_data(modality='emg')
+        decorators[1].get_data(modality='emg')
+        entries = [name for name in os.listdir(self.directory)
+                if not name.startswith('.')]
+        assert entries == [decorators[1].key(modality='emg')], \
+                'Least recently used entry not removed: {}'.format(entries)
+
+
+class PipelineTest(AbstractDataDecoratorTest):
+    def eager(self):
+        return datadecorators.ArrayDecorator3D(
+                datadecorators.WindowDecorator(0.5,
+                    datadecorators.SamplingDecorator(10,
+                        datadecorators.RmsDecorator(0.2,
+                            datadecorators.RectificationDecorator(
+                                self.experiment)
+                            )
+                        ),
+                    stride=0.2
+                    )
+                )
+
+    def test_builder(self):
+        lazy = pipeline.Pipeline(self.experiment).rectify().rms(0.2) \
+                .resample(10).window(0.5, stride=0.2).to_array3d()
+        control = self.eager().get_data(modality='emg')
+        array = lazy.get_data(modality='emg')
+        assert array.shape == control.shape, 'Shapes differ {} {}'.format(
+                array.shape, control.shape)
+        assert np.allclose(array, control), 'Pipeline differs from decorators'
+        assert np.array_equal(lazy.decorator.get_data(modality='emg'), array), \
+                'Recorded decorator stack differs from pipeline'
+
+    def test_from_decorator(self):
+        lazy = pipeline.Pipeline.from_decorator(self.eager())
+        assert lazy.source is self.experiment, 'Wrong source'
+        assert isinstance(lazy.terminal, datadecorators.ArrayDecorator3D)
+        assert [type(stage) for stage in lazy.stages] == [
+                datadecorators.RmsDecorator,
+                datadecorators.SamplingDecorator,
+                datadecorators.WindowDecorator
+                ], 'Rectification before RMS not fused'
+        assert np.allclose(
+                lazy.get_data(modality='emg'),
+                self.eager().get_data(modality='emg')
+                )
+
+    def test_source_unchanged(self):
+        control = np.row_stack([c.data for c in self.experiment.get_data(
+            modality='emg')])
+        lazy = pipeline.Pipeline(self.experiment).rms(0.2).rectify() \
+                .rectify().to_array2d()
+        lazy.get_data(modality='emg')
+        lazy = pipeline.Pipeline(self.experiment).rectify().to_array2d()
+        array = lazy.get_data(modality='emg')
+        assert np.array_equal(array, np.abs(control))
+        recordings = np.row_stack([c.data for c in self.experiment.get_data(
+            modality='emg')])
+        assert np.array_equal(recordings, control), 'Source data was modified'
+
+    def test_parallel(self):
+        control = pipeline.Pipeline(self.experiment).rectify().rms(0.2) \
+                .resample(10).window(0.5, stride=0.2).to_array3d() \
+                .get_data(modality='emg')
+        lazy = pipeline.Pipeline(self.experiment, processes=2).rectify() \
+                .rms(0.2).resample(10).window(0.5, stride=0.2).to_array3d()
+        array = lazy.get_data(modality='emg')
+        assert np.array_equal(array, control), 'Parallel pipeline differs'
+
+        lazy = pipeline.Pipeline(self.experiment, processes=3).rectify()
+        trials = lazy.get_data(modality='emg')
+        control = self.experiment.get_data(modality='emg')
+        assert len(trials) == len(control), 'Wrong number of trials'
+        for trial, expected in zip(trials, control):
+            assert np.array_equal(trial.data, np.abs(expected.data)), \
+                    'Order of trials not preserved'
+            assert list(trial.columns) == list(expected.columns)
+
+    def test_processes_fails(self):
+        try:
+            pipeline.Pipeline(self.experiment, processes=0)
+            assert False, 'No ValueError for zero processes'
+        except ValueError:
+            pass
+
+    def test_terminal_fails(self):
+        lazy = pipeline.Pipeline(self.experiment).to_array2d()
+        try:
+            lazy.rectify()
+            assert False, 'Stage added after terminal decorator'
+        except ValueError:
+            pass
@@ -0,0 +1,56 @@
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    os.path.pardir,
+    os.path.pardir
+    ))
+from tests.data.synthetic import write_meta
+from tests.data.synthetic import write_session
+import data.wayeeggal as wayeeggal
+import model.knowledgeBase as kb
+
+
+class BuildEmgEegKbTest(object):
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.meta_path = os.path.join(self.directory, 'P3_AllLifts.mat')
+        write_meta(self.meta_path)
+        self.session_paths = []
+        for session in [1, 2]:
+            path = os.path.join(self.directory,
+                    'HS_P3_S{}.mat'.format(session))
+            write_session(path, session)
+            self.session_paths.append(path)
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def assert_equal_experiments(self, expected, actual):
+        assert sorted(expected.sessions) == sorted(actual.sessions), \
+                'Sessions do not match'
+        for modality in ['emg', 'eeg', 'kin']:
+            for session in expected.sessions:
+                e_data, e_index = expected.get_array(modality, [session])
+                a_data, a_index = actual.get_array(modality, [session])
+                assert np.array_equal(e_data, a_data), \
+                        'Data of {} does not match'.format(modality)
+                assert e_index.equals(a_index), \
+                        'Trials of {} do not match'.format(modality)
+
+    def test_parallel(self):
+        serial = kb.create_emg_eeg_kb(
+                kb.wayeeggal.read_meta_file(self.meta_path),
+                [wayeeggal.read_session(p) for p in self.session_paths],
+                ['tLift'])
+        cache_dir = os.path.join(self.directory, 'cache')
+        for i in range(2):
+            parallel, timings = kb.build_emg_eeg_kb(self.meta_path,
+                    self.session_paths, cache_dir, ['tLift'], 2)
+            assert sorted(timings) == sorted(self.session_paths)
+            self.assert_equal_experiments(serial, parallel)
+        assert sorted(os.listdir(cache_dir)) == ['HS_P3_S1', 'HS_P3_S2'], \
+                'Unexpected content of cache'
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import os
 import sys
+import tempfile
 sys.path.insert(0, os.path.join(
     os.path.dirname(os.path.realpath(__file__)),
     os.path.pardir,
@@ -57,6 +58,16 @@ class TestDataContainer(object):
             assert fcolumns[i] == self.channels[i]
         assert frame.shape[0] == self.test_data.shape[0]
 
+    def test_dataframe_shares_memory(self):
+        assert self.container._dataframe is None, 'Frame created eagerly'
+        frame = self.container.dataframe
+        assert frame is self.container.dataframe, 'Frame not cached'
+        self.container.set_samples(0, 1, -1)
+        assert (frame.values[0] == -1).all(), 'Frame does not share memory'
+        self.container.data = np.zeros((5, 3))
+        assert self.container.dataframe.shape[0] == 5, 'Frame not rebuilt'
+        assert list(self.container.dataframe.columns) == self.channels
+
     def test_duration(self):
         assert self.container.duration == 10
 
@@ -74,6 +85,25 @@ class TestDataContainer(object):
         slice = self.container[0:10]
         assert slice.data.shape[0] == 100
 
+    def test_slice_samples(self):
+        slice = self.container.slice_samples(25, 55)
+        assert type(slice) == model.DataContainer
+        assert np.array_equal(slice.data, self.container[2.5:5.5].data), \
+                'slice_samples differs from __getitem__'
+        columns = self.container.column_indices(['novelis', 'flexor'])
+        assert columns == [2, 0], 'Wrong column indices {}'.format(columns)
+        slice = self.container.slice_samples(25, 55, columns)
+        assert list(slice.columns) == ['novelis', 'flexor']
+        assert np.array_equal(
+                slice.data,
+                self.container[2.5:5.5, ['novelis', 'flexor']].data
+                )
+
+    def test_set_samples(self):
+        self.container.set_samples(10, 20, np.zeros((10, 3)))
+        assert (self.container.get_samples(10, 20) == 0).all()
+        assert (self.container.get_samples(20, 21) != 0).all()
+
     def test_getitem_fails(self):
         success = True
         try:
@@ -99,6 +129,18 @@ class TestDataContainer(object):
             self.logger.info('AssertionError for stop of slice out of bounds' + \
                     'occured')
 
+    def test_one_hot_event(self):
+        self.container.events = [
+                model.Event('grasp', 1.0, 0.5),
+                model.Event('grasp', 9.8, 1.),
+                model.Event('release', 3.0)
+                ]
+        onehot = self.container.one_hot_event('grasp')
+        assert np.array_equal(np.flatnonzero(onehot),
+                np.concatenate((np.arange(10, 15), np.arange(98, 100))))
+        self.container.events = model.EventStore(self.container.events)
+        assert np.flatnonzero(self.container.one_hot_event('release')) == [30]
+
     def test_set_data(self):
         new_data = np.arange(60).reshape(20,3)
         self.container.data = new_data
@@ -243,6 +285,65 @@ class ExperimentTest(ModelTest):
         assert len(trials) == 10, 'Wrong number of trials returned, ' + \
                 'expected 10 got {}'.format(len(trials))
 
+    def test_get_array(self):
+        control = np.row_stack([t.data for t in
+            self.experiment.get_data(modality='emg')])
+        array, index = self.experiment.get_array(modality='emg')
+        assert np.array_equal(array, control), 'Array does not match ' + \
+                'stacked trials'
+        assert len(index) == 10, 'Expected 10 trials in index, got {}'.format(
+                len(index))
+        assert index['start'].tolist() == range(0, 400, 40), 'Wrong offsets'
+        assert index['stop'].tolist() == range(40, 440, 40), 'Wrong offsets'
+        assert index['session'].tolist() == ['session1'] * 5 + \
+                ['session2'] * 5, 'Wrong sessions in index'
+
+    def test_get_data_by_labels(self):
+        recording = self.experiment.get_recording('emg_recording2', 'session2')
+        trials = recording.get_trials()
+        trials[0].label = 'fist'
+        trials[4].label = 'fist'
+        try:
+            data, labels = self.experiment.get_data_by_labels(
+                    labels=['fist'], modality='emg')
+            grouped = self.experiment.get_trials_by_label('emg')
+        finally:
+            trials[0].label = None
+            trials[4].label = None
+        assert labels == ['fist', 'fist'], 'Wrong labels {}'.format(labels)
+        assert np.array_equal(data[1].data, trials[4].get_data().data), \
+                'Wrong data returned'
+        assert grouped.keys() == ['fist'], 'Wrong labels {}'.format(
+                grouped.keys())
+        assert grouped['fist'] == [trials[0], trials[4]], 'Wrong trials'
+
+    def test_get_array_selection(self):
+        channels = ['musculus rhombideus', 'brachoradialis']
+        recording = self.experiment.get_recording('emg_recording1', 'session1')
+        trials = recording.get_trials()
+        trials[1].label = 'fist'
+        trials[3].label = 'fist'
+        try:
+            out = np.zeros((80, 2))
+            array, index = self.experiment.get_array(
+                    modality='emg',
+                    channels=channels,
+                    labels=['fist'],
+                    out=out
+                    )
+        finally:
+            trials[1].label = None
+            trials[3].label = None
+        assert array is out, 'Result was not written to out'
+        assert index['trial'].tolist() == ['trial1', 'trial3'], \
+                'Wrong trials in index'
+        columns = recording.data.column_indices(channels)
+        control = np.row_stack((
+            recording.data.get_samples(40, 80, columns),
+            recording.data.get_samples(120, 160, columns)
+            ))
+        assert np.array_equal(array, control), 'Wrong data returned'
+
 
 class TrialTest(ModelTest):
     def test_start(self):
@@ -270,6 +371,17 @@ class TrialTest(ModelTest):
             assert trial.duration == duration, 'Start does not match. Start should' + \
                     'be {} but is {}'.format(duration, trial.duration)
 
+    def test_get_data_range(self):
+        trial = self.experiment.get_trial(session='session1',
+                recording='emg_recording1', identifier='trial1')
+        assert trial.get_data(0.5, 2).data.shape[0] == 30
+        for begin, end in [(0, 2.5), (-0.5, 1), (1.5, 1)]:
+            try:
+                trial.get_data(begin, end)
+                assert False, 'Interval [{}, {}) accepted'.format(begin, end)
+            except IndexError:
+                pass
+
     def test_samples(self):
         trials = ['trial0', 'trial1', 'trial2', 'trial3', 'trial4']
         for tid in trials:
@@ -289,6 +401,18 @@ class TrialTest(ModelTest):
             assert trial.samples == 10, 'Start does not match. Start should' + \
                     'be {} but is {} for kin rec'.format(5, trial.samples)
 
+    def test_events(self):
+        trial = self.experiment.get_trial('trial2', 'session2', 'emg_recording2')
+        assert not hasattr(trial, '__dict__'), 'Trial has a __dict__'
+        assert trial.num_events == 0 and trial.get_events() == [], \
+                'Trial without events returned events'
+        trial.add_event('fist', 1.5)
+        trial.add_event('rest', 0.5, 1.)
+        events = trial.get_events()
+        assert [e.name for e in events] == ['rest', 'fist'], \
+                'Wrong events {}'.format([e.to_string() for e in events])
+        assert not hasattr(events[0], '__dict__'), 'Event has a __dict__'
+
     def test_get_data(self):
         control_emg = np.column_stack((
                 np.tile(
@@ -381,6 +505,23 @@ class TrialTest(ModelTest):
 
 
 class RecordingTest(ModelTest):
+    def test_mmap(self):
+        path = os.path.join(tempfile.mkdtemp(), 'emg.npy')
+        session = self.experiment.sessions['session1']
+        modality = session.setup.modalities['emg']
+        data = self.experiment.get_recording('emg_recording1', 'session1').get_all_data().data
+        recording = model.Recording(session, modality, location=path,
+                data=data, identifier='emg_mmap', mmap_mode='r+')
+        model.Trial(recording, 2, 2, 'trial0')
+        trial = recording.get_trial('trial0')
+        assert np.array_equal(trial.get_data().data, data[40:80]), 'Trial ' + \
+                'data of memory mapped recording wrong'
+        trial.set_data(np.ones((40, 4)))
+        recording = model.Recording(session, modality, location=path,
+                identifier='emg_mmap_reopened', mmap_mode='r')
+        assert np.mean(recording.get_all_data().data[40:80]) == 1, 'Data ' + \
+                'set on trial not written to file'
+
     def test_add_events(self):
         dic = {
                 'trial0': [['single', 0.4], ['long', 1, 0.5]],
@@ -408,3 +549,221 @@ class RecordingTest(ModelTest):
         recording.add_events(df)
         self.logger.debug(recording.recursive_to_string())
 
+
+    def test_get_events(self):
+        recording = self.experiment.get_recording('emg_recording1', 'session1')
+        for i in range(5):
+            trial = recording.get_trial('trial{}'.format(i))
+            trial.add_event('long', 1, 0.5)
+            trial.add_event('single', 0.4)
+        events = recording.get_events(from_=1, to=4.4)
+        starts = [e.start for e in events]
+        assert starts == [1, 2.4, 3], 'Wrong events {}'.format(starts)
+        events = recording.get_events(from_=1, to=4.4)
+        assert [e.start for e in events] == starts, 'Events shifted twice'
+        trial = recording.get_trial('trial0')
+        assert [e.start for e in trial.get_events()] == [0.4, 1]
+        assert len(recording.get_events()) == 10
+
+    def test_get_data_interval(self):
+        recording = self.experiment.get_recording('emg_recording1', 'session1')
+        assert recording.duration == 10
+        assert recording.trial_range(3, 7) == (1, 4)
+        assert recording.trial_range(4, 6) == (2, 3), 'Trial ending at ' + \
+                'begin of interval included'
+        containers = recording.get_data(begin=3, end=7)
+        assert [c.samples for c in containers] == [20, 40, 20], \
+                'Wrong samples {}'.format([c.samples for c in containers])
+        all_data = np.row_stack([c.data for c in recording.get_data()])
+        assert np.array_equal(containers[0].data, all_data[60:80])
+        containers = recording.get_data(begin=9)
+        assert len(containers) == 1 and containers[0].samples == 20
+        assert recording.get_offset('trial3') == 6
+
+    def test_set_data(self):
+        recording = self.experiment.get_recording('emg_recording1', 'session1')
+        data = np.row_stack([c.data for c in recording.get_data()])
+        recording.set_data(data * 2)
+        assert np.array_equal(
+                np.row_stack([c.data for c in recording.get_data()]),
+                data * 2
+                ), 'Relevant data not set'
+
+    def test_put_events(self):
+        recording = self.experiment.get_recording('emg_recording1', 'session1')
+        recording.put_events(
+                ['trial1', 'trial0', 'trial1', 'trial0'],
+                ['a', 'b', 'c', 'd'],
+                [1.5, 0.5, 0.2, 1.],
+                [np.nan, 0.1, 0.2, np.nan]
+                )
+        events = recording.get_trial('trial1').get_events()
+        assert [e.name for e in events] == ['c', 'a'], 'Wrong events {}'.format(
+                [e.to_string() for e in events])
+        assert events[1].duration is None
+        events = recording.get_events()
+        assert [e.name for e in events] == ['b', 'd', 'c', 'a']
+        try:
+            recording.put_events(['trial9'], ['a'], [0.])
+            assert False, 'No IndexError for unknown trial'
+        except IndexError:
+            pass
+
+    def test_add_trials(self):
+        session = self.experiment.sessions['session1']
+        modality = session.setup.modalities['emg']
+        data = np.zeros((200, 4))
+        recording = model.Recording(session, modality, data=data,
+                identifier='emg_trials')
+        recording.add_trials(pd.DataFrame(
+            [[0., 2., 'a'], [3., 4.5, 'b']],
+            columns=['start', 'stop', 'identifier']
+            ))
+        recording.add_trials(np.array([[5., 1.], [7., 2.]]))
+        assert recording.get_trial('b').duration == 1.5
+        assert recording.get_trial('trial3').start == 7.
+        assert recording.duration == 6.5
+        trials = recording.put_trials([9.], [0.5], ['c'], ['rest'])
+        assert trials[0].label == 'rest'
+
+    def test_get_data_by_labels(self):
+        session = self.experiment.sessions['session1']
+        modality = session.setup.modalities['emg']
+        data = np.arange(800.).reshape(200, 4)
+        recording = model.Recording(session, modality, data=data,
+                identifier='emg_labels')
+        recording.put_trials([0., 2., 4., 6.], [2., 2., 2., 2.],
+                labels=['fist', 'rest', 'fist', None])
+        trials, labels = recording.get_data_by_labels(['fist'])
+        assert labels == ['fist', 'fist'], 'Wrong labels {}'.format(labels)
+        assert np.array_equal(trials[1].data, data[80:120]), 'Wrong data'
+        recording.get_trial('trial3').label = 'fist'
+        recording.get_trial('trial0').label = 'rest'
+        assert [t.identifier for t in recording.get_trials(['fist'])] == \
+                ['trial2', 'trial3'], 'Label index not updated'
+        assert [t.identifier for t in recording.get_trials(['rest'])] == \
+                ['trial0', 'trial1'], 'Label index not updated'
+        trials, labels = recording.get_data_by_labels()
+        assert sorted(labels) == ['fist', 'fist', 'rest', 'rest']
+
+
+class EventStoreTest(object):
+    def setup(self):
+        self.store = model.EventStore([
+            model.Event('b', 3., 2.),
+            model.Event('a', 1.),
+            model.Event('c', 0.5, 10.),
+            model.Event('a', 7.)
+            ])
+
+    def test_between(self):
+        starts = [e.start for e in self.store.between(1, 7)]
+        assert starts == [1., 3.], 'Wrong events {}'.format(starts)
+        assert len(self.store.between()) == 4
+
+    def test_overlapping(self):
+        names = sorted([e.name for e in self.store.overlapping(4, 5)])
+        assert names == ['b', 'c'], 'Wrong events {}'.format(names)
+
+    def test_overlapping_index(self):
+        random = np.random.RandomState(3)
+        starts = random.uniform(0, 100, 500)
+        durations = random.exponential(0.5, 500)
+        durations[random.rand(500) < 0.2] = np.nan
+        durations[7] = 90.
+        store = model.EventStore()
+        store.add_columns(range(500), starts, durations)
+        store.overlapping(0., 1.)
+        store.add(model.Event('late', 0., 1.))
+        ends = np.where(np.isnan(durations), -np.inf, starts + durations)
+        for from_, to in [(10., 12.5), (50., 50.), (-1., 0.5), (99., 200.)]:
+            expected = sorted(np.flatnonzero(
+                ((starts >= from_) & (starts < to)) |
+                ((starts < from_) & (ends > from_))).tolist())
+            events = store.overlapping(from_, to)
+            names = [e.name for e in events if e.name != 'late']
+            assert sorted(names) == expected, \
+                    'Wrong events for [{}, {})'.format(from_, to)
+            assert [e.start for e in events] == \
+                    sorted([e.start for e in events]), 'Events not sorted'
+        assert 'late' in [e.name for e in store.overlapping(0.5, 0.6)], \
+                'Event added after tree was built not found'
+
+    def test_start_read_only(self):
+        event = self.store.between(1, 2)[0]
+        try:
+            event.start = 20.
+            assert False, 'Start of indexed event changed'
+        except AttributeError:
+            pass
+
+    def test_named(self):
+        assert [e.start for e in self.store.named('a')] == [1., 7.]
+        assert self.store.named('d') == []
+
+    def test_from_frame(self):
+        store = model.EventStore.from_frame(pd.DataFrame([
+            ['a', 2., 1.],
+            ['b', 1., np.nan]
+            ]))
+        events = list(store)
+        assert [e.name for e in events] == ['b', 'a'], 'Events not sorted'
+        assert events[0].duration is None
+        assert store.max_duration == 1.
+
+
+class DataControllerTest(object):
+    def setup(self):
+        self.logger = logging.getLogger('DataControllerTestLogger')
+        self.path = os.path.join(tempfile.mkdtemp(), 'export.txt')
+        with open(self.path, 'w') as f:
+            f.write('Interval=\t0.001 s\n')
+            f.write('ChannelTitle=\tbizeps\ttrizeps\n')
+            for i in range(1000):
+                f.write('{},000\t{},5\t{}\n'.format(i, i, -i))
+
+    def test_read_data_from_text(self):
+        controller = model.DataController()
+        arr = controller.read_data_from_text(self.path, blocksize=1024)
+        assert arr.shape == (1000, 2), 'Wrong shape {}'.format(arr.shape)
+        assert np.array_equal(arr[:, 0], np.arange(1000) + 0.5), 'Comma ' + \
+                'decimals not parsed correctly'
+        assert np.array_equal(arr[:, 1], -np.arange(1000)), 'Second ' + \
+                'column not parsed correctly'
+
+    def test_read_data_from_text_missing_values(self):
+        controller = model.DataController()
+        with open(self.path, 'w') as f:
+            f.write('Interval=\t0.001 s\n')
+            f.write(' ChannelTitle=\tbizeps\ttrizeps\n')
+            f.write('0,000\tNaN\t3\n')
+            f.write('0,001\t1,5\tinf\n')
+            f.write('0,002\t-Inf\t4e-1\n')
+        arr = controller.read_data_from_text(self.path)
+        assert arr.shape == (3, 2), 'Rows with missing values skipped'
+        assert np.isnan(arr[0, 0]) and arr[0, 1] == 3.
+        assert arr[1, 1] == np.inf and arr[2, 0] == -np.inf
+        assert arr[2, 1] == 0.4
+
+    def test_read_data_from_text_trailing_delimiter(self):
+        controller = model.DataController()
+        with open(self.path, 'wb') as f:
+            f.write('ChannelTitle=\tbizeps\ttrizeps\r\n')
+            f.write('0,0\t1,5\t2\t\r\n')
+            f.write('0,1\t3,5\t4\t\r\n')
+        arr = controller.read_data_from_text(self.path)
+        assert np.array_equal(arr, [[1.5, 2.], [3.5, 4.]]), \
+                'Wrong data {}'.format(arr)
+        with open(self.path, 'wb') as f:
+            f.write('0.0,1.5,2,\r\n0.1,3.5,4,\r\n0.2,5,\r\n')
+        arr = controller.read_data_from_text(self.path, delimiter=',')
+        assert np.array_equal(arr, [[1.5, 2.], [3.5, 4.]]), \
+                'Wrong data {}'.format(arr)
+
+    def test_read_data_from_text_out(self):
+        controller = model.DataController()
+        out = self.path.replace('.txt', '.npy')
+        arr = controller.read_data_from_text(self.path, out=out, blocksize=1024)
+        assert type(arr) == np.memmap, 'Memory map expected, got {}'.format(type(arr))
+        assert np.array_equal(np.load(out), controller.read_data_from_text(
+            self.path)), 'Data written to file does not match'
@@ -0,0 +1,83 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from online.publisher import AbstractPublisher
+import threading
+import time
+
+
+class FakePublisher(object):
+    def __init__(self):
+        self.sent = []
+
+    def publish(self, message):
+        self.sent.append(message)
+
+
+class TestBatching(object):
+    def publisher(self, messages, **kwargs):
+        publisher = AbstractPublisher('emg', 'inproc://emg', 'publisher',
+                **kwargs)
+        for message in messages:
+            publisher.queue.put(message)
+        return publisher
+
+    def test_max_batch(self):
+        publisher = self.publisher([str(i) for i in range(10)], max_batch=4)
+        batches = [publisher._next_batch() for i in range(3)]
+        assert [len(b) for b in batches] == [4, 4, 2], \
+                'Wrong batches {}'.format(batches)
+        assert sum(batches, []) == [str(i) for i in range(10)], \
+                'Messages lost or reordered'
+        assert publisher.queue.empty()
+
+    def test_max_bytes(self):
+        messages = ['a' * 100, ['b' * 50, 'c' * 100], 'd' * 10, 'e' * 300]
+        publisher = self.publisher(messages, max_bytes=250)
+        assert publisher._next_batch() == messages[:2], \
+                'Batch not sent at max_bytes'
+        assert publisher._next_batch() == messages[2:], \
+                'Message exceeding max_bytes not sent'
+        publisher = self.publisher(['a' * 300, 'b'], max_bytes=250)
+        assert publisher._next_batch() == ['a' * 300]
+
+    def test_max_latency(self):
+        publisher = self.publisher(['a'])
+        assert publisher._next_batch() == ['a'], 'Waited without max_latency'
+        publisher = self.publisher(['a'], max_latency=0.5, max_batch=2)
+        timer = threading.Timer(0.05, publisher.queue.put, ['b'])
+        timer.start()
+        start = time.time()
+        batch = publisher._next_batch()
+        assert batch == ['a', 'b'], 'Late message not added to batch'
+        assert time.time() - start < 0.5, 'Batch not sent when full'
+        publisher = self.publisher(['a'], max_latency=0.05, max_batch=2)
+        start = time.time()
+        assert publisher._next_batch() == ['a']
+        assert time.time() - start >= 0.05, 'Batch sent before max_latency'
+
+    def test_publish(self):
+        fake = FakePublisher()
+        publisher = self.publisher([])
+        publisher._publish(fake, [['h1', 'd1'], ['h2', 'd2'], 'a', ['h3', 'd3'],
+            'b', 'c'])
+        assert fake.sent == [['h1', 'd1', 'h2', 'd2'], 'a', ['h3', 'd3'], 'b',
+                'c'], 'Wrong messages {}'.format(fake.sent)
+        publisher._publish(fake, ['d'])
+        assert fake.sent[-1] == 'd'
+
+    def test_batch_sizes(self):
+        fake = FakePublisher()
+        publisher = self.publisher([str(i) for i in range(10)], max_batch=4)
+        assert publisher.batch_sizes == {} and publisher.mean_batch_size == 0.
+        while not publisher.queue.empty():
+            publisher._publish(fake, publisher._next_batch())
+        assert fake.sent == [str(i) for i in range(10)]
+        assert publisher.batch_sizes == {4: 2, 2: 1}, \
+                'Wrong batch sizes {}'.format(publisher.batch_sizes)
+        assert publisher.mean_batch_size == 10 / 3.
@@ -0,0 +1,136 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from online.messageclasses import ArrayMessage
+from online.messageclasses import join_frames
+from online.messageclasses import split_frames
+import numpy as np
+import struct
+
+
+class TestArrayMessage(object):
+    def setup(self):
+        self.data = np.arange(600.).reshape(150, 4)
+
+    def test_frames(self):
+        message = ArrayMessage(self.data, timestamp=12, sequence=3)
+        header, data = message.frames(4000)
+        assert len(header) == ArrayMessage.get_headerlength()
+        parsed = ArrayMessage.deserialize([header, data])
+        assert np.array_equal(parsed.data, self.data), 'Data does not match'
+        assert parsed.timestamp == 12 and parsed.sequence == 3 and \
+                parsed.samplingrate == 4000, 'Header does not match'
+        assert np.shares_memory(parsed.data, self.data), 'Data was copied'
+
+    def test_serialize(self):
+        for dtype in ['float64', 'float32', 'int16', '>i4']:
+            data = self.data.astype(dtype)
+            message = ArrayMessage(data, sr=500).serialize()
+            parsed = ArrayMessage.deserialize(str(message))
+            assert parsed.data.dtype == np.dtype(dtype).newbyteorder('<'), \
+                    'Wrong dtype {} for {}'.format(parsed.data.dtype, dtype)
+            assert np.array_equal(parsed.data, data), \
+                    'Data does not match for {}'.format(dtype)
+            assert parsed.samplingrate == 500
+
+    def test_columns(self):
+        message = ArrayMessage(self.data[:, 1:3]).serialize(100)
+        parsed = ArrayMessage.deserialize(message)
+        assert np.array_equal(parsed.data, self.data[:, 1:3])
+
+    def test_legacy(self):
+        header = struct.pack(ArrayMessage.legacy_header_format, 12, 0.15,
+                4000, 150)
+        parsed = ArrayMessage.deserialize(header + self.data.tostring())
+        assert np.array_equal(parsed.data, self.data), 'Data does not match'
+        assert parsed.samplingrate == 4000 and parsed.timestamp == 12
+
+    def test_legacy_magic(self):
+        # Lowest bytes of timestamp equal magic of current version
+        timestamp = 1500000000000 & ~0xffff | 0x4d41
+        header = struct.pack(ArrayMessage.legacy_header_format, timestamp,
+                0.15, 4000, 150)
+        assert header[:2] == ArrayMessage.magic
+        parsed = ArrayMessage.deserialize(header + self.data.tostring())
+        assert np.array_equal(parsed.data, self.data), 'Data does not match'
+        assert parsed.timestamp == timestamp
+
+    def test_scale(self):
+        raw = (self.data - 300).astype('int16')
+        message = ArrayMessage(raw, scale=[0.5, 1., 2., 4.], offset=1.)
+        parsed = ArrayMessage.deserialize(message.serialize(4000))
+        assert parsed.data.dtype == np.int16
+        assert np.allclose(parsed.values, raw * [0.5, 1., 2., 4.] + 1.), \
+                'Scaled values do not match'
+
+    def test_quantize(self):
+        data = np.sin(self.data)
+        message = ArrayMessage.quantize(data, 'int16')
+        parsed = ArrayMessage.deserialize(message.serialize(4000))
+        assert np.abs(parsed.values - data).max() < 2. / 2 ** 16, \
+                'Quantization error too large'
+
+    def test_quantize_1d(self):
+        data = np.sin(self.data[:, 0])
+        parsed = ArrayMessage.deserialize(ArrayMessage.quantize(data, 'int8')
+                .serialize(4000))
+        assert parsed.data.shape == (150, 1)
+        assert np.abs(parsed.values[:, 0] - data).max() < 2. / 2 ** 8, \
+                'Quantization error too large'
+        constant = ArrayMessage.quantize(np.ones(10))
+        assert np.array_equal(constant.values, np.ones(10)), \
+                'Constant data not restored'
+
+    def test_compression(self):
+        raw = np.cumsum(np.random.randint(-5, 6, size=(150, 4)), axis=0) \
+                .astype('int16')
+        raw[10] = [32767, -32768, 0, 1]
+        for compression in ArrayMessage.compressions:
+            if compression == 'lz4':
+                try:
+                    ArrayMessage(raw, compression='lz4')
+                except ValueError:
+                    continue
+            for delta in [False, True]:
+                message = ArrayMessage(raw, compression=compression,
+                        delta=delta).serialize(4000)
+                parsed = ArrayMessage.deserialize(message)
+                assert np.array_equal(parsed.data, raw), ('Data does not ' + \
+                        'match for {}, delta {}').format(compression, delta)
+        try:
+            ArrayMessage(self.data, delta=True)
+            assert False, 'Delta encoding of float data not rejected'
+        except ValueError:
+            pass
+        try:
+            ArrayMessage(raw, compression='gzip')
+            assert False, 'Unsupported compression not rejected'
+        except ValueError:
+            pass
+
+    def test_batch(self):
+        frames = []
+        for i in range(3):
+            frames.extend(ArrayMessage(self.data + i, sequence=i,
+                compression='zlib' if i == 1 else None).frames(4000))
+        message = join_frames(frames, 'emg|', sizes=True)
+        split = split_frames(str(message), 4)
+        assert len(split) == 6, 'Expected 6 frames, got {}'.format(len(split))
+        parsed = ArrayMessage.deserialize_batch(split)
+        assert [p.sequence for p in parsed] == [0, 1, 2], 'Wrong messages'
+        for i, p in enumerate(parsed):
+            assert np.array_equal(p.data, self.data + i), 'Data does not match'
+
+    def test_split_unjoined(self):
+        header = struct.pack(ArrayMessage.legacy_header_format, 12, 0.15,
+                4000, 150)
+        for body in [header + self.data.tostring(),
+                str(ArrayMessage(self.data).serialize(4000)), '']:
+            split = split_frames('emg|' + body, 4)
+            assert len(split) == 1 and str(split[0]) == body, \
+                    'Message without frame table not returned as one frame'
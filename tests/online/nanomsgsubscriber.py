@@ -0,0 +1,57 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from nose.plugins.skip import SkipTest
+from online.messageclasses import ArrayMessage
+from online.messageclasses import join_frames
+import numpy as np
+import struct
+try:
+    from online.messaging.nanomsgcomponents import NanomsgSubscriber
+except ImportError:
+    NanomsgSubscriber = None
+
+
+class FakeSocket(object):
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    def recv(self):
+        return self.messages.pop(0)
+
+
+class TestNanomsgSubscriber(object):
+    def setup(self):
+        if NanomsgSubscriber is None:
+            raise SkipTest('Package nanomsg not installed')
+        self.data = np.arange(600.).reshape(150, 4)
+
+    def subscriber(self, *messages):
+        subscriber = NanomsgSubscriber.__new__(NanomsgSubscriber)
+        super(NanomsgSubscriber, subscriber).__init__('emg')
+        subscriber._socket = FakeSocket(messages)
+        return subscriber
+
+    def test_receive(self):
+        frames = ArrayMessage(self.data, sequence=2).frames(4000)
+        subscriber = self.subscriber(str(join_frames(frames, 'emg|', True)))
+        received = subscriber.receive()
+        assert len(received) == 2, 'Expected header and data frame'
+        parsed = ArrayMessage.deserialize(received)
+        assert parsed.sequence == 2 and np.array_equal(parsed.data,
+                self.data), 'Data does not match'
+
+    def test_receive_legacy(self):
+        header = struct.pack(ArrayMessage.legacy_header_format, 12, 0.15,
+                4000, 150)
+        subscriber = self.subscriber('emg|' + header + self.data.tostring(),
+                'emg|' + str(ArrayMessage(self.data).serialize(4000)))
+        for i in range(2):
+            parsed = ArrayMessage.deserialize(subscriber.receive())
+            assert np.array_equal(parsed.data, self.data), \
+                    'Data of message without frame table does not match'
@@ -0,0 +1,82 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from online.ringbuffer import RingBuffer
+from Queue import Empty
+from Queue import Full
+import threading
+
+
+class TestRingBuffer(object):
+    def test_fifo(self):
+        buf = RingBuffer(3)
+        for i in range(10):
+            buf.put(i)
+            assert buf.get() == i, 'Items not returned in order'
+        assert buf.empty() and buf.high_water == 1
+
+    def test_drop_oldest(self):
+        buf = RingBuffer(3, 'drop_oldest')
+        for i in range(5):
+            assert buf.put(i)
+        assert buf.drain(10) == [2, 3, 4], 'Wrong items kept'
+        assert buf.dropped == 2 and buf.high_water == 3
+
+    def test_drop_newest(self):
+        buf = RingBuffer(3, 'drop_newest')
+        results = [buf.put(i) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert buf.drain(2) == [0, 1] and buf.get() == 2
+        assert buf.dropped == 2
+
+    def test_drain_limit(self):
+        buf = RingBuffer(5)
+        for item in ['ab', 'cde', 'f', 'gh']:
+            buf.put(item)
+        assert buf.drain(5, 4) == ['ab', 'cde'], 'Limit not applied'
+        assert buf.drain(5, 0) == [] and buf.qsize() == 2
+        assert buf.drain(1, 10) == ['f'], 'Count not applied'
+
+    def test_block(self):
+        buf = RingBuffer(2)
+        buf.put(0)
+        buf.put(1)
+        try:
+            buf.put(2, timeout=0.01)
+            assert False, 'Full buffer accepted item'
+        except Full:
+            pass
+        buf.get()
+        buf.put(2, block=False)
+        assert buf.drain(5) == [1, 2]
+        try:
+            buf.get(timeout=0.01)
+            assert False, 'Empty buffer returned item'
+        except Empty:
+            pass
+
+    def test_threads(self):
+        buf = RingBuffer(4)
+        received = []
+
+        def consume():
+            while len(received) < 1000:
+                items = buf.drain(3)
+                if len(items) == 0:
+                    items = [buf.get()]
+                received.extend(items)
+                buf.task_done(len(items))
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(1000):
+            buf.put(i)
+        buf.join()
+        consumer.join()
+        assert received == range(1000), 'Items lost or reordered'
+        assert buf.high_water <= 4 and buf.dropped == 0
@@ -0,0 +1,91 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            os.path.pardir,
+            'biosi'
+            ))
+from online.messageclasses import ArrayMessage
+from online.messaging import sharedmemorycomponents
+from online.messaging.sharedmemorycomponents import SharedMemoryPublisher
+from online.messaging.sharedmemorycomponents import SharedMemorySubscriber
+import numpy as np
+import threading
+
+
+class TestSharedMemory(object):
+    def setup(self):
+        self.data = np.arange(600.).reshape(150, 4)
+
+    def receive_nothing(self, subscriber):
+        try:
+            subscriber.receive()
+            assert False, 'Received message although none was published'
+        except IOError:
+            pass
+
+    def test_publish(self):
+        with SharedMemoryPublisher('shm://test', 'emg', 4, 8192) as publisher:
+            subscribers = [SharedMemorySubscriber('shm://test', 'emg', 0.01)
+                    for i in range(2)]
+            for subscriber in subscribers:
+                self.receive_nothing(subscriber)
+            for i in range(3):
+                publisher.publish(ArrayMessage(self.data + i,
+                    sequence=i).frames(4000))
+            for subscriber in subscribers:
+                for i in range(3):
+                    parsed = ArrayMessage.deserialize(subscriber.receive())
+                    assert parsed.sequence == i, 'Wrong message received'
+                    assert np.array_equal(parsed.data, self.data + i), \
+                            'Data does not match'
+                self.receive_nothing(subscriber)
+        assert not os.path.exists(publisher.path), 'Ring buffer not removed'
+
+    def test_overrun(self):
+        with SharedMemoryPublisher('shm://test', 'emg', 4, 64) as publisher:
+            subscriber = SharedMemorySubscriber('shm://test', 'emg', 0.01)
+            self.receive_nothing(subscriber)
+            for i in range(6):
+                publisher.publish(str(i))
+            received = [str(subscriber.receive()) for i in range(4)]
+            assert received == ['2', '3', '4', '5'], \
+                    'Wrong messages {}'.format(received)
+            assert subscriber.dropped == 2, 'Wrong number of dropped messages'
+            try:
+                publisher.publish('x' * 64)
+                assert False, 'Message larger than slot accepted'
+            except ValueError:
+                pass
+
+    def test_threads(self):
+        with SharedMemoryPublisher('shm://test', 'kin', 8, 64) as publisher:
+            subscriber = SharedMemorySubscriber('shm://test', 'kin', 1)
+            self.receive_nothing(subscriber)
+            received = []
+
+            def consume():
+                while len(received) == 0 or received[-1] < 99:
+                    received.append(int(str(subscriber.receive())))
+
+            thread = threading.Thread(target=consume)
+            thread.start()
+            for i in range(100):
+                publisher.publish(str(i))
+            thread.join()
+        assert received == sorted(set(received)), 'Messages reordered'
+        assert len(received) + subscriber.dropped == 100, \
+                'Messages lost without being counted'
+
+    def test_platform(self):
+        try:
+            sharedmemorycomponents.SUPPORTED = False
+            for component in [SharedMemoryPublisher, SharedMemorySubscriber]:
+                try:
+                    component('shm://test', 'emg')
+                    assert False, 'Unsupported platform accepted'
+                except NotImplementedError:
+                    pass
+        finally:
+            sharedmemorycomponents.SUPPORTED = os.name == 'posix'